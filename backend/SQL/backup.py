@@ -1,14 +1,244 @@
 # SQL/backup.py
-import shutil
+import argparse
+import gzip
 import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
 from datetime import datetime
+from . import database
+
+# Backups do banco feitos com a API de backup online do SQLite: a cópia é feita em passos de algumas páginas,
+# de uma conexão de leitura, e pode rodar com a API no ar (as escritas continuam entre os passos e o arquivo
+# copiado é sempre consistente). Também pode ser usado pela linha de comando, a partir da pasta backend:
+#     python -m SQL.backup criar | listar | limpar | verificar ARQUIVO | restaurar ARQUIVO
+
+BACKUP_DIR = os.getenv("CARTEIRA_BACKUP_DIR", "backups")
+# Grava os backups compactados com gzip (.db.gz)
+BACKUP_COMPRIMIR = os.getenv("CARTEIRA_BACKUP_COMPRIMIR", "1") == "1"
+# Páginas copiadas por passo e pausa (em segundos) entre os passos
+BACKUP_PAGINAS_POR_PASSO = int(os.getenv("CARTEIRA_BACKUP_PAGINAS_POR_PASSO", "1024"))
+BACKUP_PAUSA = float(os.getenv("CARTEIRA_BACKUP_PAUSA", "0.005"))
+# Retenção: os N backups mais recentes, mais o último de cada um dos D dias mais recentes que tiverem backup
+BACKUP_MANTER_ULTIMOS = int(os.getenv("CARTEIRA_BACKUP_MANTER_ULTIMOS", "7"))
+BACKUP_MANTER_DIARIOS = int(os.getenv("CARTEIRA_BACKUP_MANTER_DIARIOS", "30"))
+
+# Se o banco for alterado durante a cópia, o SQLite a recomeça; depois de tantos recomeços, a cópia é feita
+# num passo só (em modo WAL isso também não bloqueia as escritas, só adia o checkpoint)
+MAX_RECOMECOS = 3
+
+TABELAS_OBRIGATORIAS = ("ativos", "operacoes")
+_PADRAO_NOME = re.compile(r"^ativos_(\d{8}_\d{6})(?:_\d+)?\.db(\.gz)?$")
+
+
+class _CopiaRecomecada(Exception):
+    pass
+
+
+def _copiar(origem: sqlite3.Connection, destino: sqlite3.Connection, paginas=BACKUP_PAGINAS_POR_PASSO, pausa=BACKUP_PAUSA):
+    """Copia 'origem' para 'destino' em passos de 'paginas' páginas."""
+    restantes_antes = [None]
+    recomecos = [0]
+
+    def progresso(status, restantes, total):
+        if restantes_antes[0] is not None and restantes > restantes_antes[0]:
+            recomecos[0] += 1
+            if recomecos[0] > MAX_RECOMECOS:
+                raise _CopiaRecomecada()
+        restantes_antes[0] = restantes
+        if pausa and restantes:
+            time.sleep(pausa)
+
+    try:
+        origem.backup(destino, pages=paginas, progress=progresso)
+    except _CopiaRecomecada:
+        origem.backup(destino, pages=-1)
+
+
+def _nome_livre(diretorio, extensao):
+    base = f"ativos_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    caminho, n = os.path.join(diretorio, base + extensao), 1
+    while os.path.exists(caminho):
+        caminho, n = os.path.join(diretorio, f"{base}_{n}{extensao}"), n + 1
+    return caminho
+
+
+def fazer_backup(diretorio=BACKUP_DIR, comprimir=BACKUP_COMPRIMIR, origem=None):
+    """
+    Faz o backup do banco (por padrão, o da aplicação) em 'diretorio' e aplica a retenção.
+    Retorna o caminho do arquivo criado, ou None se o banco ainda não existir.
+    """
+    origem = origem or database.DB_ARQUIVO
+    if not os.path.exists(origem):
+        return None
+
+    os.makedirs(diretorio, exist_ok=True)
+    # A cópia é feita num arquivo temporário e só recebe o nome final quando completa
+    parcial = tempfile.NamedTemporaryFile(dir=diretorio, prefix=".parcial_", suffix=".db", delete=False).name
+    try:
+        conexao_origem = sqlite3.connect(origem, timeout=30)
+        conexao_destino = sqlite3.connect(parcial)
+        try:
+            _copiar(conexao_origem, conexao_destino)
+            # O backup é um arquivo único, sem WAL, para poder ser copiado e compactado
+            conexao_destino.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            conexao_destino.close()
+            conexao_origem.close()
+
+        if comprimir:
+            arquivo = _nome_livre(diretorio, ".db.gz")
+            with open(parcial, "rb") as entrada, gzip.open(arquivo + ".parcial", "wb", compresslevel=6) as saida:
+                shutil.copyfileobj(entrada, saida, 1024 * 1024)
+            os.replace(arquivo + ".parcial", arquivo)
+        else:
+            arquivo = _nome_livre(diretorio, ".db")
+            os.replace(parcial, arquivo)
+    finally:
+        for resto in (parcial, parcial + "-journal"):
+            if os.path.exists(resto):
+                os.remove(resto)
+
+    aplicar_retencao(diretorio)
+    return arquivo
+
+
+def listar_backups(diretorio=BACKUP_DIR):
+    """Backups do diretório, do mais recente para o mais antigo: lista de (caminho, momento, tamanho em bytes)."""
+    if not os.path.isdir(diretorio):
+        return []
+    backups = []
+    for nome in os.listdir(diretorio):
+        encontrado = _PADRAO_NOME.match(nome)
+        if encontrado:
+            caminho = os.path.join(diretorio, nome)
+            backups.append((caminho, datetime.strptime(encontrado.group(1), "%Y%m%d_%H%M%S"), os.path.getsize(caminho)))
+    return sorted(backups, key=lambda backup: (backup[1], backup[0]), reverse=True)
+
+
+def aplicar_retencao(diretorio=BACKUP_DIR, manter_ultimos=BACKUP_MANTER_ULTIMOS, manter_diarios=BACKUP_MANTER_DIARIOS):
+    """
+    Remove os backups fora da política de retenção: ficam os 'manter_ultimos' mais recentes e o mais recente
+    de cada um dos 'manter_diarios' últimos dias com backup. Retorna os arquivos removidos.
+    """
+    backups = listar_backups(diretorio)
+    manter = {caminho for caminho, _, _ in backups[:manter_ultimos]}
+    dias = {}
+    for caminho, momento, _ in backups:
+        dias.setdefault(momento.date(), caminho)
+    manter.update(caminho for _, caminho in sorted(dias.items(), reverse=True)[:manter_diarios])
+
+    removidos = [caminho for caminho, _, _ in backups if caminho not in manter]
+    for caminho in removidos:
+        os.remove(caminho)
+    return removidos
+
+
+def _abrir_copia(arquivo):
+    """Extrai (se compactado) o backup para um arquivo temporário e retorna o caminho dele."""
+    temporario = tempfile.NamedTemporaryFile(prefix="restauracao_", suffix=".db", delete=False).name
+    abrir = gzip.open if arquivo.endswith(".gz") else open
+    with abrir(arquivo, "rb") as entrada, open(temporario, "wb") as saida:
+        shutil.copyfileobj(entrada, saida, 1024 * 1024)
+    return temporario
+
+
+def _verificar_conexao(conexao):
+    resultado = conexao.execute("PRAGMA integrity_check").fetchone()[0]
+    if resultado != "ok":
+        raise ValueError(f"Backup corrompido: {resultado}")
+    tabelas = {nome for (nome,) in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    faltantes = [tabela for tabela in TABELAS_OBRIGATORIAS if tabela not in tabelas]
+    if faltantes:
+        raise ValueError(f"Backup sem as tabelas {', '.join(faltantes)}.")
+    return {tabela: conexao.execute(f'SELECT count(*) FROM "{tabela}"').fetchone()[0] for tabela in TABELAS_OBRIGATORIAS}
+
+
+def verificar_backup(arquivo):
+    """
+    Confere a integridade de um backup sem alterar o banco da aplicação (PRAGMA integrity_check e presença
+    das tabelas principais). Retorna a contagem de linhas das tabelas principais; lança ValueError se houver problema.
+    """
+    temporario = _abrir_copia(arquivo)
+    try:
+        conexao = sqlite3.connect(temporario)
+        try:
+            return _verificar_conexao(conexao)
+        finally:
+            conexao.close()
+    finally:
+        os.remove(temporario)
+
+
+def restaurar_backup(arquivo, destino=None, backup_antes=True):
+    """
+    Verifica o backup e copia o conteúdo dele para o banco (por padrão, o da aplicação), também pela API de backup:
+    o banco é substituído numa única transação e pode estar em uso pela API. Antes, o banco atual é salvo
+    com um backup normal (backup_antes=True). As versões dos dados (SQL/versoes.py) são avançadas além das
+    atuais, para que as respostas guardadas pelos clientes (ETag) não sejam confundidas com as restauradas.
+    Retorna a contagem de linhas das tabelas principais do banco restaurado.
+    """
+    destino = destino or database.DB_ARQUIVO
+    temporario = _abrir_copia(arquivo)
+    try:
+        conexao_backup = sqlite3.connect(temporario)
+        try:
+            _verificar_conexao(conexao_backup)
+            if backup_antes and os.path.exists(destino):
+                fazer_backup(origem=destino)
+
+            conexao_destino = sqlite3.connect(destino, timeout=30)
+            try:
+                versao_atual = _maior_versao(conexao_destino)
+                conexao_backup.backup(conexao_destino)
+                if versao_atual:
+                    with conexao_destino:
+                        conexao_destino.execute("UPDATE versoes_dados SET versao = versao + ?, alterado_em = ?",
+                                                (versao_atual, datetime.now()))
+                return _verificar_conexao(conexao_destino)
+            finally:
+                conexao_destino.close()
+        finally:
+            conexao_backup.close()
+    finally:
+        os.remove(temporario)
+
+
+def _maior_versao(conexao):
+    try:
+        return conexao.execute("SELECT max(versao) FROM versoes_dados").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0  # Banco anterior à tabela de versões
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup do banco da carteira.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("criar", help="faz um backup e aplica a retenção")
+    comandos.add_parser("listar", help="lista os backups existentes")
+    comandos.add_parser("limpar", help="só aplica a retenção")
+    comandos.add_parser("verificar", help="confere a integridade de um backup").add_argument("arquivo")
+    restaurar = comandos.add_parser("restaurar", help="verifica e restaura um backup no banco da aplicação")
+    restaurar.add_argument("arquivo")
+    restaurar.add_argument("--sem-backup-antes", action="store_true", help="não salva o banco atual antes")
+    args = parser.parse_args()
+
+    if args.comando == "criar":
+        arquivo = fazer_backup()
+        print(f"Backup criado: {arquivo}" if arquivo else f"Banco {database.DB_ARQUIVO} não encontrado.")
+    elif args.comando == "listar":
+        for caminho, momento, tamanho in listar_backups():
+            print(f"{momento:%Y-%m-%d %H:%M:%S}  {tamanho / 1024:>10.1f} KiB  {caminho}")
+    elif args.comando == "limpar":
+        for caminho in aplicar_retencao():
+            print(f"Removido: {caminho}")
+    elif args.comando == "verificar":
+        print(f"Backup íntegro: {verificar_backup(args.arquivo)}")
+    elif args.comando == "restaurar":
+        print(f"Backup restaurado: {restaurar_backup(args.arquivo, backup_antes=not args.sem_backup_antes)}")
+
 
-def fazer_backup():
-    if not os.path.exists("data/ativos.db"):
-        return
-        
-    backup_dir = "backups"
-    os.makedirs(backup_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"{backup_dir}/ativos_{timestamp}.db"
-    shutil.copy2("data/ativos.db", backup_file)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
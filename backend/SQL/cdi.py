@@ -0,0 +1,26 @@
+# SQL/cdi.py
+import numpy as np
+from sqlalchemy import func, String
+from sqlalchemy.dialects.sqlite import insert
+from .models import CdiDiario
+
+
+def ultima_data(db):
+    """Data da última taxa armazenada (None se a série ainda estiver vazia)."""
+    return db.query(func.max(CdiDiario.data)).scalar()
+
+
+def salvar_taxas(db, taxas):
+    """Grava (ou sobrescreve) as taxas diárias recebidas, uma lista de dicionários com 'data' e 'taxa'."""
+    if taxas:
+        stmt = insert(CdiDiario.__table__)
+        db.execute(stmt.on_conflict_do_update(index_elements=['data'], set_={'taxa': stmt.excluded.taxa}), taxas)
+
+
+def carregar_serie(db):
+    """Série completa armazenada, em ordem de data: (datas como datetime64[D], taxas em % ao dia)."""
+    linhas = db.query(func.cast(CdiDiario.data, String), CdiDiario.taxa).order_by(CdiDiario.data).all()
+    if not linhas:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+    datas, taxas = zip(*linhas)
+    return np.array(datas, dtype='datetime64[D]'), np.asarray(taxas, dtype=float)
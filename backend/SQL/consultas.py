@@ -0,0 +1,41 @@
+# SQL/consultas.py
+from sqlalchemy import func, case
+from .models import Ativo, Operacao, Posicao
+
+
+def posicoes_por_ativo(db):
+    """
+    Retorna a posição de cada ativo (valores comprados/vendidos, quantidade líquida, custo médio de compra
+    e datas da primeira/última operação), lida da tabela de posições mantida a cada escrita em operações:
+    o custo é proporcional ao número de ativos, e não ao de operações.
+    Ativos sem operações não aparecem no resultado.
+    """
+    linhas = db.query(
+        Ativo.id, Ativo.ticker, Ativo.tipo_ativo, Posicao.total_comprado, Posicao.total_vendido,
+        Posicao.quantidade, Posicao.preco_medio, Posicao.primeira_operacao, Posicao.ultima_operacao,
+    ).join(Posicao, Posicao.id_ticker == Ativo.id).order_by(Ativo.id).all()
+
+    return [{
+        'id': linha.id, 'ticker': linha.ticker, 'tipo_ativo': linha.tipo_ativo,
+        'total_comprado': float(linha.total_comprado or 0), 'total_vendido': float(linha.total_vendido or 0),
+        'quantidade': int(linha.quantidade or 0),
+        'preco_medio': float(linha.preco_medio) if linha.preco_medio is not None else None,
+        'primeira_operacao': linha.primeira_operacao, 'ultima_operacao': linha.ultima_operacao,
+    } for linha in linhas]
+
+
+def fluxos_por_dia(db):
+    """
+    Soma, por ativo e por dia, a variação de quantidade e o fluxo de caixa das operações
+    (compras positivas, vendas negativas) em uma única consulta agregada.
+    """
+    eh_compra = Operacao.tipo_operacao == 'Comprar'
+    eh_venda = Operacao.tipo_operacao == 'Vender'
+    valor = Operacao.preco * Operacao.quantidade
+
+    return db.query(
+        Ativo.ticker, Operacao.data_operacao,
+        func.sum(case((eh_compra, Operacao.quantidade), (eh_venda, -Operacao.quantidade), else_=0)).label('quantidade'),
+        func.sum(case((eh_compra, valor), (eh_venda, -valor), else_=0)).label('fluxo'),
+    ).join(Operacao, Operacao.id_ticker == Ativo.id) \
+        .group_by(Ativo.ticker, Operacao.data_operacao).all()
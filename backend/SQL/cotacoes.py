@@ -0,0 +1,87 @@
+# SQL/cotacoes.py
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import func, String
+from sqlalchemy.dialects.sqlite import insert
+from .models import CotacaoDiaria, AtualizacaoCotacao
+
+# Mapeamento entre as colunas do histórico do Yahoo Finance e as colunas da tabela local
+COLUNAS = {
+    'Open': 'abertura', 'High': 'maxima', 'Low': 'minima', 'Close': 'fechamento',
+    'Volume': 'volume', 'Dividends': 'dividendos', 'Stock Splits': 'desdobramentos',
+}
+
+
+def estado_atualizacao(db, tickers):
+    """Retorna, para cada ticker já armazenado, um dicionário com 'atualizado_em' e 'ultima_data'."""
+    atualizacoes = dict(db.query(AtualizacaoCotacao.ticker, AtualizacaoCotacao.atualizado_em)
+                        .filter(AtualizacaoCotacao.ticker.in_(tickers)).all())
+    ultimas_datas = dict(db.query(CotacaoDiaria.ticker, func.max(CotacaoDiaria.data))
+                         .filter(CotacaoDiaria.ticker.in_(tickers))
+                         .group_by(CotacaoDiaria.ticker).all())
+    return {
+        ticker: {'atualizado_em': atualizacoes[ticker], 'ultima_data': ultimas_datas.get(ticker)}
+        for ticker in atualizacoes
+    }
+
+
+def primeiras_datas(db, tickers):
+    """Retorna a data da barra mais antiga armazenada de cada ticker (tickers sem cotações ficam de fora)."""
+    return dict(db.query(CotacaoDiaria.ticker, func.min(CotacaoDiaria.data))
+                .filter(CotacaoDiaria.ticker.in_(tickers))
+                .group_by(CotacaoDiaria.ticker).all())
+
+
+def salvar_historico(db, ticker, hist: pd.DataFrame, marcar_atualizado=True):
+    """
+    Grava (ou sobrescreve) as barras diárias recebidas do provedor e marca o ticker como atualizado.
+    Um histórico vazio apenas registra a sincronização. Com marcar_atualizado=False (complemento de
+    períodos antigos), o momento da última sincronização não é alterado.
+    """
+    if hist is not None and not hist.empty:
+        hist = hist.dropna(subset=['Close'])
+        barras = hist.reindex(columns=list(COLUNAS)).rename(columns=COLUNAS).astype(float)
+        barras[['dividendos', 'desdobramentos']] = barras[['dividendos', 'desdobramentos']].fillna(0.0)
+        barras = barras.astype(object).where(barras.notna(), None)
+        barras.insert(0, 'data', [data.date() for data in hist.index])
+        barras.insert(0, 'ticker', ticker)
+        linhas = barras.to_dict(orient='records')
+
+        if linhas:
+            stmt = insert(CotacaoDiaria.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['ticker', 'data'],
+                set_={coluna_db: stmt.excluded[coluna_db] for coluna_db in COLUNAS.values()}
+            )
+            db.execute(stmt, linhas)
+
+    if marcar_atualizado:
+        stmt = insert(AtualizacaoCotacao.__table__).values(ticker=ticker, atualizado_em=datetime.now())
+        db.execute(stmt.on_conflict_do_update(index_elements=['ticker'], set_={'atualizado_em': stmt.excluded.atualizado_em}))
+    db.commit()
+
+
+def carregar_historicos(db, tickers, inicio):
+    """Lê do banco local os históricos a partir da data informada, no mesmo formato do Yahoo Finance."""
+    linhas = db.query(CotacaoDiaria).filter(CotacaoDiaria.ticker.in_(tickers), CotacaoDiaria.data >= inicio) \
+        .order_by(CotacaoDiaria.ticker, CotacaoDiaria.data).all()
+
+    registros = {}
+    for linha in linhas:
+        registros.setdefault(linha.ticker, []).append(
+            {'Date': pd.Timestamp(linha.data), **{coluna: getattr(linha, coluna_db) for coluna, coluna_db in COLUNAS.items()}}
+        )
+    return {ticker: pd.DataFrame(dados).set_index('Date') for ticker, dados in registros.items()}
+
+
+def carregar_series(db, tickers, inicio, colunas=('fechamento', 'dividendos')):
+    """
+    Lê as colunas pedidas de vários tickers a partir da data informada, já no formato de matriz:
+    um DataFrame por coluna, indexado pela data e com uma coluna por ticker.
+    """
+    # A data é lida como texto e convertida de uma vez pelo pandas, bem mais rápido que linha a linha
+    linhas = db.query(CotacaoDiaria.ticker, CotacaoDiaria.data.cast(String), *[getattr(CotacaoDiaria, c) for c in colunas]) \
+        .filter(CotacaoDiaria.ticker.in_(tickers), CotacaoDiaria.data >= inicio).all()
+    dados = pd.DataFrame(linhas, columns=['ticker', 'data', *colunas])
+    dados['data'] = pd.to_datetime(dados['data'], format='%Y-%m-%d')
+    return {coluna: dados.pivot(index='data', columns='ticker', values=coluna).sort_index() for coluna in colunas}
@@ -1,36 +1,81 @@
 # SQL/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
-from .models import Base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
+from contextlib import contextmanager
 from threading import Lock
 
 _engine = None
 _session_factory = None
+_async_session_factory = None
 _lock = Lock()
 _db_initialized = False  # Variável de controle
 
+# Arquivo do banco; por padrão data/ativos.db relativo ao diretório atual
+DB_ARQUIVO = os.getenv("CARTEIRA_DB_PATH", os.path.join("data", "ativos.db"))
+
+# Ajustes do SQLite aplicados em cada nova conexão
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",      # Leitores não são bloqueados por quem está escrevendo
+    "synchronous": "NORMAL",    # Seguro com WAL e bem mais rápido que FULL
+    "cache_size": -65536,       # 64 MiB de cache de páginas (valor negativo = KiB)
+    "mmap_size": 268435456,     # Até 256 MiB do arquivo lidos via memória mapeada
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # Espera até 5 s por um lock em vez de falhar na hora
+}
+
+def configurar_sqlite(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    for pragma, valor in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={valor}")
+    cursor.close()
+
+def _begin_imediato(conexao):
+    conexao.exec_driver_sql("BEGIN IMMEDIATE")
+
+@contextmanager
+def transacao_imediata(engine):
+    """
+    Conexão própria numa transação BEGIN IMMEDIATE: a trava de escrita é obtida já no início, antes das
+    leituras, então nenhuma outra escrita acontece entre o que foi lido e o que será gravado.
+    Commit ao sair do bloco, rollback se houver exceção.
+    """
+    with engine.connect() as conexao:
+        event.listen(conexao, "begin", _begin_imediato)
+        with conexao.begin():
+            yield conexao
+
 def init_db():
     global _engine, _session_factory, _db_initialized
     
     with _lock:
         if _engine is None:
-            os.makedirs("data", exist_ok=True)
-            db_path = 'sqlite:///data/ativos.db'
-            _engine = create_engine(db_path, connect_args={"check_same_thread": False})
+            os.makedirs(os.path.dirname(DB_ARQUIVO) or ".", exist_ok=True)
+            _engine = create_engine(f'sqlite:///{DB_ARQUIVO}', connect_args={"check_same_thread": False})
+            event.listen(_engine, "connect", configurar_sqlite)
             
-            # Verifica se o banco já existe
-            db_exists = os.path.exists("data/ativos.db")
-            
-            if not db_exists:
-                Base.metadata.create_all(_engine)
-                _db_initialized = True
-            else:
-                # Se o banco existe, apenas conecta sem recriar
-                _db_initialized = True
+            # Cria o esquema em bancos novos e aplica as migrações pendentes nos existentes (SQL/migrate.py)
+            from .migrate import aplicar
+            aplicar(_engine)
+            _db_initialized = True
 
             _session_factory = sessionmaker(bind=_engine)
 
 def get_db_session():
     init_db()
-    return scoped_session(_session_factory)
\ No newline at end of file
+    return scoped_session(_session_factory)
+
+def get_async_session():
+    """
+    Nova sessão assíncrona (aiosqlite) sobre o mesmo banco, para os endpoints async.
+    O esquema é preparado por init_db; quem chama deve fechar a sessão com 'await session.close()'.
+    """
+    global _async_session_factory
+    init_db()
+    with _lock:
+        if _async_session_factory is None:
+            async_engine = create_async_engine(f'sqlite+aiosqlite:///{DB_ARQUIVO}')
+            event.listen(async_engine.sync_engine, "connect", configurar_sqlite)
+            _async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_session_factory()
\ No newline at end of file
@@ -0,0 +1,70 @@
+# SQL/exportacao.py
+import csv
+import io
+from sqlalchemy import select
+from . import database
+from .models import Ativo, Operacao
+
+# Quantidade de linhas lidas do cursor (e enviadas ao cliente) por vez
+TAMANHO_LOTE = 2000
+
+CABECALHO = ['id', 'ticker', 'tipo_ativo', 'tipo_operacao', 'data_operacao', 'preco', 'quantidade', 'Total']
+
+
+def _consulta(filtros):
+    return select(
+        Operacao.id, Ativo.ticker, Ativo.tipo_ativo, Operacao.tipo_operacao,
+        Operacao.data_operacao, Operacao.preco, Operacao.quantidade,
+    ).join(Ativo, Operacao.id_ticker == Ativo.id) \
+        .where(*filtros) \
+        .order_by(Operacao.data_operacao.desc(), Operacao.id.desc())
+
+
+def _linhas(db, filtros):
+    """Percorre o resultado com um cursor no servidor, sem materializar todas as linhas em memória."""
+    resultado = db.execute(_consulta(filtros).execution_options(stream_results=True))
+    for lote in resultado.partitions(TAMANHO_LOTE):
+        yield [(op_id, ticker, tipo_ativo, tipo_operacao, data_operacao, float(preco), quantidade,
+                round(float(preco) * quantidade, 2))
+               for op_id, ticker, tipo_ativo, tipo_operacao, data_operacao, preco, quantidade in lote]
+
+
+def gerar_csv(filtros):
+    """
+    Gera o CSV das operações em pedaços, para ser enviado por streaming.
+    Usa uma sessão própria, pois a resposta continua sendo gerada depois que o endpoint retorna.
+    """
+    # A resposta é consumida em threads diferentes do pool, então a sessão não pode ser a de escopo por thread
+    db = database.get_db_session()()
+    try:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(CABECALHO)
+        for lote in _linhas(db, filtros):
+            escritor.writerows(lote)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    finally:
+        db.close()
+
+
+def gerar_xlsx(db, filtros, caminho):
+    """Grava o XLSX das operações em disco no modo de memória constante do xlsxwriter (linha a linha)."""
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+    try:
+        planilha = workbook.add_worksheet('Operações')
+        formato_data = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        planilha.write_row(0, 0, CABECALHO)
+        numero = 1
+        for lote in _linhas(db, filtros):
+            for linha in lote:
+                planilha.write_row(numero, 0, linha[:4])
+                planilha.write_datetime(numero, 4, linha[4], formato_data)
+                planilha.write_row(numero, 5, linha[5:])
+                numero += 1
+    finally:
+        workbook.close()
@@ -0,0 +1,209 @@
+# SQL/importacao.py
+import codecs
+import csv
+import io
+import math
+import zipfile
+from datetime import date, datetime
+from .models import Ativo, Operacao
+from . import posicoes, resultados, versoes
+
+# Quantidade de linhas inseridas por comando (a importação inteira é uma única transação)
+TAMANHO_LOTE = 5000
+# Limite de erros detalhados no relatório (o total é sempre informado)
+MAX_ERROS_RELATORIO = 1000
+
+TIPOS_ATIVO = ('FII', 'ETF', 'Ação')
+TIPOS_OPERACAO = {
+    'comprar': 'Comprar', 'compra': 'Comprar', 'c': 'Comprar',
+    'vender': 'Vender', 'venda': 'Vender', 'v': 'Vender',
+}
+
+
+def _decodifica(arquivo, codificacao):
+    decodificador = codecs.getincrementaldecoder(codificacao)()
+    try:
+        while bloco := arquivo.read(1024 * 1024):
+            decodificador.decode(bloco)
+        decodificador.decode(b'', final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        arquivo.seek(0)
+
+
+def _codificacao_csv(arquivo):
+    """
+    UTF-8 ou, se o arquivo não for UTF-8 válido, Windows-1252 (comum nas exportações das corretoras).
+    O arquivo é conferido inteiro antes da importação, para que um erro de codificação no meio dele
+    não deixe a importação aplicada pela metade.
+    """
+    for codificacao in ('utf-8-sig', 'cp1252'):
+        if _decodifica(arquivo, codificacao):
+            return codificacao
+    raise ValueError("Codificação do arquivo CSV não reconhecida. Salve-o em UTF-8.")
+
+
+def ler_csv(arquivo):
+    """
+    Lê um CSV (separado por vírgula ou ponto e vírgula) linha a linha, sem carregar o arquivo inteiro.
+    Lança ValueError se a codificação não for reconhecida.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding=_codificacao_csv(arquivo), newline='')
+    amostra = texto.read(4096)
+    texto.seek(0)
+    delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+    return ({(chave or '').strip().lower(): valor for chave, valor in linha.items()}
+            for linha in csv.DictReader(texto, delimiter=delimitador))
+
+
+def ler_xlsx(arquivo):
+    """Lê a primeira planilha de um XLSX em modo somente leitura (streaming). Lança ValueError se o arquivo for inválido."""
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True).worksheets[0]
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, IndexError) as e:
+        raise ValueError("Arquivo XLSX inválido ou corrompido.") from e
+
+    def linhas():
+        valores_linhas = planilha.iter_rows(values_only=True)
+        cabecalho = [str(c or '').strip().lower() for c in next(valores_linhas, [])]
+        for valores in valores_linhas:
+            if any(v not in (None, '') for v in valores):
+                yield dict(zip(cabecalho, valores))
+    return linhas()
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _converter_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texto[:10], formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: '{texto}' (use AAAA-MM-DD ou DD/MM/AAAA)")
+
+
+def _converter_numero(valor):
+    if isinstance(valor, (int, float)):
+        numero = float(valor)
+    else:
+        texto = _texto(valor).replace('R$', '').strip()
+        if ',' in texto:
+            # Formato brasileiro: 1.234,56
+            texto = texto.replace('.', '').replace(',', '.')
+        numero = float(texto)
+    # float() aceita 'nan' e 'inf', que passariam pelas validações seguintes
+    if not math.isfinite(numero):
+        raise ValueError(f"número inválido: {valor}")
+    return numero
+
+
+def _validar_linha(linha):
+    """Converte uma linha do arquivo em um dicionário de operação; lança ValueError com a descrição do problema."""
+    ticker = _texto(linha.get('ticker')).upper()
+    if not ticker or len(ticker) > 10:
+        raise ValueError("ticker ausente ou com mais de 10 caracteres")
+
+    tipo_operacao = TIPOS_OPERACAO.get(_texto(linha.get('tipo_operacao')).lower())
+    if tipo_operacao is None:
+        raise ValueError("tipo_operacao deve ser 'Comprar' ou 'Vender'")
+
+    try:
+        preco = _converter_numero(linha.get('preco'))
+    except ValueError:
+        raise ValueError(f"preço inválido: '{_texto(linha.get('preco'))}'")
+    try:
+        quantidade = _converter_numero(linha.get('quantidade'))
+    except ValueError:
+        raise ValueError(f"quantidade inválida: '{_texto(linha.get('quantidade'))}'")
+    if preco <= 0 or quantidade <= 0 or quantidade != int(quantidade):
+        raise ValueError("preço deve ser positivo e quantidade um inteiro positivo")
+
+    tipo_ativo = _texto(linha.get('tipo_ativo'))
+    return {
+        'ticker': ticker, 'tipo_ativo': tipo_ativo or None, 'tipo_operacao': tipo_operacao,
+        'data_operacao': _converter_data(linha.get('data_operacao')),
+        'preco': round(preco, 2), 'quantidade': int(quantidade),
+    }
+
+
+def _gravar_lote(db, lote, ids_ativos, relatorio):
+    """Cria os ativos que faltam e insere as operações do lote (sem commit: ver importar_operacoes)."""
+    novos = {}
+    validas = []
+    for numero, operacao in lote:
+        if operacao['ticker'] not in ids_ativos and operacao['ticker'] not in novos:
+            if operacao['tipo_ativo'] not in TIPOS_ATIVO:
+                _registrar_erro(relatorio, numero, f"ativo {operacao['ticker']} não cadastrado; informe tipo_ativo "
+                                                   f"({', '.join(TIPOS_ATIVO)}) para criá-lo")
+                continue
+            novos[operacao['ticker']] = operacao['tipo_ativo']
+        validas.append(operacao)
+
+    if novos:
+        db.execute(Ativo.__table__.insert(), [{'ticker': t, 'tipo_ativo': tipo} for t, tipo in novos.items()])
+        versoes.incrementar(db, 'ativos')
+        ids_ativos.update(db.query(Ativo.ticker, Ativo.id).filter(Ativo.ticker.in_(list(novos))).all())
+        relatorio['ativos_criados'].extend(novos)
+
+    if validas:
+        linhas = [{
+            'id_ticker': ids_ativos[op['ticker']], 'tipo_operacao': op['tipo_operacao'],
+            'data_operacao': op['data_operacao'], 'preco': op['preco'], 'quantidade': op['quantidade'],
+        } for op in validas]
+        db.execute(Operacao.__table__.insert(), linhas)
+        posicoes.registrar_operacoes(db, linhas)
+        resultados.invalidar(db, min(linha['data_operacao'] for linha in linhas))
+        versoes.incrementar(db, 'operacoes')
+    relatorio['importadas'] += len(validas)
+
+
+def _registrar_erro(relatorio, numero, mensagem):
+    relatorio['total_erros'] += 1
+    if len(relatorio['erros']) < MAX_ERROS_RELATORIO:
+        relatorio['erros'].append({'linha': numero, 'erro': mensagem})
+
+
+def importar_operacoes(db, linhas):
+    """
+    Importa operações a partir de um iterável de linhas (dicionários com ticker, tipo_operacao, data_operacao,
+    preco, quantidade e, para ativos ainda não cadastrados, tipo_ativo). As linhas são gravadas em lotes de
+    TAMANHO_LOTE, todos na mesma transação: ou o arquivo inteiro é importado, ou (em caso de erro, que é
+    relançado) nada é. Linhas inválidas são puladas e aparecem no relatório.
+    """
+    relatorio = {'importadas': 0, 'ativos_criados': [], 'total_erros': 0, 'erros': []}
+    # Todos os tickers cadastrados são resolvidos de uma vez
+    ids_ativos = dict(db.query(Ativo.ticker, Ativo.id).all())
+
+    lote = []
+    try:
+        # A linha 1 do arquivo é o cabeçalho
+        for numero, linha in enumerate(linhas, start=2):
+            try:
+                lote.append((numero, _validar_linha(linha)))
+            except ValueError as e:
+                _registrar_erro(relatorio, numero, str(e))
+                continue
+            if len(lote) >= TAMANHO_LOTE:
+                _gravar_lote(db, lote, ids_ativos, relatorio)
+                lote = []
+        if lote:
+            _gravar_lote(db, lote, ids_ativos, relatorio)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    relatorio['erros'].sort(key=lambda erro: erro['linha'])
+    return relatorio
@@ -1,23 +1,172 @@
-# migrate.py
-from SQL.database import init_db, get_db_session
-from SQL.models import Operacao
-
-def migrate_database():
-    session = get_db_session()
-    try:
-        # Para versões anteriores que usavam 'ativo_id' em vez de 'id_ticker'
-        operacoes = session.query(Operacao).all()
-        for op in operacoes:
-            if hasattr(op, 'ativo_id') and not hasattr(op, 'id_ticker'):
-                op.id_ticker = op.ativo_id
-        session.commit()
-        print("Migração concluída com sucesso!")
-    except Exception as e:
-        session.rollback()
-        print(f"Erro na migração: {e}")
-    finally:
-        session.remove()
+# SQL/migrate.py
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import inspect, select, text
+from sqlalchemy.dialects.sqlite import insert
+from .models import (Base, SchemaVersao, Ativo, Operacao, Posicao, ResultadoMensal, CustoMedio, ApuracaoResultado,
+                     VersaoDados, CdiDiario, CotacaoDiaria, AtualizacaoCotacao)
+
+# Migrações do esquema do banco, aplicadas em ordem na inicialização (init_db). As versões já aplicadas ficam
+# registradas na tabela schema_versao, e cada migração roda uma única vez por banco. Bancos anteriores a este
+# controle passam por todas elas: por isso cada migração confere o que já existe antes de alterar.
+#
+# Alterações em tabelas grandes devem ser feitas em SQL (sem carregar as linhas no Python) e, quando
+# reescrevem muitas linhas, em lotes (atualizar_em_lotes), com memória e tamanho de transação limitados.
+#
+# Para mudar o esquema: altere o modelo em models.py e acrescente uma migração no fim de MIGRACOES.
+
+TAMANHO_LOTE = 50_000
+_schema_versao = SchemaVersao.__table__
+
+
+def _criar_tabelas(conexao, *modelos):
+    # checkfirst: a tabela (com os índices declarados) só é criada se ainda não existir
+    for modelo in modelos:
+        modelo.__table__.create(bind=conexao, checkfirst=True)
+
+
+def _colunas(conexao, tabela):
+    return {coluna['name'] for coluna in inspect(conexao).get_columns(tabela)}
+
+
+def _progresso(versao, feitas, total, inicio):
+    percentual = feitas / total * 100 if total else 100
+    print(f"Migração {versao}: {feitas}/{total} linhas ({percentual:.0f}%, {time.perf_counter() - inicio:.1f} s)")
+
+
+def atualizar_em_lotes(engine, versao, tabela, atribuicoes, condicao="1", tamanho=TAMANHO_LOTE):
+    """
+    Executa 'UPDATE tabela SET atribuicoes WHERE condicao' em faixas de 'tamanho' rowids, cada uma na sua
+    transação, informando o progresso. A condição deve excluir as linhas já atualizadas, para que uma
+    migração interrompida possa ser retomada. Retorna o número de linhas alteradas.
+    """
+    with engine.connect() as conexao:
+        menor, maior = conexao.execute(text(f"SELECT min(rowid), max(rowid) FROM {tabela}")).one()
+    if menor is None:
+        return 0
+    total, alteradas, inicio = maior - menor + 1, 0, time.perf_counter()
+    for primeiro in range(menor, maior + 1, tamanho):
+        with engine.begin() as conexao:
+            alteradas += conexao.execute(
+                text(f"UPDATE {tabela} SET {atribuicoes} WHERE rowid BETWEEN :primeiro AND :ultimo AND ({condicao})"),
+                {"primeiro": primeiro, "ultimo": primeiro + tamanho - 1}
+            ).rowcount
+        _progresso(versao, min(primeiro + tamanho, maior + 1) - menor, total, inicio)
+    return alteradas
+
+
+# --- Migrações ---
+
+def _m1_tabelas_principais(engine):
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, Ativo, Operacao)
+
+
+def _m2_operacoes_id_ticker(engine):
+    # Versões antigas guardavam o ativo da operação em 'ativo_id'
+    with engine.begin() as conexao:
+        colunas = _colunas(conexao, 'operacoes')
+        if 'ativo_id' not in colunas:
+            return
+        if 'id_ticker' not in colunas:
+            conexao.execute(text("ALTER TABLE operacoes ADD COLUMN id_ticker INTEGER REFERENCES ativos (id)"))
+    atualizar_em_lotes(engine, 2, 'operacoes', "id_ticker = ativo_id", "id_ticker IS NULL")
+
+
+def _m3_historico_cotacoes(engine):
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, CotacaoDiaria, AtualizacaoCotacao)
+
+
+def _m4_indices_operacoes(engine):
+    # Em bancos existentes a tabela já estava criada sem os índices
+    with engine.begin() as conexao:
+        for indice in Operacao.__table__.indexes:
+            indice.create(bind=conexao, checkfirst=True)
+
+
+def _m5_posicoes(engine):
+    from .posicoes import popular_se_vazia
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, Posicao)
+    # Um INSERT ... SELECT agregado: o cálculo fica todo no SQLite
+    popular_se_vazia(engine)
+
+
+def _m6_resultados(engine):
+    # A apuração é calculada sob demanda na primeira consulta aos resultados
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, ResultadoMensal, CustoMedio, ApuracaoResultado)
+
+
+def _m7_cdi(engine):
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, CdiDiario)
+
+
+def _m8_versoes_dados(engine):
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, VersaoDados)
+
+
+MIGRACOES = [
+    (1, "Tabelas de ativos e operações", _m1_tabelas_principais),
+    (2, "Coluna id_ticker em operações de bancos antigos (ativo_id)", _m2_operacoes_id_ticker),
+    (3, "Histórico local de cotações", _m3_historico_cotacoes),
+    (4, "Índices das operações por ativo e por data", _m4_indices_operacoes),
+    (5, "Posições materializadas", _m5_posicoes),
+    (6, "Apuração de resultados pelo custo médio", _m6_resultados),
+    (7, "Série diária do CDI", _m7_cdi),
+    (8, "Versões dos conjuntos de dados", _m8_versoes_dados),
+]
+
+
+def versoes_aplicadas(engine):
+    with engine.begin() as conexao:
+        _criar_tabelas(conexao, SchemaVersao)
+        return {linha.versao: linha for linha in conexao.execute(select(_schema_versao))}
+
+
+def aplicar(engine):
+    """Aplica, em ordem, as migrações que ainda não foram aplicadas no banco. Retorna as versões aplicadas agora."""
+    banco_novo = 'ativos' not in inspect(engine).get_table_names()
+    aplicadas = versoes_aplicadas(engine)
+    novas = []
+    for versao, descricao, migracao in MIGRACOES:
+        if versao in aplicadas:
+            continue
+        inicio = time.perf_counter()
+        migracao(engine)
+        duracao = time.perf_counter() - inicio
+        with engine.begin() as conexao:
+            # Outro processo iniciando ao mesmo tempo pode ter registrado a mesma versão (as migrações são idempotentes)
+            conexao.execute(insert(_schema_versao).on_conflict_do_nothing(), {
+                'versao': versao, 'descricao': descricao, 'aplicada_em': datetime.now(), 'duracao': duracao})
+        if not banco_novo:
+            print(f"Migração {versao} aplicada ({descricao}) em {duracao:.2f} s")
+        novas.append(versao)
+
+    faltantes = set(Base.metadata.tables) - set(inspect(engine).get_table_names())
+    if faltantes:
+        raise RuntimeError(f"Tabelas do modelo sem migração: {', '.join(sorted(faltantes))}. Acrescente uma migração em SQL/migrate.py.")
+    return novas
+
 
 if __name__ == "__main__":
-    init_db()
-    migrate_database()
\ No newline at end of file
+    # Uso (a partir da pasta backend): python -m SQL.migrate [aplicar|status]
+    from . import database
+    comando = sys.argv[1] if len(sys.argv) > 1 else "aplicar"
+    if comando == "aplicar":
+        database.init_db()  # init_db aplica as migrações pendentes
+        print("Banco atualizado.")
+    elif comando == "status":
+        from sqlalchemy import create_engine
+        aplicadas = versoes_aplicadas(create_engine(f"sqlite:///{database.DB_ARQUIVO}"))
+        for versao, descricao, _ in MIGRACOES:
+            registro = aplicadas.get(versao)
+            situacao = f"aplicada em {registro.aplicada_em:%Y-%m-%d %H:%M:%S}" if registro else "pendente"
+            print(f"{versao:>3}  {descricao:<60} {situacao}")
+    else:
+        print(f"Comando desconhecido: {comando}. Use 'aplicar' ou 'status'.")
+        sys.exit(2)
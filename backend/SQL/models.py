@@ -1,5 +1,5 @@
 # SQL/models.py
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Numeric, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -24,4 +24,97 @@ class Operacao(Base):
     preco = Column(Numeric(10, 2), nullable=False)
     quantidade = Column(Integer, nullable=False)
 
-    ativo = relationship("Ativo", back_populates="operacoes")
\ No newline at end of file
+    ativo = relationship("Ativo", back_populates="operacoes")
+
+    __table_args__ = (
+        # Consultas por ativo (posições, histórico do ativo) e por período (listagem, exportação)
+        Index('ix_operacoes_id_ticker_data', 'id_ticker', 'data_operacao'),
+        Index('ix_operacoes_data_operacao', 'data_operacao'),
+    )
+
+class Posicao(Base):
+    __tablename__ = 'posicoes'
+
+    # Posição consolidada de cada ativo, atualizada na mesma transação de cada escrita em operações
+    # (ver SQL/posicoes.py). Ativos sem operações não têm linha nesta tabela.
+    id_ticker = Column(Integer, ForeignKey('ativos.id'), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    quantidade_comprada = Column(Integer, nullable=False, default=0)
+    quantidade_vendida = Column(Integer, nullable=False, default=0)
+    total_comprado = Column(Numeric(14, 2), nullable=False, default=0)
+    total_vendido = Column(Numeric(14, 2), nullable=False, default=0)
+    preco_medio = Column(Numeric(14, 4))  # Custo médio de compra: total_comprado / quantidade_comprada
+    numero_operacoes = Column(Integer, nullable=False, default=0)
+    primeira_operacao = Column(Date)
+    ultima_operacao = Column(Date)
+
+class ResultadoMensal(Base):
+    __tablename__ = 'resultados_mensais'
+
+    # Resultado realizado (custo médio) de cada mês já encerrado, por tipo de ativo (ver SQL/resultados.py)
+    mes = Column(String(7), primary_key=True)  # 'AAAA-MM'
+    tipo_ativo = Column(String(4), primary_key=True)
+    total_vendas = Column(Float, nullable=False, default=0)
+    custo_vendas = Column(Float, nullable=False, default=0)
+    lucro = Column(Float, nullable=False, default=0)
+
+class CustoMedio(Base):
+    __tablename__ = 'custos_medios'
+
+    # Situação de cada ativo ao fim do último mês apurado, ponto de partida da apuração dos meses seguintes
+    id_ticker = Column(Integer, ForeignKey('ativos.id'), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    custo_total = Column(Float, nullable=False, default=0)
+    lucro_realizado = Column(Float, nullable=False, default=0)
+
+class ApuracaoResultado(Base):
+    __tablename__ = 'apuracao_resultado'
+
+    # Linha única com o último mês encerrado cujo resultado já está gravado
+    id = Column(Integer, primary_key=True)
+    apurado_ate = Column(String(7), nullable=False)  # 'AAAA-MM'
+
+class SchemaVersao(Base):
+    __tablename__ = 'schema_versao'
+    # Migrações do esquema já aplicadas neste banco (ver SQL/migrate.py)
+
+    versao = Column(Integer, primary_key=True)
+    descricao = Column(String(200), nullable=False)
+    aplicada_em = Column(DateTime, nullable=False)
+    duracao = Column(Float, nullable=False)  # segundos
+
+class VersaoDados(Base):
+    __tablename__ = 'versoes_dados'
+
+    # Contador de alterações de cada conjunto de dados ('ativos', 'operacoes'), incrementado na mesma
+    # transação de cada escrita; identifica a versão das respostas da API (ETag e Last-Modified)
+    nome = Column(String(20), primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    alterado_em = Column(DateTime, nullable=False)
+
+class CdiDiario(Base):
+    __tablename__ = 'cdi_diario'
+
+    # Taxa DI diária (% ao dia, série 11 do SGS/BCB), guardada localmente e complementada de forma incremental
+    data = Column(Date, primary_key=True)
+    taxa = Column(Float, nullable=False)
+
+class CotacaoDiaria(Base):
+    __tablename__ = 'cotacoes_diarias'
+
+    # Barras diárias (sem ajuste) e eventos de cada ticker, guardadas localmente para atualizações incrementais
+    ticker = Column(String(10), primary_key=True)
+    data = Column(Date, primary_key=True)
+    abertura = Column(Float)
+    maxima = Column(Float)
+    minima = Column(Float)
+    fechamento = Column(Float, nullable=False)
+    volume = Column(Float)
+    dividendos = Column(Float, nullable=False, default=0)
+    desdobramentos = Column(Float, nullable=False, default=0)
+
+class AtualizacaoCotacao(Base):
+    __tablename__ = 'atualizacoes_cotacoes'
+
+    ticker = Column(String(10), primary_key=True)
+    atualizado_em = Column(DateTime, nullable=False)  # Última vez em que o histórico foi sincronizado com o provedor
\ No newline at end of file
@@ -0,0 +1,171 @@
+# SQL/posicoes.py
+import sys
+from sqlalchemy import func, case, select, update, delete
+from sqlalchemy.dialects.sqlite import insert
+from .models import Ativo, Operacao, Posicao
+
+# Campos da posição que são somas das operações e, portanto, podem ser atualizados por diferenças
+CAMPOS_SOMADOS = ('quantidade', 'quantidade_comprada', 'quantidade_vendida',
+                  'total_comprado', 'total_vendido', 'numero_operacoes')
+# Diferença tolerada na verificação dos campos em reais (arredondamento dos centavos)
+TOLERANCIA = 0.01
+
+_posicoes = Posicao.__table__
+
+
+def _consulta_agregada():
+    """Posições calculadas diretamente das operações, em uma única consulta agregada (a fonte da verdade)."""
+    eh_compra = Operacao.tipo_operacao == 'Comprar'
+    eh_venda = Operacao.tipo_operacao == 'Vender'
+    valor = Operacao.preco * Operacao.quantidade
+
+    return select(
+        Operacao.id_ticker.label('id_ticker'),
+        func.sum(case((eh_compra, Operacao.quantidade), (eh_venda, -Operacao.quantidade), else_=0)).label('quantidade'),
+        func.sum(case((eh_compra, Operacao.quantidade), else_=0)).label('quantidade_comprada'),
+        func.sum(case((eh_venda, Operacao.quantidade), else_=0)).label('quantidade_vendida'),
+        func.sum(case((eh_compra, valor), else_=0)).label('total_comprado'),
+        func.sum(case((eh_venda, valor), else_=0)).label('total_vendido'),
+        func.count(Operacao.id).label('numero_operacoes'),
+        func.min(Operacao.data_operacao).label('primeira_operacao'),
+        func.max(Operacao.data_operacao).label('ultima_operacao'),
+    ).join(Ativo, Operacao.id_ticker == Ativo.id).group_by(Operacao.id_ticker)
+
+
+def _atualizar_preco_medio(db, ids=None):
+    stmt = update(_posicoes).values(preco_medio=case(
+        (_posicoes.c.quantidade_comprada > 0, _posicoes.c.total_comprado / _posicoes.c.quantidade_comprada),
+        else_=None
+    ))
+    if ids is not None:
+        stmt = stmt.where(_posicoes.c.id_ticker.in_(ids))
+    db.execute(stmt)
+
+
+def registrar_operacoes(db, operacoes, sinal=1):
+    """
+    Aplica à tabela de posições o efeito de operações incluídas (sinal=1) ou removidas (sinal=-1).
+    'operacoes' é um iterável de dicionários com id_ticker, tipo_operacao, data_operacao, preco e quantidade.
+    Como na consulta agregada, só 'Comprar' e 'Vender' alteram as quantidades e os totais.
+    As diferenças são somadas por ativo e gravadas com um upsert por lote; deve ser chamada na mesma
+    transação da escrita em operações (o commit fica a cargo de quem chama). Na remoção, a escrita em
+    operações já deve ter sido executada, pois as datas da primeira/última operação são relidas do índice.
+    """
+    deltas = {}
+    for op in operacoes:
+        delta = deltas.get(op['id_ticker'])
+        if delta is None:
+            delta = deltas[op['id_ticker']] = dict.fromkeys(CAMPOS_SOMADOS, 0)
+            delta.update(id_ticker=op['id_ticker'], primeira_operacao=op['data_operacao'],
+                         ultima_operacao=op['data_operacao'])
+        quantidade = int(op['quantidade'])
+        valor = round(float(op['preco']) * quantidade, 2)
+        if op['tipo_operacao'] == 'Comprar':
+            delta['quantidade'] += quantidade
+            delta['quantidade_comprada'] += quantidade
+            delta['total_comprado'] += valor
+        elif op['tipo_operacao'] == 'Vender':
+            delta['quantidade'] -= quantidade
+            delta['quantidade_vendida'] += quantidade
+            delta['total_vendido'] += valor
+        delta['numero_operacoes'] += 1
+        delta['primeira_operacao'] = min(delta['primeira_operacao'], op['data_operacao'])
+        delta['ultima_operacao'] = max(delta['ultima_operacao'], op['data_operacao'])
+    if not deltas:
+        return
+
+    linhas = list(deltas.values())
+    for linha in linhas:
+        for campo in CAMPOS_SOMADOS:
+            linha[campo] *= sinal
+
+    stmt = insert(_posicoes)
+    novos_valores = {campo: _posicoes.c[campo] + stmt.excluded[campo] for campo in CAMPOS_SOMADOS}
+    if sinal > 0:
+        novos_valores['primeira_operacao'] = func.min(_posicoes.c.primeira_operacao, stmt.excluded.primeira_operacao)
+        novos_valores['ultima_operacao'] = func.max(_posicoes.c.ultima_operacao, stmt.excluded.ultima_operacao)
+    db.execute(stmt.on_conflict_do_update(index_elements=['id_ticker'], set_=novos_valores), linhas)
+
+    ids = list(deltas)
+    if sinal < 0:
+        # Ao remover, as datas extremas são relidas das operações restantes (busca no índice id_ticker, data)
+        db.execute(delete(_posicoes).where(_posicoes.c.id_ticker.in_(ids), _posicoes.c.numero_operacoes <= 0))
+        do_ativo = Operacao.id_ticker == _posicoes.c.id_ticker
+        db.execute(update(_posicoes).where(_posicoes.c.id_ticker.in_(ids)).values(
+            primeira_operacao=select(func.min(Operacao.data_operacao)).where(do_ativo).scalar_subquery(),
+            ultima_operacao=select(func.max(Operacao.data_operacao)).where(do_ativo).scalar_subquery(),
+        ))
+    _atualizar_preco_medio(db, ids)
+
+
+def remover_ativos(db, ids):
+    """Remove as posições dos ativos excluídos (na mesma transação da exclusão)."""
+    db.execute(delete(_posicoes).where(_posicoes.c.id_ticker.in_(ids)))
+
+
+def reconstruir(db):
+    """Recalcula toda a tabela de posições a partir das operações. O commit fica a cargo de quem chama."""
+    db.execute(delete(_posicoes))
+    consulta = _consulta_agregada()
+    db.execute(insert(_posicoes).from_select([c.name for c in consulta.selected_columns], consulta))
+    _atualizar_preco_medio(db)
+
+
+def verificar(db):
+    """
+    Compara a tabela de posições com o cálculo a partir das operações.
+    Retorna a lista de divergências ({'id_ticker', 'campo', 'esperado', 'atual'}); vazia se estiver tudo certo.
+    """
+    campos = CAMPOS_SOMADOS + ('primeira_operacao', 'ultima_operacao')
+    esperadas = {linha.id_ticker: linha._mapping for linha in db.execute(_consulta_agregada())}
+    atuais = {linha.id_ticker: linha._mapping for linha in db.execute(select(_posicoes))}
+
+    divergencias = []
+    for id_ticker in sorted(esperadas.keys() | atuais.keys()):
+        esperada, atual = esperadas.get(id_ticker), atuais.get(id_ticker)
+        if esperada is None or atual is None:
+            divergencias.append({'id_ticker': id_ticker, 'campo': 'posicao',
+                                 'esperado': 'presente' if esperada is not None else 'ausente',
+                                 'atual': 'presente' if atual is not None else 'ausente'})
+            continue
+        for campo in campos:
+            valor_esperado, valor_atual = esperada[campo], atual[campo]
+            if campo.startswith('total_'):
+                iguais = abs(float(valor_esperado or 0) - float(valor_atual or 0)) < TOLERANCIA
+            else:
+                iguais = valor_esperado == valor_atual
+            if not iguais:
+                divergencias.append({'id_ticker': id_ticker, 'campo': campo,
+                                     'esperado': valor_esperado, 'atual': valor_atual})
+    return divergencias
+
+
+def popular_se_vazia(engine):
+    """Preenche a tabela de posições em bancos que já tinham operações antes de ela existir."""
+    with engine.begin() as conexao:
+        vazia = conexao.execute(select(func.count()).select_from(_posicoes)).scalar() == 0
+        if vazia and conexao.execute(select(Operacao.id).limit(1)).first() is not None:
+            reconstruir(conexao)
+
+
+if __name__ == "__main__":
+    # Uso (a partir da pasta backend): python -m SQL.posicoes [verificar|reconstruir]
+    from .database import get_db_session
+    comando = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    session = get_db_session()
+    try:
+        if comando == "reconstruir":
+            reconstruir(session)
+            session.commit()
+            print("Posições reconstruídas a partir das operações.")
+        elif comando == "verificar":
+            divergencias = verificar(session)
+            for d in divergencias:
+                print(f"Ativo {d['id_ticker']}: {d['campo']} esperado {d['esperado']}, encontrado {d['atual']}")
+            print("Nenhuma divergência encontrada." if not divergencias else f"{len(divergencias)} divergência(s).")
+            sys.exit(1 if divergencias else 0)
+        else:
+            print(f"Comando desconhecido: {comando}. Use 'verificar' ou 'reconstruir'.")
+            sys.exit(2)
+    finally:
+        session.remove()
@@ -0,0 +1,113 @@
+# SQL/resultados.py
+from datetime import date
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from calculos import resultado
+from .models import Ativo, Operacao, ResultadoMensal, CustoMedio, ApuracaoResultado
+from . import database
+
+
+def _mes_anterior(mes: date) -> str:
+    return (date(mes.year - 1, 12, 1) if mes.month == 1 else date(mes.year, mes.month - 1, 1)).strftime('%Y-%m')
+
+
+def _primeiro_dia_seguinte(mes: str) -> date:
+    ano, numero = map(int, mes.split('-'))
+    return date(ano + 1, 1, 1) if numero == 12 else date(ano, numero + 1, 1)
+
+
+def _operacoes(executor, inicio=None):
+    # Em Core, para servir tanto à sessão da requisição quanto à conexão da gravação (_apurar_e_gravar)
+    consulta = select(Operacao.id_ticker, Ativo.tipo_ativo, Operacao.tipo_operacao, Operacao.data_operacao,
+                      Operacao.preco, Operacao.quantidade) \
+        .join(Ativo, Operacao.id_ticker == Ativo.id)
+    if inicio is not None:
+        consulta = consulta.where(Operacao.data_operacao >= inicio)
+    return executor.execute(consulta.order_by(Operacao.data_operacao, Operacao.id)).all()
+
+
+def _ler_apuracao(executor):
+    """Retorna (controle, estado, meses) da apuração gravada; controle é None se não houver nenhuma."""
+    controle = executor.execute(select(ApuracaoResultado.__table__)).first()
+    if controle is None:
+        return None, {}, {}
+    estado = {linha.id_ticker: {'quantidade': linha.quantidade, 'custo_total': linha.custo_total,
+                                'lucro_realizado': linha.lucro_realizado}
+              for linha in executor.execute(select(CustoMedio.__table__))}
+    meses = {(linha.mes, linha.tipo_ativo): {'total_vendas': linha.total_vendas, 'custo_vendas': linha.custo_vendas,
+                                             'lucro': linha.lucro}
+             for linha in executor.execute(select(ResultadoMensal.__table__))}
+    return controle, estado, meses
+
+
+def _apurar_e_gravar(conexao, inicio_mes_atual, apurado_ate):
+    """
+    Apura os meses encerrados ainda não gravados e grava o resultado deles e a situação dos ativos ao fim
+    de 'apurado_ate'. Deve rodar numa transação BEGIN IMMEDIATE (database.transacao_imediata): as escritas
+    em operações ficam bloqueadas da leitura até o commit, e a gravação não pode partir de dados desatualizados.
+    Retorna (estado, meses).
+    """
+    controle, estado, meses = _ler_apuracao(conexao)
+    inicio = _primeiro_dia_seguinte(controle.apurado_ate) if controle is not None else None
+    if controle is not None and controle.apurado_ate == apurado_ate:
+        return estado, meses  # Outra requisição gravou enquanto esta esperava a transação
+
+    encerradas = [op for op in _operacoes(conexao, inicio) if op.data_operacao < inicio_mes_atual]
+    novos_meses = resultado.apurar(encerradas, estado)
+    if novos_meses:
+        stmt = insert(ResultadoMensal.__table__)
+        conexao.execute(stmt.on_conflict_do_update(
+            index_elements=['mes', 'tipo_ativo'],
+            set_={c: stmt.excluded[c] for c in ('total_vendas', 'custo_vendas', 'lucro')}
+        ), [{'mes': mes, 'tipo_ativo': tipo, **valores} for (mes, tipo), valores in novos_meses.items()])
+    conexao.execute(delete(CustoMedio))
+    if estado:
+        conexao.execute(insert(CustoMedio.__table__), [{'id_ticker': id_ticker, **valores} for id_ticker, valores in estado.items()])
+    stmt = insert(ApuracaoResultado.__table__).values(id=1, apurado_ate=apurado_ate)
+    conexao.execute(stmt.on_conflict_do_update(index_elements=['id'], set_={'apurado_ate': stmt.excluded.apurado_ate}))
+    meses.update(novos_meses)
+    return estado, meses
+
+
+def apurar_resultados(db, hoje: date = None):
+    """
+    Retorna (meses, estado): o resultado realizado por mês e tipo de ativo e a situação atual de cada ativo
+    (quantidade, custo total e lucro realizado pelo custo médio).
+    Os meses encerrados ficam gravados no banco junto com a situação dos ativos ao fim do último deles,
+    então cada chamada só percorre as operações posteriores a esse ponto (normalmente, as do mês corrente).
+    Só depois de uma escrita retroativa (que descarta a apuração, ver invalidar) ou da virada do mês a
+    chamada grava, e então numa transação própria que reserva a escrita antes de ler as operações.
+    """
+    hoje = hoje or date.today()
+    inicio_mes_atual = hoje.replace(day=1)
+    apurado_ate = _mes_anterior(inicio_mes_atual)
+
+    controle, estado, meses_gravados = _ler_apuracao(db)
+    if controle is None or controle.apurado_ate != apurado_ate:
+        with database.transacao_imediata(db.get_bind()) as conexao:
+            estado, meses_gravados = _apurar_e_gravar(conexao, inicio_mes_atual, apurado_ate)
+
+    # O mês corrente é sempre recalculado, e nunca gravado
+    meses_correntes = resultado.apurar(_operacoes(db, inicio_mes_atual), estado)
+
+    meses = [{'mes': mes, 'tipo_ativo': tipo, **valores} for (mes, tipo), valores in sorted(meses_gravados.items())]
+    meses += [{'mes': mes, 'tipo_ativo': tipo, **valores} for (mes, tipo), valores in sorted(meses_correntes.items())]
+    for mes in meses:
+        mes['isento'] = resultado.isento(mes['tipo_ativo'], mes['total_vendas'])
+    return meses, estado
+
+
+def invalidar(db, *datas):
+    """
+    Descarta a apuração gravada quando uma escrita atinge um mês já encerrado (data None = qualquer mês),
+    para que a próxima leitura refaça a apuração desde o início. Escritas no mês corrente não invalidam nada.
+    Deve ser chamada na mesma transação da escrita em operações.
+    """
+    controle = db.get(ApuracaoResultado, 1)
+    if controle is None:
+        return
+    if any(data is None or data.strftime('%Y-%m') <= controle.apurado_ate for data in datas):
+        db.execute(delete(ResultadoMensal))
+        db.execute(delete(CustoMedio))
+        db.execute(delete(ApuracaoResultado))
+        db.expunge(controle)
@@ -0,0 +1,25 @@
+# SQL/versoes.py
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from .models import VersaoDados
+
+_versoes = VersaoDados.__table__
+
+
+def incrementar(db, *nomes):
+    """
+    Registra uma alteração nos conjuntos de dados informados ('ativos', 'operacoes').
+    Deve ser chamada na mesma transação da escrita (o commit fica a cargo de quem chama).
+    """
+    agora = datetime.now()
+    stmt = insert(_versoes)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=['nome'],
+        set_={'versao': _versoes.c.versao + 1, 'alterado_em': stmt.excluded.alterado_em}
+    ), [{'nome': nome, 'versao': 1, 'alterado_em': agora} for nome in nomes])
+
+
+def ler(db):
+    """Retorna {nome: (versao, alterado_em)}; conjuntos que nunca foram alterados ficam de fora."""
+    return {linha.nome: (linha.versao, linha.alterado_em) for linha in db.execute(select(_versoes))}
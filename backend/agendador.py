@@ -0,0 +1,144 @@
+# backend/agendador.py
+import asyncio
+import anyio
+from datetime import datetime, time, timedelta, timezone
+from backend import metricas
+from backend.caching import market_data_cache
+from backend.concorrencia import chamar_provedor
+from backend.config import (AGENDADOR_INTERVALO_PREGAO, AGENDADOR_INTERVALO_FORA_PREGAO,
+                            B3_ABERTURA, B3_FECHAMENTO, AGENDADOR_HORARIO_CDI,
+                            BACKUP_AUTOMATICO, AGENDADOR_HORARIO_BACKUP)
+from SQL import database, models, backup
+from controllers import yahoo_finance, api_bcb
+
+# Tarefas periódicas que rodam dentro do processo da API (iniciadas pelo lifespan em api.py), para que as
+# requisições dos usuários encontrem o cache de cotações e o CDI já atualizados.
+
+try:
+    from zoneinfo import ZoneInfo
+    FUSO_B3 = ZoneInfo("America/Sao_Paulo")
+except Exception:
+    # Sem a base de fusos do sistema: Brasília não tem horário de verão desde 2019
+    FUSO_B3 = timezone(timedelta(hours=-3), "BRT")
+
+metricas.descrever('carteira_agendador_execucoes_total', 'counter', 'Execuções das tarefas do agendador, por resultado.')
+
+# Com o cache compartilhado (vários workers), cada rodada de uma tarefa é reservada por este tempo (em segundos)
+# pelo primeiro worker que a inicia; os demais pulam a rodada
+RESERVA_RODADA = 60
+
+
+def _horario(texto: str) -> time:
+    horas, minutos = map(int, texto.split(':'))
+    return time(horas, minutos)
+
+
+def agora_b3() -> datetime:
+    return datetime.now(FUSO_B3)
+
+
+def pregao_aberto(momento: datetime) -> bool:
+    """Indica se a B3 está em horário de negociação (dias úteis; feriados não são considerados)."""
+    return momento.weekday() < 5 and _horario(B3_ABERTURA) <= momento.time() < _horario(B3_FECHAMENTO)
+
+
+def espera_cotacoes(momento: datetime) -> float:
+    """
+    Segundos até a próxima atualização das cotações: o intervalo curto durante o pregão e o longo fora dele,
+    mas sem passar da abertura do próximo pregão (que tem sempre uma atualização logo no início).
+    """
+    if pregao_aberto(momento):
+        return AGENDADOR_INTERVALO_PREGAO
+    abertura = datetime.combine(momento.date(), _horario(B3_ABERTURA), tzinfo=momento.tzinfo)
+    if abertura <= momento:
+        abertura += timedelta(days=1)
+    while abertura.weekday() >= 5:
+        abertura += timedelta(days=1)
+    return max(min(AGENDADOR_INTERVALO_FORA_PREGAO, (abertura - momento).total_seconds()), 1)
+
+
+def _espera_diaria(momento: datetime, horario: str) -> float:
+    proxima = datetime.combine(momento.date(), _horario(horario), tzinfo=momento.tzinfo)
+    if proxima <= momento:
+        proxima += timedelta(days=1)
+    return (proxima - momento).total_seconds()
+
+
+def espera_cdi(momento: datetime) -> float:
+    """Segundos até o próximo horário diário de atualização do CDI."""
+    return _espera_diaria(momento, AGENDADOR_HORARIO_CDI)
+
+
+def espera_backup(momento: datetime) -> float:
+    """Segundos até o próximo horário diário de backup do banco."""
+    return _espera_diaria(momento, AGENDADOR_HORARIO_BACKUP)
+
+
+def atualizar_cotacoes():
+    """Sincroniza com o provedor as cotações de todos os ativos cadastrados e renova o cache de cada um."""
+    session = database.get_db_session()
+    try:
+        tickers = [ticker for (ticker,) in session.query(models.Ativo.ticker).order_by(models.Ativo.ticker)]
+    finally:
+        session.remove()
+    if tickers:
+        _, faltantes = yahoo_finance.get_ativos_info_batch(tickers, forcar=True)
+        if faltantes:
+            print(f"Agendador: não foi possível atualizar as cotações de {', '.join(faltantes)}")
+
+
+def atualizar_cdi():
+    """Baixa as taxas do CDI publicadas desde a última atualização e renova o índice em cache."""
+    api_bcb.recarregar_indice_cdi()
+
+
+def fazer_backup():
+    """Backup online do banco, em passos (as requisições continuam sendo atendidas durante a cópia)."""
+    arquivo = backup.fazer_backup()
+    if arquivo:
+        print(f"Agendador: backup criado em {arquivo}")
+
+
+async def _executar(nome, funcao):
+    reservar = getattr(market_data_cache, 'reservar', None)
+    # A reserva é uma escrita no cache em disco: fora do event loop
+    if reservar is not None and not await anyio.to_thread.run_sync(reservar, ('agendador', nome), RESERVA_RODADA):
+        metricas.incrementar('carteira_agendador_execucoes_total', tarefa=nome, resultado='outro_processo')
+        return
+    try:
+        await chamar_provedor(funcao)
+        metricas.incrementar('carteira_agendador_execucoes_total', tarefa=nome, resultado='ok')
+    except Exception as e:
+        # Uma falha não interrompe o agendamento: a tarefa roda de novo no próximo horário
+        metricas.incrementar('carteira_agendador_execucoes_total', tarefa=nome, resultado='erro')
+        print(f"Agendador: erro na tarefa '{nome}': {e}")
+
+
+async def _ciclo(nome, funcao, espera, imediato=True):
+    """
+    Executa a tarefa a cada espera(agora) segundos, até ser cancelada; com imediato=True, também logo no início.
+    """
+    if not imediato:
+        await asyncio.sleep(espera(agora_b3()))
+    while True:
+        await _executar(nome, funcao)
+        await asyncio.sleep(espera(agora_b3()))
+
+
+def iniciar():
+    """Inicia as tarefas periódicas no event loop atual; retorna as tasks, para serem canceladas em parar()."""
+    tarefas = [
+        asyncio.create_task(_ciclo('cotacoes', atualizar_cotacoes, espera_cotacoes), name='agendador-cotacoes'),
+        asyncio.create_task(_ciclo('cdi', atualizar_cdi, espera_cdi), name='agendador-cdi'),
+    ]
+    if BACKUP_AUTOMATICO:
+        # O backup só roda no horário marcado, e não a cada reinício da API
+        tarefas.append(asyncio.create_task(_ciclo('backup', fazer_backup, espera_backup, imediato=False),
+                                           name='agendador-backup'))
+    return tarefas
+
+
+async def parar(tarefas):
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
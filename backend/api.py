@@ -1,16 +1,35 @@
 # backend/api.py
 
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, Body
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Body, Query, UploadFile, File, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+import base64
+import csv
+import os
+import tempfile
+import time
+import anyio
 import pandas as pd
 
 # Imports da lógica existente, com os caminhos relativos corretos
-from SQL import models, database
-# O arquivo de backup não é chamado pela API diretamente, mas pode ser mantido para scripts manuais
+from SQL import models, database, consultas, importacao, exportacao, cotacoes, posicoes, resultados, versoes, backup
 # A lógica de utilities foi removida conforme solicitado
 from controllers import yahoo_finance, api_bcb
+from controllers.erros import DadosNaoEncontrados, ErroProvedor
+from calculos import evolucao, series, resultado
+from backend import metricas, agendador, perfil
+from backend.caching import market_data_cache, infrequent_data_cache
+from backend.concorrencia import chamar_provedor
+from backend.respostas import RespostaJSON, gerar_etag, cabecalhos_validacao, nao_modificado, resposta_304
+from backend.config import AGENDADOR_ATIVO, PERFIL_ATIVO
 from pydantic import BaseModel
 
 # Inicializa o banco de dados na inicialização da API
@@ -28,7 +47,7 @@ class Ativo(AtivoBase):
 
 class OperacaoBase(BaseModel):
     id_ticker: int
-    tipo_operacao: str
+    tipo_operacao: Literal['Comprar', 'Vender']
     data_operacao: date
     preco: float
     quantidade: int
@@ -39,33 +58,80 @@ class Operacao(OperacaoBase):
         orm_mode = True
 
 # --- Configuração da Aplicação Principal ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O agendador mantém cotações e CDI aquecidos em segundo plano enquanto a API estiver no ar
+    tarefas = agendador.iniciar() if AGENDADOR_ATIVO else []
+    yield
+    await agendador.parar(tarefas)
+
 app = FastAPI(
     title="API da Carteira de Investimentos",
     description="Backend para a aplicação de gestão de portfólio.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Respostas grandes (listagens e dashboard) são comprimidas quando o cliente aceita gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+if PERFIL_ATIVO:
+    # Adicionado por último para ser o mais externo: mede a requisição inteira e o tamanho já comprimido
+    app.add_middleware(perfil.MiddlewarePerfil)
 
 # --- Dependência para obter a sessão do banco ---
 def get_db():
-    db = database.get_db_session()
+    # Sessão simples, e não a scoped_session: o FastAPI pode executar a abertura, o endpoint e o fechamento da
+    # dependência em threads diferentes do threadpool, e o remove() da scoped_session só alcança a sessão da
+    # thread que o chama (a do endpoint ficava com a conexão presa até ser coletada)
+    db = database.get_db_session()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Endpoints assíncronos (dashboard e dados de mercado) usam uma sessão aiosqlite, sem ocupar o threadpool
+async def get_async_db():
+    db = database.get_async_session()
     try:
         yield db
     finally:
-        db.remove()
+        await db.close()
+
+# --- Respostas condicionais ---
+# As leituras pesadas enviam uma ETag calculada da versão dos dados de que dependem; se o cliente já tem
+# essa versão (If-None-Match), a resposta é um 304 sem corpo e nada é recalculado.
+def _validacao(versoes_lidas, nomes, mercado=False, *extras):
+    """
+    Retorna (etag, modificado_em) de uma resposta que depende dos conjuntos de dados 'nomes' (ver SQL/versoes.py)
+    e, com mercado=True, também das cotações e do CDI em cache. Nesse caso a ETag muda a cada valor novo no
+    cache e, no máximo, a cada TTL do cache de mercado, e não há Last-Modified.
+    """
+    partes = [versoes_lidas.get(nome, (0, None))[0] for nome in nomes]
+    datas = [versoes_lidas[nome][1] for nome in nomes if nome in versoes_lidas]
+    modificado_em = max(datas) if datas else None
+    if mercado:
+        partes += [market_data_cache.geracao, infrequent_data_cache.geracao,
+                   int(time.time() // market_data_cache.ttl), date.today()]
+        modificado_em = None
+    return gerar_etag(*partes, *extras), modificado_em
 
 # --- Roteadores para organizar os endpoints ---
 router_ativos = APIRouter(prefix="/api/ativos", tags=["Ativos"])
 router_operacoes = APIRouter(prefix="/api/operacoes", tags=["Operações"])
 router_dashboard = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 router_market_data = APIRouter(prefix="/api/market-data", tags=["Dados de Mercado Externo"])
+router_monitoramento = APIRouter(prefix="/api", tags=["Monitoramento"])
 
 
 # =================================================================
 # === ENDPOINTS PARA ATIVOS =======================================
 # =================================================================
 @router_ativos.get("/", response_model=List[Ativo])
-def listar_ativos(db: Session = Depends(get_db)):
-    return db.query(models.Ativo).order_by(models.Ativo.ticker).all()
+def listar_ativos(request: Request, db: Session = Depends(get_db)):
+    etag, modificado_em = _validacao(versoes.ler(db), ['ativos'])
+    if nao_modificado(request, etag, modificado_em):
+        return resposta_304(etag, modificado_em)
+    ativos = db.query(models.Ativo.id, models.Ativo.ticker, models.Ativo.tipo_ativo).order_by(models.Ativo.ticker).all()
+    return RespostaJSON([dict(ativo._mapping) for ativo in ativos], headers=cabecalhos_validacao(etag, modificado_em))
 
 @router_ativos.post("/", response_model=Ativo, status_code=201)
 def criar_ativo(ativo: AtivoBase, db: Session = Depends(get_db)):
@@ -73,6 +139,7 @@ def criar_ativo(ativo: AtivoBase, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Este ticker já está cadastrado!")
     novo_ativo = models.Ativo(**ativo.dict())
     db.add(novo_ativo)
+    versoes.incrementar(db, 'ativos')
     db.commit()
     db.refresh(novo_ativo)
     return novo_ativo
@@ -83,6 +150,9 @@ def deletar_ativos(ids: List[int] = Body(..., embed=True), db: Session = Depends
         raise HTTPException(status_code=400, detail="Nenhuma ID fornecida.")
     query = db.query(models.Ativo).filter(models.Ativo.id.in_(ids))
     deleted_count = query.delete(synchronize_session=False)
+    posicoes.remover_ativos(db, ids)
+    resultados.invalidar(db, None)
+    versoes.incrementar(db, 'ativos', 'operacoes')
     db.commit()
     if deleted_count == 0:
         raise HTTPException(status_code=404, detail="Nenhum ativo encontrado com os IDs fornecidos.")
@@ -91,18 +161,104 @@ def deletar_ativos(ids: List[int] = Body(..., embed=True), db: Session = Depends
 # =================================================================
 # === ENDPOINTS PARA OPERAÇÕES ====================================
 # =================================================================
+# Colunas que podem ser pedidas na listagem de operações (parâmetro "campos")
+COLUNAS_OPERACAO = {
+    "id": models.Operacao.id, "ticker": models.Ativo.ticker, "tipo_ativo": models.Ativo.tipo_ativo,
+    "tipo_operacao": models.Operacao.tipo_operacao, "data_operacao": models.Operacao.data_operacao,
+    "preco": models.Operacao.preco, "quantidade": models.Operacao.quantidade,
+}
+
+def _codificar_cursor(data_operacao: date, operacao_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{data_operacao.isoformat()}|{operacao_id}".encode()).decode()
+
+def _decodificar_cursor(cursor: str):
+    try:
+        data_texto, id_texto = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(data_texto), int(id_texto)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+def _filtros_operacoes(data_inicio: date, data_fim: date, ticker: Optional[str], tipo_operacao: Optional[str]):
+    filtros = [models.Operacao.data_operacao.between(data_inicio, data_fim)]
+    if ticker:
+        filtros.append(models.Ativo.ticker == ticker)
+    if tipo_operacao:
+        filtros.append(models.Operacao.tipo_operacao == tipo_operacao)
+    return filtros
+
 @router_operacoes.get("/")
-def listar_operacoes(data_inicio: date, data_fim: date, db: Session = Depends(get_db)):
-    operacoes = db.query(models.Operacao, models.Ativo) \
+def listar_operacoes(request: Request, data_inicio: date, data_fim: date, limite: int = Query(100, ge=1, le=1000),
+                     cursor: Optional[str] = None, ticker: Optional[str] = None, tipo_operacao: Optional[str] = None,
+                     campos: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Lista as operações do período, da mais recente para a mais antiga, em páginas de até "limite" itens.
+    A paginação é por cursor (keyset) sobre (data_operacao, id): envie o "proximo_cursor" da resposta
+    para obter a página seguinte. "campos" aceita uma lista separada por vírgulas das colunas desejadas.
+    """
+    selecionados = list(COLUNAS_OPERACAO) if not campos else [c.strip() for c in campos.split(",") if c.strip()]
+    invalidos = [c for c in selecionados if c not in COLUNAS_OPERACAO]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}.")
+
+    etag, modificado_em = _validacao(versoes.ler(db), ['ativos', 'operacoes'])
+    if nao_modificado(request, etag, modificado_em):
+        return resposta_304(etag, modificado_em)
+
+    filtros = _filtros_operacoes(data_inicio, data_fim, ticker, tipo_operacao)
+
+    total = db.query(func.count(models.Operacao.id)) \
         .join(models.Ativo, models.Operacao.id_ticker == models.Ativo.id) \
-        .filter(models.Operacao.data_operacao.between(data_inicio, data_fim)) \
-        .order_by(models.Operacao.data_operacao.desc()).all()
-    resultado = [{
-        "id": op.id, "ticker": ativo.ticker, "tipo_ativo": ativo.tipo_ativo,
-        "tipo_operacao": op.tipo_operacao, "data_operacao": op.data_operacao,
-        "preco": float(op.preco), "quantidade": op.quantidade
-    } for op, ativo in operacoes]
-    return resultado
+        .filter(*filtros).scalar()
+
+    if cursor:
+        cursor_data, cursor_id = _decodificar_cursor(cursor)
+        filtros.append(tuple_(models.Operacao.data_operacao, models.Operacao.id) < tuple_(cursor_data, cursor_id))
+
+    # data_operacao e id são sempre lidos, pois formam o cursor da próxima página
+    colunas = list(dict.fromkeys(selecionados + ["data_operacao", "id"]))
+    linhas = db.query(*[COLUNAS_OPERACAO[c].label(c) for c in colunas]) \
+        .join(models.Ativo, models.Operacao.id_ticker == models.Ativo.id) \
+        .filter(*filtros) \
+        .order_by(models.Operacao.data_operacao.desc(), models.Operacao.id.desc()) \
+        .limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = _codificar_cursor(linhas[-1].data_operacao, linhas[-1].id)
+
+    pagina = [{
+        c: float(getattr(linha, c)) if c == "preco" else getattr(linha, c) for c in selecionados
+    } for linha in linhas]
+    return RespostaJSON({"operacoes": pagina, "total": total, "proximo_cursor": proximo_cursor},
+                        headers=cabecalhos_validacao(etag, modificado_em))
+
+@router_operacoes.get("/exportar")
+def exportar_operacoes(data_inicio: date, data_fim: date, formato: str = "csv",
+                       ticker: Optional[str] = None, tipo_operacao: Optional[str] = None,
+                       db: Session = Depends(get_db)):
+    """
+    Exporta todas as operações do período (com os mesmos filtros da listagem) em CSV ou XLSX.
+    O CSV é enviado por streaming à medida que as linhas são lidas do banco; o XLSX é gravado
+    em um arquivo temporário no modo de memória constante e removido após o envio.
+    """
+    if formato not in ("csv", "xlsx"):
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use 'csv' ou 'xlsx'.")
+    filtros = _filtros_operacoes(data_inicio, data_fim, ticker, tipo_operacao)
+    nome_arquivo = f"operacoes_{data_inicio.isoformat()}_{data_fim.isoformat()}.{formato}"
+    if formato == "csv":
+        return StreamingResponse(exportacao.gerar_csv(filtros), media_type="text/csv; charset=utf-8",
+                                 headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'})
+
+    descritor, caminho = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descritor)
+    try:
+        exportacao.gerar_xlsx(db, filtros, caminho)
+    except Exception:
+        os.remove(caminho)
+        raise
+    return FileResponse(caminho, filename=nome_arquivo, background=BackgroundTask(os.remove, caminho),
+                        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 @router_operacoes.get("/{operacao_id}")
 def obter_operacao(operacao_id: int, db: Session = Depends(get_db)):
@@ -116,24 +272,64 @@ def obter_operacao(operacao_id: int, db: Session = Depends(get_db)):
 def criar_operacao(operacao: OperacaoBase, db: Session = Depends(get_db)):
     nova_operacao = models.Operacao(**operacao.dict())
     db.add(nova_operacao)
+    posicoes.registrar_operacoes(db, [operacao.dict()])
+    resultados.invalidar(db, operacao.data_operacao)
+    versoes.incrementar(db, 'operacoes')
     db.commit()
     db.refresh(nova_operacao)
     return nova_operacao
 
+@router_operacoes.post("/importar")
+def importar_operacoes(arquivo: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Importa operações em lote a partir de um arquivo CSV ou XLSX com as colunas ticker, tipo_operacao,
+    data_operacao, preco, quantidade e, opcionalmente, tipo_ativo (usado para cadastrar tickers novos).
+    Retorna um relatório com a quantidade importada e os erros por linha.
+    """
+    nome = (arquivo.filename or "").lower()
+    try:
+        # Os leitores conferem o arquivo (codificação do CSV, estrutura do XLSX) antes de qualquer gravação
+        if nome.endswith(".csv"):
+            linhas = importacao.ler_csv(arquivo.file)
+        elif nome.endswith(".xlsx"):
+            linhas = importacao.ler_xlsx(arquivo.file)
+        else:
+            raise HTTPException(status_code=400, detail="Formato não suportado. Envie um arquivo .csv ou .xlsx.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return importacao.importar_operacoes(db, linhas)
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Arquivo CSV inválido: {e}. Nenhuma operação foi importada.")
+    except SQLAlchemyError as e:
+        print(f"Erro ao importar operações: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao gravar as operações no banco. Nenhuma operação foi importada.")
+
 @router_operacoes.put("/{operacao_id}", response_model=Operacao)
 def atualizar_operacao(operacao_id: int, dados: OperacaoBase, db: Session = Depends(get_db)):
     db_operacao = db.query(models.Operacao).filter(models.Operacao.id == operacao_id).first()
     if not db_operacao:
         raise HTTPException(status_code=404, detail="Operação não encontrada")
+    anterior = {coluna: getattr(db_operacao, coluna) for coluna in dados.dict()}
     for key, value in dados.dict().items():
         setattr(db_operacao, key, value)
+    db.flush()
+    # A posição é ajustada desfazendo a operação antiga e aplicando a nova, na mesma transação
+    posicoes.registrar_operacoes(db, [anterior], sinal=-1)
+    posicoes.registrar_operacoes(db, [dados.dict()])
+    resultados.invalidar(db, anterior['data_operacao'], dados.data_operacao)
+    versoes.incrementar(db, 'operacoes')
     db.commit()
     db.refresh(db_operacao)
     return db_operacao
 
 @router_operacoes.post("/delete")
 def deletar_operacoes(ids: List[int] = Body(..., embed=True), db: Session = Depends(get_db)):
+    removidas = db.execute(models.Operacao.__table__.select().where(models.Operacao.id.in_(ids))).mappings().all()
     deleted_count = db.query(models.Operacao).filter(models.Operacao.id.in_(ids)).delete(synchronize_session=False)
+    posicoes.registrar_operacoes(db, removidas, sinal=-1)
+    resultados.invalidar(db, *[op['data_operacao'] for op in removidas])
+    versoes.incrementar(db, 'operacoes')
     db.commit()
     if deleted_count == 0:
         raise HTTPException(status_code=404, detail="Nenhuma operação encontrada.")
@@ -143,38 +339,69 @@ def deletar_operacoes(ids: List[int] = Body(..., embed=True), db: Session = Depe
 # === ENDPOINTS PARA DASHBOARD DE PERFORMANCE =====================
 # =================================================================
 @router_dashboard.get("/performance")
-def get_performance_carteira(db: Session = Depends(get_db)):
-    ativos_db = db.query(models.Ativo).all()
-    if not ativos_db:
-        return {"ativos": [], "metricas_gerais": {}, "cdi": 0, "historicos": {}}
+async def get_performance_carteira(request: Request, db: AsyncSession = Depends(get_async_db)):
+    versoes_lidas = await db.run_sync(versoes.ler)
+    etag, _ = _validacao(versoes_lidas, ['ativos', 'operacoes'], True)
+    if nao_modificado(request, etag):
+        return resposta_304(etag)
+    dados = await _calcular_performance(db)
+    # O cálculo pode ter preenchido o cache de mercado: a ETag enviada é a do estado que ele usou
+    etag, _ = _validacao(versoes_lidas, ['ativos', 'operacoes'], True)
+    return RespostaJSON(dados, headers=cabecalhos_validacao(etag))
+
+async def _calcular_performance(db: AsyncSession):
+    posicoes_atuais = await db.run_sync(consultas.posicoes_por_ativo)
+    if not posicoes_atuais:
+        return {"ativos": [], "metricas_gerais": {}, "cdi": 0, "falhas": []}
+    # Devolve a conexão ao pool enquanto espera os provedores; a sessão abre outra quando voltar a consultar
+    await db.close()
 
-    cdi_acumulado = api_bcb.get_cdi_accumulated()
+    # CDI dos últimos 12 meses e de cada ativo no período em que foi mantido (da primeira operação
+    # até hoje, ou até a última operação se a posição foi zerada), em uma única consulta ao índice
+    amanha = date.today() + timedelta(days=1)
+    try:
+        indice_cdi = await chamar_provedor(api_bcb.get_indice_cdi)
+        cdi_acumulado = api_bcb.acumulado_12m(indice_cdi)
+        cdi_periodos = indice_cdi.acumulados(
+            [p['primeira_operacao'] for p in posicoes_atuais],
+            [amanha if p['quantidade'] > 0 else p['ultima_operacao'] for p in posicoes_atuais])
+    except ErroProvedor:
+        cdi_acumulado = cdi_periodos = None
+    # Busca os dados de mercado de todos os tickers em um download em lote antes de agregar;
+    # os que o lote não resolver são buscados individualmente, em paralelo
+    infos_yh, faltantes = await chamar_provedor(yahoo_finance.get_ativos_info_batch, [p['ticker'] for p in posicoes_atuais])
+    infos_individuais, falhas = await chamar_provedor(yahoo_finance.get_ativos_info_concorrente, faltantes)
+    infos_yh.update(infos_individuais)
+    falhas = [{"ticker": ticker, **falha} for ticker, falha in falhas.items()]
+    # Custo médio e lucro realizado de cada ativo (só as operações do mês corrente são reprocessadas)
+    _, custos = await db.run_sync(resultados.apurar_resultados)
     dados_ativos = []
-    historicos_para_frontend = {}
-
-    for ativo in ativos_db:
-        operacoes = db.query(models.Operacao).filter(models.Operacao.id_ticker == ativo.id).all()
-        if not operacoes: continue
-
-        total_investido = sum(float(op.preco) * op.quantidade for op in operacoes if op.tipo_operacao == 'Comprar')
-        total_vendido = sum(float(op.preco) * op.quantidade for op in operacoes if op.tipo_operacao == 'Vender')
-        quantidade_atual = sum(op.quantidade for op in operacoes if op.tipo_operacao == 'Comprar') - sum(op.quantidade for op in operacoes if op.tipo_operacao == 'Vender')
-        
-        info_yh = yahoo_finance.get_ativo_info(ativo.ticker)
-        if info_yh:
+
+    for i, posicao in enumerate(posicoes_atuais):
+        total_investido = posicao['total_comprado']
+        total_vendido = posicao['total_vendido']
+        quantidade_atual = posicao['quantidade']
+        custo = custos.get(posicao['id'], resultado.estado_vazio())
+
+        info_yh = infos_yh.get(posicao['ticker'])
+        if info_yh is not None:
             preco_atual = info_yh.get('Preço Atual', 0)
             valor_atual_ativo = quantidade_atual * preco_atual
             rendimento_total = ((valor_atual_ativo + total_vendido) - total_investido) / total_investido * 100 if total_investido > 0 else 0
             
             dados_ativos.append({
-                'Ticker': ativo.ticker, 'Tipo': ativo.tipo_ativo, 'Preço Atual': preco_atual,
+                'Ticker': posicao['ticker'], 'Tipo': posicao['tipo_ativo'], 'Preço Atual': preco_atual,
+                'Preço Médio': custo['custo_total'] / custo['quantidade'] if custo['quantidade'] > 0 else 0,
                 'Total Investido': total_investido, 'Valor Atual': valor_atual_ativo,
-                'Rendimento Total (%)': rendimento_total, 'Dividendos': info_yh.get('Dividendos 12M', 0),
+                'Rendimento Total (%)': rendimento_total,
+                'Lucro Realizado': custo['lucro_realizado'],
+                'Lucro Não Realizado': valor_atual_ativo - custo['custo_total'] if quantidade_atual > 0 else 0,
+                'Dividendos': info_yh.get('Dividendos 12M', 0),
+                'CDI no Período (%)': float(cdi_periodos[i]) if cdi_periodos is not None else None,
             })
-            historicos_para_frontend[ativo.ticker] = info_yh['Histórico'].to_json(orient='split')
 
     if not dados_ativos:
-         return {"ativos": [], "metricas_gerais": {}, "cdi": cdi_acumulado, "historicos": {}}
+         return {"ativos": [], "metricas_gerais": {}, "cdi": cdi_acumulado, "falhas": falhas}
     
     df_ativos = pd.DataFrame(dados_ativos)
     total_investido_carteira = df_ativos['Total Investido'].sum()
@@ -185,39 +412,212 @@ def get_performance_carteira(db: Session = Depends(get_db)):
     return {
         "ativos": df_ativos.to_dict(orient='records'),
         "metricas_gerais": { "total_investido": total_investido_carteira, "valor_atual": valor_atual_carteira, "rendimento_total_percent": rend_total_carteira, "dividendos_total": dividendos_carteira },
-        "historicos": historicos_para_frontend, "cdi": cdi_acumulado
+        "cdi": cdi_acumulado, "falhas": falhas
     }
 
+@router_dashboard.get("/evolucao")
+async def get_evolucao_carteira(request: Request, data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                                db: AsyncSession = Depends(get_async_db)):
+    """
+    Evolução diária da carteira: valor de mercado, capital investido (aportes líquidos acumulados),
+    fluxo do dia, dividendos e retorno acumulado ponderado pelo tempo (%), desde a primeira operação
+    ou no período informado. Tickers sem nenhuma cotação são avaliados pelo preço da última operação
+    e listados em "sem_cotacao".
+    """
+    versoes_lidas = await db.run_sync(versoes.ler)
+    etag, _ = _validacao(versoes_lidas, ['ativos', 'operacoes'], True)
+    if nao_modificado(request, etag):
+        return resposta_304(etag)
+    dados = await _calcular_evolucao(db, data_inicio, data_fim)
+    # Como em /performance, a ETag é refeita depois do cálculo, que pode ter preenchido o cache de mercado
+    etag, _ = _validacao(versoes_lidas, ['ativos', 'operacoes'], True)
+    return RespostaJSON(dados, headers=cabecalhos_validacao(etag))
+
+async def _calcular_evolucao(db: AsyncSession, data_inicio: Optional[date], data_fim: Optional[date]):
+    fluxos = pd.DataFrame(await db.run_sync(consultas.fluxos_por_dia), columns=evolucao.COLUNAS_FLUXOS)
+    if fluxos.empty:
+        return {"evolucao": [], "sem_cotacao": []}
+
+    tickers = sorted(fluxos['ticker'].unique())
+    inicio = fluxos['data'].min()
+    await db.close()
+    # Sincroniza as barras recentes em lote e complementa o histórico anterior ao último ano, se preciso
+    await chamar_provedor(yahoo_finance.get_ativos_info_batch, tickers)
+    await chamar_provedor(yahoo_finance.garantir_historico, tickers, inicio)
+    series_precos = await db.run_sync(lambda sessao: cotacoes.carregar_series(sessao, tickers, inicio))
+
+    # O cálculo (pandas/numpy) roda fora do event loop para não atrasar as outras requisições
+    calculada = await anyio.to_thread.run_sync(evolucao.calcular_evolucao, fluxos, series_precos['fechamento'], series_precos['dividendos'])
+    evolucao_periodo = evolucao.recortar_periodo(calculada, data_inicio, data_fim)
+    evolucao_periodo.index = evolucao_periodo.index.date
+    return {
+        "evolucao": evolucao_periodo.round(4).rename_axis('data').reset_index().to_dict(orient='records'),
+        "sem_cotacao": [t for t in tickers if t not in series_precos['fechamento'].columns],
+    }
+
+@router_dashboard.get("/resultados")
+async def get_resultados_carteira(request: Request, ano: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    Resultado realizado pelo custo médio, por mês e tipo de ativo (total vendido, custo das vendas, lucro e
+    se o mês é isento de IR), e a situação de cada ativo (quantidade, preço médio, custo e lucro realizado).
+    Os meses encerrados vêm da apuração gravada; só o mês corrente é recalculado a cada chamada.
+    """
+    # O mês corrente entra na versão: na virada do mês a apuração muda mesmo sem operações novas
+    etag, modificado_em = _validacao(await db.run_sync(versoes.ler), ['ativos', 'operacoes'], False,
+                                     date.today().strftime('%Y-%m'))
+    if nao_modificado(request, etag, modificado_em):
+        return resposta_304(etag, modificado_em)
+
+    meses, custos = await db.run_sync(resultados.apurar_resultados)
+    if ano is not None:
+        meses = [m for m in meses if m['mes'].startswith(f"{ano:04d}-")]
+
+    ativos = (await db.execute(select(models.Ativo.id, models.Ativo.ticker, models.Ativo.tipo_ativo)
+                               .where(models.Ativo.id.in_(list(custos))).order_by(models.Ativo.ticker))).all()
+    return RespostaJSON({
+        "meses": meses,
+        "ativos": [{
+            "ticker": ativo.ticker, "tipo_ativo": ativo.tipo_ativo,
+            "quantidade": custos[ativo.id]['quantidade'],
+            "preco_medio": custos[ativo.id]['custo_total'] / custos[ativo.id]['quantidade'] if custos[ativo.id]['quantidade'] > 0 else 0,
+            "custo_total": custos[ativo.id]['custo_total'], "lucro_realizado": custos[ativo.id]['lucro_realizado'],
+        } for ativo in ativos],
+        "lucro_realizado": sum(m['lucro'] for m in meses),
+    }, headers=cabecalhos_validacao(etag, modificado_em))
+
 # =================================================================
 # === ENDPOINTS DE DADOS DE MERCADO (BCB, Yahoo Finance) ==========
 # =================================================================
 
 @router_market_data.get("/cdi")
-def get_cdi():
-    cdi = api_bcb.get_cdi_accumulated()
-    if cdi is None:
-        raise HTTPException(status_code=500, detail="Não foi possível buscar os dados do CDI.")
-    return {"cdi_acumulado_12m": cdi}
+async def get_cdi(data_inicio: Optional[date] = None, data_fim: Optional[date] = None):
+    """
+    CDI acumulado dos últimos 12 meses e, se data_inicio for informada, também o do período
+    de data_inicio até data_fim (inclusive; padrão: hoje).
+    """
+    try:
+        indice_cdi = await chamar_provedor(api_bcb.get_indice_cdi)
+        resposta = {"cdi_acumulado_12m": api_bcb.acumulado_12m(indice_cdi)}
+        if data_inicio is not None:
+            data_fim = data_fim or date.today()
+            if data_fim < data_inicio:
+                raise HTTPException(status_code=400, detail="data_fim deve ser posterior a data_inicio.")
+            resposta.update(data_inicio=data_inicio, data_fim=data_fim,
+                            cdi_acumulado_periodo=indice_cdi.acumulado(data_inicio, data_fim + timedelta(days=1)))
+    except ErroProvedor:
+        raise HTTPException(status_code=502, detail="Não foi possível buscar os dados do CDI.")
+    return resposta
 
 @router_market_data.get("/ativo/{ticker}/info")
-def get_info_ativo(ticker: str):
-    info = yahoo_finance.get_ativo_info(ticker)
-    if info is None:
+async def get_info_ativo(ticker: str):
+    try:
+        info = dict(await chamar_provedor(yahoo_finance.get_ativo_info, ticker))
+    except DadosNaoEncontrados:
         raise HTTPException(status_code=404, detail=f"Não foram encontradas informações para o ticker {ticker}.")
+    except ErroProvedor:
+        raise HTTPException(status_code=502, detail=f"Erro ao consultar o provedor de dados para o ticker {ticker}.")
     info['Histórico'] = info['Histórico'].to_json(orient='split')
     return info
 
 @router_market_data.get("/ativo/{ticker}/dividendos")
-def get_dividendos(ticker: str):
-    dividendos_df = yahoo_finance.get_dividendos_12m(ticker)
-    if dividendos_df is None: return []
+async def get_dividendos(ticker: str):
+    try:
+        dividendos_df = await chamar_provedor(yahoo_finance.get_dividendos_12m, ticker)
+    except DadosNaoEncontrados:
+        return []
+    except ErroProvedor:
+        raise HTTPException(status_code=502, detail=f"Erro ao consultar o provedor de dados para o ticker {ticker}.")
     dividendos_df = dividendos_df.reset_index()
     dividendos_df.columns = ['Data', 'Valor']
     return dividendos_df.to_dict(orient='records')
 
+# Colunas do histórico que podem ser pedidas no detalhe do ativo
+COLUNAS_HISTORICO = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+@router_market_data.get("/ativo/{ticker}/detalhe")
+async def get_detalhe_ativo(ticker: str, colunas: str = "Close", data_inicio: Optional[date] = None,
+                            data_fim: Optional[date] = None, pontos: Optional[int] = Query(None, ge=3, le=10000),
+                            codificacao: str = "json"):
+    """
+    Detalhe de um ativo sob demanda: preço atual, histórico diário das colunas pedidas (separadas por vírgula)
+    no período e os dividendos pagos no período. Sem datas, o período é o último ano.
+    "pontos" reduz o histórico para no máximo esse número de amostras (LTTB, guiado pelo fechamento) e
+    "codificacao=compacta" envia datas e valores como inteiros em diferenças (ver calculos.series).
+    """
+    selecionadas = [c.strip() for c in colunas.split(",") if c.strip()]
+    invalidas = [c for c in selecionadas if c not in COLUNAS_HISTORICO]
+    if invalidas or not selecionadas:
+        raise HTTPException(status_code=400, detail=f"Colunas inválidas: {', '.join(invalidas)}. "
+                                                    f"Use {', '.join(COLUNAS_HISTORICO)}.")
+    if codificacao not in ("json", "compacta"):
+        raise HTTPException(status_code=400, detail="Codificação não suportada. Use 'json' ou 'compacta'.")
+
+    try:
+        info = await chamar_provedor(yahoo_finance.get_ativo_info, ticker)
+        hist = info['Histórico']
+        if data_inicio is not None and data_inicio < hist.index[0].date():
+            # Período anterior ao último ano: o histórico vem do banco local, complementado se preciso
+            hist = await chamar_provedor(yahoo_finance.get_historico, ticker, data_inicio)
+    except DadosNaoEncontrados:
+        raise HTTPException(status_code=404, detail=f"Não foram encontradas informações para o ticker {ticker}.")
+    except ErroProvedor:
+        raise HTTPException(status_code=502, detail=f"Erro ao consultar o provedor de dados para o ticker {ticker}.")
+
+    if data_inicio is not None:
+        hist = hist[hist.index >= pd.Timestamp(data_inicio)]
+    if data_fim is not None:
+        hist = hist[hist.index <= pd.Timestamp(data_fim)]
+
+    dividendos = hist['Dividends'][hist['Dividends'] > 0] if 'Dividends' in hist else pd.Series(dtype=float)
+    serie = hist.reindex(columns=selecionadas)
+    if pontos is not None and len(serie) > pontos:
+        guia = serie['Close'] if 'Close' in serie else serie[selecionadas[0]]
+        serie = serie.iloc[series.lttb(guia.to_numpy(), pontos)]
+
+    if codificacao == "compacta":
+        historico = series.codificar_compacto(serie)
+    else:
+        historico = {
+            "datas": [d.date().isoformat() for d in serie.index],
+            "colunas": {c: [None if pd.isna(v) else float(v) for v in serie[c]] for c in selecionadas},
+        }
+    return {
+        "ticker": ticker, "preco_atual": float(info['Preço Atual']),
+        "rendimento_dia": float(info['Rendimento Dia (%)']), "dividendos_12m": float(info['Dividendos 12M']),
+        "pontos_originais": len(hist), "historico": historico,
+        "dividendos": [{"data": d.date().isoformat(), "valor": float(v)} for d, v in dividendos.items()],
+    }
+
+
+# =================================================================
+# === ENDPOINTS DE MONITORAMENTO ==================================
+# =================================================================
+@router_monitoramento.get("/metrics", response_class=PlainTextResponse)
+def get_metricas():
+    """Métricas de cache e de chamadas aos provedores, no formato texto do Prometheus."""
+    return PlainTextResponse(metricas.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router_monitoramento.get("/backups")
+def listar_backups():
+    """Backups do banco existentes (os automáticos são feitos diariamente pelo agendador)."""
+    return [{"arquivo": os.path.basename(caminho), "criado_em": momento, "tamanho": tamanho}
+            for caminho, momento, tamanho in backup.listar_backups()]
+
+@router_monitoramento.post("/backups", status_code=201)
+async def criar_backup():
+    """
+    Faz um backup do banco agora. A cópia é online e em passos, fora do event loop: as outras requisições
+    continuam sendo atendidas (inclusive as escritas). A restauração é feita só pela linha de comando.
+    """
+    caminho = await anyio.to_thread.run_sync(backup.fazer_backup)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail="Banco de dados não encontrado.")
+    return {"arquivo": os.path.basename(caminho), "tamanho": os.path.getsize(caminho)}
+
 
 # --- Inclui todos os roteadores na aplicação principal ---
 app.include_router(router_ativos)
 app.include_router(router_operacoes)
 app.include_router(router_dashboard)
-app.include_router(router_market_data)
\ No newline at end of file
+app.include_router(router_market_data)
+app.include_router(router_monitoramento)
\ No newline at end of file
@@ -0,0 +1,164 @@
+# benchmarks/carga.py
+"""
+Teste de carga dos endpoints da API com o provedor falso (controllers/provedores.py), sem acesso ao
+Yahoo Finance nem ao Banco Central. Cria um banco com N ativos e M operações sintéticas e dispara
+requisições simultâneas em cada endpoint, medindo vazão (req/s) e latências p50/p95/p99.
+
+Por padrão a API roda no próprio processo (httpx + ASGI) sobre um banco em um diretório temporário;
+com --url as requisições vão para uma API já iniciada (que deve usar CARTEIRA_PROVEDOR=falso e o banco
+informado em --banco / CARTEIRA_DB_PATH). Com --json o resultado também é gravado em arquivo, para
+comparar execuções.
+
+Uso (a partir da pasta backend):
+    python benchmarks/carga.py --ativos 100 --operacoes 20000 --concorrencia 16 --requisicoes 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+ENDPOINTS = {
+    "ativos": "/api/ativos/",
+    "operacoes": "/api/operacoes/?data_inicio=2000-01-01&data_fim=2100-01-01&limite=100",
+    "performance": "/api/dashboard/performance",
+    "evolucao": "/api/dashboard/evolucao",
+    "resultados": "/api/dashboard/resultados",
+    "cdi": "/api/market-data/cdi",
+}
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ativos", type=int, default=50, help="ativos criados no banco")
+    parser.add_argument("--operacoes", type=int, default=5000, help="operações criadas no banco")
+    parser.add_argument("--concorrencia", type=int, default=8, help="requisições simultâneas por endpoint")
+    parser.add_argument("--requisicoes", type=int, default=100, help="requisições por endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="endpoints medidos, separados por vírgula")
+    parser.add_argument("--latencia", type=float, default=0.05, help="espera (s) de cada chamada ao provedor falso")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="probabilidade de falha de cada chamada ao provedor")
+    parser.add_argument("--banco", help="arquivo do banco (padrão: novo banco em diretório temporário)")
+    parser.add_argument("--url", help="endereço de uma API já iniciada (padrão: API no próprio processo)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    return parser.parse_args()
+
+
+def popular_banco(n_ativos, n_operacoes, semente):
+    """Cria o esquema e insere os ativos e as operações (as posições são calculadas depois pelo init_db)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from SQL import database
+    from SQL.models import Base, Ativo, Operacao
+
+    aleatorio = random.Random(semente)
+    os.makedirs(os.path.dirname(database.DB_ARQUIVO) or ".", exist_ok=True)
+    engine = create_engine(f"sqlite:///{database.DB_ARQUIVO}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    if session.query(Ativo).count():
+        print(f"Usando os dados já existentes em {database.DB_ARQUIVO}")
+        session.close()
+        return
+    ativos = [Ativo(ticker=f"TST{i:04d}", tipo_ativo=aleatorio.choice(['FII', 'ETF', 'Ação'])) for i in range(n_ativos)]
+    session.add_all(ativos)
+    session.flush()
+    inicio = date.today() - timedelta(days=5 * 365)
+    # Só compras: vendas sorteadas poderiam deixar posições negativas
+    session.execute(Operacao.__table__.insert(), [{
+        'id_ticker': aleatorio.choice(ativos).id,
+        'tipo_operacao': 'Comprar',
+        'data_operacao': inicio + timedelta(days=aleatorio.randint(0, 5 * 365 - 1)),
+        'preco': round(aleatorio.uniform(5, 150), 2),
+        'quantidade': aleatorio.randint(1, 500),
+    } for _ in range(n_operacoes)])
+    session.commit()
+    session.close()
+    engine.dispose()
+
+
+def percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+async def medir(cliente, rota, concorrencia, requisicoes):
+    latencias, erros = [], 0
+    fila = iter(range(requisicoes))
+
+    async def trabalhador():
+        nonlocal erros
+        for _ in fila:
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.get(rota)
+                erros += resposta.status_code >= 400
+            except Exception:
+                erros += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    ordenadas = sorted(latencias)
+    return {
+        "requisicoes": requisicoes, "erros": erros, "req_s": requisicoes / duracao,
+        "p50_ms": percentil(ordenadas, 50) * 1000, "p95_ms": percentil(ordenadas, 95) * 1000,
+        "p99_ms": percentil(ordenadas, 99) * 1000, "media_ms": statistics.fmean(ordenadas) * 1000,
+    }
+
+
+async def main(args):
+    import httpx
+
+    if args.url:
+        cliente = httpx.AsyncClient(base_url=args.url, timeout=600)
+    else:
+        import api
+        transporte = httpx.ASGITransport(app=api.app, raise_app_exceptions=False)
+        cliente = httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=600)
+
+    from controllers import provedores
+    async with cliente:
+        # Aquecimento: a primeira chamada sincroniza os históricos e o CDI do provedor falso com o banco
+        inicio = time.perf_counter()
+        for rota in ENDPOINTS.values():
+            await cliente.get(rota)
+        print(f"Aquecimento: {time.perf_counter() - inicio:.2f} s")
+
+        print(f"{'endpoint':>12} | {'req/s':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | "
+              f"{'média (ms)':>10} | {'erros':>5}")
+        print("-" * 80)
+        resultados = {}
+        for nome in args.endpoints.split(","):
+            r = resultados[nome] = await medir(cliente, ENDPOINTS[nome], args.concorrencia, args.requisicoes)
+            print(f"{nome:>12} | {r['req_s']:>8.1f} | {r['p50_ms']:>9.1f} | {r['p95_ms']:>9.1f} | {r['p99_ms']:>9.1f} | "
+                  f"{r['media_ms']:>10.1f} | {r['erros']:>5}")
+        if not args.url:
+            print(f"Chamadas ao provedor falso: {provedores.provedor().chamadas}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "resultados": resultados}, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    args = argumentos()
+    # O provedor e o banco são escolhidos por variáveis de ambiente lidas na importação dos módulos
+    os.environ["CARTEIRA_PROVEDOR"] = "falso"
+    os.environ["CARTEIRA_PROVEDOR_FALSO_LATENCIA"] = str(args.latencia)
+    os.environ["CARTEIRA_PROVEDOR_FALSO_TAXA_ERRO"] = str(args.taxa_erro)
+    os.environ["CARTEIRA_PROVEDOR_FALSO_SEMENTE"] = str(args.semente)
+    os.environ["CARTEIRA_AGENDADOR_ATIVO"] = "0"
+    os.environ["CARTEIRA_DB_PATH"] = os.path.abspath(
+        args.banco or os.path.join(tempfile.mkdtemp(prefix="bench_carga_"), "ativos.db"))
+    print(f"Banco: {os.environ['CARTEIRA_DB_PATH']}")
+    popular_banco(args.ativos, args.operacoes, args.semente)
+    asyncio.run(main(args))
@@ -0,0 +1,109 @@
+# benchmarks/concorrencia.py
+"""
+Mede a latência de um endpoint de cadastro (GET /api/ativos/) enquanto vários dashboards
+estão esperando um provedor lento, comparando o endpoint de performance assíncrono (que usa
+o limite de threads próprio dos provedores, backend/concorrencia.py) com uma versão síncrona
+equivalente à antiga, que ocupa uma thread do threadpool do FastAPI durante toda a espera.
+
+O provedor é simulado (sem rede) com uma espera fixa por chamada. Com dashboards síncronos
+suficientes para ocupar todo o threadpool, as requisições passam a esperar conexões do pool do
+SQLAlchemy que só seriam devolvidas pela limpeza da dependência get_db (que também precisa de uma
+thread do threadpool) e ficam presas até o timeout do pool: as que passam de TEMPO_LIMITE aparecem
+na coluna de erros. Por isso os cenários assíncronos são medidos antes dos síncronos.
+
+Uso (a partir da pasta backend):
+    python benchmarks/concorrencia.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# O banco é criado em data/ativos.db relativo ao diretório atual: usa um diretório temporário
+os.chdir(tempfile.mkdtemp(prefix="bench_concorrencia_"))
+
+import httpx
+import numpy as np
+from fastapi import Depends
+
+import api
+from calculos.cdi import IndiceCdi
+from controllers import yahoo_finance, api_bcb
+
+ESPERA_PROVEDOR = 1.0       # segundos de cada chamada ao provedor simulado
+DASHBOARDS_SIMULTANEOS = [0, 20, 60]
+CONSULTAS_CRUD = 50
+TEMPO_LIMITE = 5.0          # segundos; consultas CRUD mais lentas que isso contam como erro
+N_ATIVOS = 20
+
+
+def provedor_lento(tickers):
+    time.sleep(ESPERA_PROVEDOR)
+    return {t: {'Preço Atual': 10.0, 'Rendimento Dia (%)': 0.0, 'Dividendos 12M': 0.0} for t in tickers}, []
+
+
+@api.app.get("/bench/performance-sincrono")
+def performance_sincrono(db=Depends(api.get_db)):
+    """Reprodução do endpoint antigo: a espera pelo provedor acontece dentro de uma thread do threadpool."""
+    from SQL import consultas
+    posicoes = consultas.posicoes_por_ativo(db)
+    infos, _ = yahoo_finance.get_ativos_info_batch([p['ticker'] for p in posicoes])
+    return {"ativos": len(infos)}
+
+
+async def medir(cliente, rota_dashboard, n_dashboards):
+    dashboards = [asyncio.create_task(cliente.get(rota_dashboard)) for _ in range(n_dashboards)]
+    await asyncio.sleep(0.2)  # deixa os dashboards chegarem ao provedor antes de medir o CRUD
+
+    latencias, erros = [], 0
+    for _ in range(CONSULTAS_CRUD):
+        inicio = time.perf_counter()
+        try:
+            resposta = await asyncio.wait_for(cliente.get("/api/ativos/"), TEMPO_LIMITE)
+            erros += resposta.status_code != 200
+        except asyncio.TimeoutError:
+            erros += 1
+        latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0.01)
+
+    inicio = time.perf_counter()
+    if dashboards:
+        concluidos, pendentes = await asyncio.wait(dashboards, timeout=TEMPO_LIMITE * 4)
+        erros += len(pendentes) + sum(d.exception() is not None or d.result().status_code != 200 for d in concluidos)
+        for d in pendentes:
+            d.cancel()
+    return latencias, time.perf_counter() - inicio, erros
+
+
+async def main():
+    yahoo_finance.get_ativos_info_batch = provedor_lento
+    yahoo_finance.get_ativos_info_concorrente = lambda tickers: ({}, {})
+    api_bcb.get_indice_cdi.cache_set(IndiceCdi(np.array(['2020-01-02'], dtype='datetime64[D]'), [0.04]))
+
+    transporte = httpx.ASGITransport(app=api.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=600) as cliente:
+        for i in range(N_ATIVOS):
+            id_ativo = (await cliente.post("/api/ativos/", json={"ticker": f"TST{i}", "tipo_ativo": "FII"})).json()["id"]
+            await cliente.post("/api/operacoes/", json={"id_ticker": id_ativo, "tipo_operacao": "Comprar",
+                                                       "data_operacao": "2024-01-02", "preco": 10, "quantidade": 1})
+
+        print(f"Provedor simulado: {ESPERA_PROVEDOR:.1f} s por chamada; {CONSULTAS_CRUD} consultas GET /api/ativos/ por cenário")
+        print(f"{'dashboards':>10} | {'endpoint':>10} | {'CRUD p50 (ms)':>13} | {'CRUD p95 (ms)':>13} | "
+              f"{'CRUD máx (ms)':>13} | {'dashboards (s)':>14} | {'erros':>5}")
+        print("-" * 98)
+        for nome, rota in (("async", "/api/dashboard/performance"), ("síncrono", "/bench/performance-sincrono")):
+            for n in DASHBOARDS_SIMULTANEOS:
+                latencias, duracao, erros = await medir(cliente, rota, n)
+                p95 = statistics.quantiles(latencias, n=20)[-1]
+                print(f"{n:>10} | {nome:>10} | {statistics.median(latencias) * 1000:>13.1f} | {p95 * 1000:>13.1f} | "
+                      f"{max(latencias) * 1000:>13.1f} | {duracao:>14.2f} | {erros:>5}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    # Threads do cenário síncrono ainda presas esperando conexão não devem segurar o fim do processo
+    os._exit(0)
@@ -0,0 +1,104 @@
+# benchmarks/consultas_dashboard.py
+"""
+Compara o número de consultas SQL e o tempo gasto para calcular as posições do
+dashboard de performance entre o padrão antigo (uma consulta por ativo), a
+consulta agregada sobre todas as operações e a leitura da tabela de posições
+mantida a cada escrita (SQL/posicoes.py), usada por SQL/consultas.py.
+
+Uso (a partir da pasta backend):
+    python benchmarks/consultas_dashboard.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from SQL.models import Base, Ativo, Operacao
+from SQL import consultas, posicoes
+
+CENARIOS = [(10, 1_000), (100, 10_000), (300, 50_000), (300, 500_000)]
+
+
+def popular_banco(session, n_ativos, n_operacoes):
+    ativos = [Ativo(ticker=f"TST{i:04d}", tipo_ativo=random.choice(['FII', 'ETF', 'Ação'])) for i in range(n_ativos)]
+    session.add_all(ativos)
+    session.flush()
+    inicio = date(2020, 1, 1)
+    session.execute(Operacao.__table__.insert(), [{
+        'id_ticker': random.choice(ativos).id,
+        'tipo_operacao': 'Comprar' if random.random() < 0.7 else 'Vender',
+        'data_operacao': inicio + timedelta(days=random.randint(0, 1800)),
+        'preco': round(random.uniform(5, 150), 2),
+        'quantidade': random.randint(1, 500),
+    } for _ in range(n_operacoes)])
+    session.commit()
+
+
+def posicoes_por_ativo_legado(db):
+    """Reprodução do cálculo antigo: uma consulta de operações por ativo."""
+    resultado = []
+    for ativo in db.query(Ativo).all():
+        operacoes = db.query(Operacao).filter(Operacao.id_ticker == ativo.id).all()
+        if not operacoes: continue
+        resultado.append({
+            'total_comprado': sum(float(op.preco) * op.quantidade for op in operacoes if op.tipo_operacao == 'Comprar'),
+            'total_vendido': sum(float(op.preco) * op.quantidade for op in operacoes if op.tipo_operacao == 'Vender'),
+            'quantidade': sum(op.quantidade for op in operacoes if op.tipo_operacao == 'Comprar') - sum(op.quantidade for op in operacoes if op.tipo_operacao == 'Vender'),
+        })
+    return resultado
+
+
+def posicoes_agregadas(db):
+    """Cálculo a partir de todas as operações, em uma única consulta agregada."""
+    return db.execute(posicoes._consulta_agregada()).all()
+
+
+def medir(engine, funcao):
+    contador = {'consultas': 0}
+
+    def contar(*_):
+        contador['consultas'] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+    session = sessionmaker(bind=engine)()
+    try:
+        inicio = time.perf_counter()
+        funcao(session)
+        duracao = time.perf_counter() - inicio
+    finally:
+        session.close()
+        event.remove(engine, "before_cursor_execute", contar)
+    return contador['consultas'], duracao
+
+
+def main():
+    random.seed(42)
+    print(f"{'ativos':>7} {'operações':>10} | {'legado: consultas':>18} {'tempo (ms)':>11} | "
+          f"{'agregado: consultas':>20} {'tempo (ms)':>11} | {'tabela: consultas':>18} {'tempo (ms)':>11}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for n_ativos, n_operacoes in CENARIOS:
+            engine = create_engine(f"sqlite:///{os.path.join(pasta, f'bench_{n_ativos}_{n_operacoes}.db')}")
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            popular_banco(session, n_ativos, n_operacoes)
+            posicoes.reconstruir(session)
+            session.commit()
+            session.close()
+
+            q_legado, t_legado = medir(engine, posicoes_por_ativo_legado)
+            q_agregado, t_agregado = medir(engine, posicoes_agregadas)
+            q_tabela, t_tabela = medir(engine, consultas.posicoes_por_ativo)
+            print(f"{n_ativos:>7} {n_operacoes:>10} | {q_legado:>18} {t_legado * 1000:>11.1f} | "
+                  f"{q_agregado:>20} {t_agregado * 1000:>11.1f} | {q_tabela:>18} {t_tabela * 1000:>11.1f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
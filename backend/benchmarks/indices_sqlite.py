@@ -0,0 +1,110 @@
+# benchmarks/indices_sqlite.py
+"""
+Mostra o plano de execução e o tempo das principais consultas de operações, antes e depois
+dos índices e dos PRAGMAs definidos em SQL/models.py e SQL/database.py.
+
+Uso (a partir da pasta backend):
+    python benchmarks/indices_sqlite.py                  # 10k, 100k e 1M operações
+    python benchmarks/indices_sqlite.py 10000 50000      # tamanhos escolhidos
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateIndex
+
+from SQL.models import Base
+from SQL.database import configurar_sqlite
+
+TAMANHOS = [10_000, 100_000, 1_000_000]
+N_ATIVOS = 300
+REPETICOES = 20
+
+CONSULTAS = {
+    "operações de um ativo": (
+        "SELECT * FROM operacoes WHERE id_ticker = ? ORDER BY data_operacao", (42,)),
+    "última operação de um ativo": (
+        "SELECT max(data_operacao) FROM operacoes WHERE id_ticker = ?", (42,)),
+    "página da listagem (período)": (
+        "SELECT o.id, a.ticker, o.tipo_operacao, o.data_operacao, o.preco, o.quantidade "
+        "FROM operacoes o JOIN ativos a ON o.id_ticker = a.id "
+        "WHERE o.data_operacao BETWEEN ? AND ? ORDER BY o.data_operacao DESC, o.id DESC LIMIT 100",
+        ("2023-01-01", "2023-06-30")),
+    "total da listagem (período)": (
+        "SELECT count(*) FROM operacoes WHERE data_operacao BETWEEN ? AND ?", ("2023-01-01", "2023-06-30")),
+}
+
+
+def popular(caminho, n_operacoes):
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    conexao = sqlite3.connect(caminho)
+    # Parte de um banco "antigo", sem os índices secundários
+    for (nome,) in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'").fetchall():
+        conexao.execute(f"DROP INDEX {nome}")
+    conexao.executemany("INSERT INTO ativos (id, ticker, tipo_ativo) VALUES (?, ?, ?)",
+                        [(i, f"TST{i:04d}", "FII") for i in range(1, N_ATIVOS + 1)])
+    inicio = date(2015, 1, 1)
+    lote = []
+    for _ in range(n_operacoes):
+        lote.append((random.randint(1, N_ATIVOS), random.choice(["Comprar", "Vender"]),
+                     (inicio + timedelta(days=random.randint(0, 3650))).isoformat(),
+                     round(random.uniform(5, 150), 2), random.randint(1, 500)))
+        if len(lote) == 50_000:
+            conexao.executemany("INSERT INTO operacoes (id_ticker, tipo_operacao, data_operacao, preco, quantidade) "
+                                "VALUES (?, ?, ?, ?, ?)", lote)
+            lote.clear()
+    if lote:
+        conexao.executemany("INSERT INTO operacoes (id_ticker, tipo_operacao, data_operacao, preco, quantidade) "
+                            "VALUES (?, ?, ?, ?, ?)", lote)
+    conexao.commit()
+    conexao.close()
+
+
+def medir(conexao, titulo):
+    print(f"  [{titulo}]")
+    for nome, (sql, parametros) in CONSULTAS.items():
+        plano = " / ".join(linha[-1] for linha in conexao.execute(f"EXPLAIN QUERY PLAN {sql}", parametros))
+        inicio = time.perf_counter()
+        for _ in range(REPETICOES):
+            conexao.execute(sql, parametros).fetchall()
+        duracao = (time.perf_counter() - inicio) / REPETICOES * 1000
+        print(f"    {nome:<30} {duracao:>9.2f} ms   {plano}")
+
+
+def main():
+    random.seed(42)
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS
+    with tempfile.TemporaryDirectory() as pasta:
+        for n_operacoes in tamanhos:
+            caminho = os.path.join(pasta, f"bench_{n_operacoes}.db")
+            popular(caminho, n_operacoes)
+            print(f"\n{n_operacoes:,} operações")
+
+            conexao = sqlite3.connect(caminho)
+            medir(conexao, "sem índices, PRAGMAs padrão")
+            conexao.close()
+
+            conexao = sqlite3.connect(caminho)
+            configurar_sqlite(conexao)
+            engine = create_engine(f"sqlite:///{caminho}")
+            for indice in Base.metadata.tables['operacoes'].indexes:
+                conexao.execute(str(CreateIndex(indice).compile(engine)))
+            conexao.execute("ANALYZE")
+            conexao.commit()
+            engine.dispose()
+            medir(conexao, "com índices e PRAGMAs")
+            conexao.close()
+
+
+if __name__ == "__main__":
+    main()
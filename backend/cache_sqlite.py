@@ -0,0 +1,195 @@
+# backend/cache_sqlite.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from backend import metricas
+
+# Cache compartilhado entre os processos (workers do uvicorn) de uma mesma máquina, guardado em um arquivo
+# SQLite. Tem a mesma interface de mapeamento do TTLCache usada pelo decorator cached (backend/caching.py):
+# leitura que lança KeyError para chaves ausentes ou expiradas, gravação, maxsize, ttl e geracao.
+#
+# Os valores são serializados com pickle no protocolo mais recente, que grava os arrays do numpy (e portanto
+# os DataFrames do pandas e o índice do CDI) como blocos binários, sem conversão elemento a elemento.
+# As chaves são gravadas como texto (repr), o que é estável entre processos para os argumentos usados
+# nas funções cacheadas (strings, números e datas).
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cache_valores (
+    nome TEXT NOT NULL, chave TEXT NOT NULL, valor BLOB NOT NULL, expira_em REAL NOT NULL,
+    PRIMARY KEY (nome, chave)
+);
+CREATE INDEX IF NOT EXISTS ix_cache_valores_expira_em ON cache_valores (nome, expira_em);
+CREATE TABLE IF NOT EXISTS cache_geracoes (nome TEXT PRIMARY KEY, geracao INTEGER NOT NULL, alterado_em REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS cache_arrendamentos (
+    nome TEXT NOT NULL, chave TEXT NOT NULL, dono TEXT NOT NULL, expira_em REAL NOT NULL,
+    PRIMARY KEY (nome, chave)
+);
+"""
+
+
+def serializar(valor) -> bytes:
+    return pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def desserializar(dados: bytes):
+    return pickle.loads(dados)
+
+
+class CacheSQLite:
+    """
+    Cache com TTL e tamanho máximo guardado em um arquivo SQLite compartilhado. Cada cache usa as linhas do
+    seu 'nome'; as expiradas são removidas nas gravações e, acima de maxsize, saem primeiro as que expiram antes.
+
+    executar_uma_vez() coordena os processos: só quem obtém o arrendamento (lease) da chave chama o provedor,
+    e os demais esperam o valor aparecer no cache. O arrendamento vence depois de 'arrendamento' segundos,
+    para que a queda de um processo no meio do cálculo não trave os outros.
+    """
+
+    # Cada thread usa a sua conexão: o decorator cached não precisa (e não deve, por causa da E/S) ler ou
+    # gravar este cache sob o seu lock
+    seguro_entre_threads = True
+
+    def __init__(self, nome, maxsize, ttl, caminho, arrendamento=30.0):
+        self.nome = nome
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.caminho = caminho
+        self.arrendamento = arrendamento
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conexao().executescript(ESQUEMA)
+        metricas.registrar_medidor('carteira_cache_size', lambda: len(self), cache=nome)
+        metricas.registrar_medidor('carteira_cache_maxsize', lambda: self.maxsize, cache=nome)
+        metricas.registrar_medidor('carteira_cache_ttl_seconds', lambda: self.ttl, cache=nome)
+
+    def _conexao(self):
+        # Uma conexão por thread, em modo autocommit (cada comando é uma transação)
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def __getitem__(self, key):
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache_valores WHERE nome = ? AND chave = ? AND expira_em > ?",
+            (self.nome, repr(key), time.time())
+        ).fetchone()
+        if linha is None:
+            raise KeyError(key)
+        return desserializar(linha[0])
+
+    def __setitem__(self, key, value):
+        agora = time.time()
+        conexao = self._conexao()
+        dados = serializar(value)
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            expirados = conexao.execute("DELETE FROM cache_valores WHERE nome = ? AND expira_em <= ?",
+                                        (self.nome, agora)).rowcount
+            conexao.execute(
+                "INSERT INTO cache_valores (nome, chave, valor, expira_em) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (nome, chave) DO UPDATE SET valor = excluded.valor, expira_em = excluded.expira_em",
+                (self.nome, repr(key), dados, agora + self.ttl)
+            )
+            excedentes = conexao.execute(
+                "DELETE FROM cache_valores WHERE nome = ? AND chave IN (SELECT chave FROM cache_valores WHERE nome = ? "
+                "ORDER BY expira_em LIMIT max((SELECT count(*) FROM cache_valores WHERE nome = ?) - ?, 0))",
+                (self.nome, self.nome, self.nome, self.maxsize)
+            ).rowcount
+            conexao.execute(
+                "INSERT INTO cache_geracoes (nome, geracao, alterado_em) VALUES (?, 1, ?) "
+                "ON CONFLICT (nome) DO UPDATE SET geracao = geracao + 1, alterado_em = excluded.alterado_em",
+                (self.nome, agora)
+            )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        if expirados:
+            metricas.incrementar('carteira_cache_evictions_total', expirados, cache=self.nome, motivo='ttl')
+        if excedentes:
+            metricas.incrementar('carteira_cache_evictions_total', excedentes, cache=self.nome, motivo='tamanho')
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return self._conexao().execute("SELECT count(*) FROM cache_valores WHERE nome = ? AND expira_em > ?",
+                                       (self.nome, time.time())).fetchone()[0]
+
+    def _estado_geracao(self):
+        linha = self._conexao().execute("SELECT geracao, alterado_em FROM cache_geracoes WHERE nome = ?",
+                                        (self.nome,)).fetchone()
+        return linha or (0, 0.0)
+
+    @property
+    def geracao(self):
+        """Valores gravados por todos os processos; identifica a versão das respostas calculadas do cache."""
+        return self._estado_geracao()[0]
+
+    @property
+    def alterado_em(self):
+        return self._estado_geracao()[1]
+
+    def _adquirir(self, chave, dono, duracao=None):
+        agora = time.time()
+        duracao = self.arrendamento if duracao is None else duracao
+        return self._conexao().execute(
+            "INSERT INTO cache_arrendamentos (nome, chave, dono, expira_em) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (nome, chave) DO UPDATE SET dono = excluded.dono, expira_em = excluded.expira_em "
+            "WHERE cache_arrendamentos.expira_em <= ?",
+            (self.nome, chave, dono, agora + duracao, agora)
+        ).rowcount == 1
+
+    def _liberar(self, chave, dono):
+        self._conexao().execute("DELETE FROM cache_arrendamentos WHERE nome = ? AND chave = ? AND dono = ?",
+                                (self.nome, chave, dono))
+
+    def reservar(self, key, duracao) -> bool:
+        """
+        Tenta reservar a chave por 'duracao' segundos, sem esperar e sem liberar depois: retorna False se outro
+        processo a reservou nesse prazo. Usado para que só um worker execute cada rodada do agendador.
+        """
+        return self._adquirir(repr(key), f"{os.getpid()}:{threading.get_ident()}", duracao)
+
+    def executar_uma_vez(self, key, funcao):
+        """
+        Executa funcao() se nenhum outro processo estiver calculando a mesma chave; caso contrário, espera o valor
+        calculado por ele. Retorna (valor, calculado), com calculado=False quando o valor veio de outro processo.
+        O valor calculado aqui já volta gravado no cache.
+        """
+        chave, dono = repr(key), f"{os.getpid()}:{threading.get_ident()}"
+        espera = 0.02
+        while not self._adquirir(chave, dono):
+            time.sleep(espera)
+            espera = min(espera * 2, 0.5)
+            try:
+                return self[key], False
+            except KeyError:
+                pass  # Ainda calculando (se o outro processo cair, o arrendamento vence e esta espera acaba)
+        try:
+            # O outro processo pode ter terminado entre a leitura do cache e a obtenção do arrendamento
+            try:
+                return self[key], False
+            except KeyError:
+                pass
+            valor = funcao()
+            # Grava antes de liberar o arrendamento: depois da liberação, outro processo que não achasse o valor
+            # no cache calcularia de novo
+            try:
+                self[key] = valor
+            except sqlite3.Error as e:
+                # Ex.: 'database is locked'. O valor é entregue mesmo assim
+                print(f"Erro ao gravar no cache {self.nome}: {e}")
+            return valor, True
+        finally:
+            self._liberar(chave, dono)
@@ -1,40 +1,300 @@
 # backend/caching.py
+import contextlib
+import copy
 import functools
-from cachetools import TTLCache
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from cachetools import Cache, TTLCache, LRUCache
+from backend import metricas, perfil
+from backend.cache_sqlite import CacheSQLite
+from backend.config import CACHE_BACKEND, CACHE_SQLITE_CAMINHO, CACHE_ARRENDAMENTO, CACHE_ATUALIZACOES_MAX_THREADS
+
+metricas.descrever('carteira_cache_hits_total', 'counter', 'Chamadas atendidas pelo cache.')
+metricas.descrever('carteira_cache_misses_total', 'counter', 'Chamadas que precisaram executar a função (consulta ao provedor).')
+metricas.descrever('carteira_cache_coalesced_total', 'counter', 'Chamadas que aguardaram uma execução já em andamento para a mesma chave.')
+metricas.descrever('carteira_cache_stale_hits_total', 'counter', 'Chamadas atendidas com um valor expirado (stale-while-revalidate).')
+metricas.descrever('carteira_cache_negative_hits_total', 'counter', 'Chamadas que receberam uma falha ainda em backoff.')
+metricas.descrever('carteira_cache_evictions_total', 'counter', 'Itens removidos do cache, por tamanho ou por expiração do TTL.')
+metricas.descrever('carteira_cache_size', 'gauge', 'Quantidade atual de itens no cache.')
+metricas.descrever('carteira_cache_maxsize', 'gauge', 'Capacidade máxima do cache.')
+metricas.descrever('carteira_cache_ttl_seconds', 'gauge', 'TTL configurado do cache.')
+metricas.descrever('carteira_upstream_latency_seconds', 'histogram', 'Duração das execuções das funções cacheadas (chamadas ao provedor).')
+
+
+class MonitoredTTLCache(TTLCache):
+    """
+    TTLCache com nome, que publica tamanho, capacidade e remoções em metricas.
+    'geracao' conta os valores gravados (e 'alterado_em' marca o último), para identificar a versão
+    das respostas da API calculadas a partir do cache.
+    """
+
+    def __init__(self, nome, maxsize, ttl):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.nome = nome
+        self.geracao = 0
+        self.alterado_em = time.time()
+        metricas.registrar_medidor('carteira_cache_size', lambda: len(self), cache=nome)
+        metricas.registrar_medidor('carteira_cache_maxsize', lambda: self.maxsize, cache=nome)
+        metricas.registrar_medidor('carteira_cache_ttl_seconds', lambda: self.ttl, cache=nome)
+
+    def __setitem__(self, key, value, *args, **kwargs):
+        super().__setitem__(key, value, *args, **kwargs)
+        self.geracao += 1
+        self.alterado_em = time.time()
+
+    def popitem(self):
+        # Chamado pelo cachetools quando o cache está cheio e precisa abrir espaço
+        item = super().popitem()
+        metricas.incrementar('carteira_cache_evictions_total', cache=self.nome, motivo='tamanho')
+        return item
+
+    def expire(self, time=None):
+        expirados = super().expire(time)
+        if expirados:
+            metricas.incrementar('carteira_cache_evictions_total', len(expirados), cache=self.nome, motivo='ttl')
+        return expirados
+
+
+def criar_cache(nome, maxsize, ttl):
+    """
+    Cria o cache no backend configurado em CACHE_BACKEND: 'memoria' (um TTLCache por processo) ou 'sqlite'
+    (um arquivo compartilhado pelos workers da máquina, ver backend/cache_sqlite.py).
+    """
+    if CACHE_BACKEND == 'sqlite':
+        return CacheSQLite(nome, maxsize, ttl, CACHE_SQLITE_CAMINHO, arrendamento=CACHE_ARRENDAMENTO)
+    if CACHE_BACKEND == 'memoria':
+        return MonitoredTTLCache(nome, maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Backend de cache desconhecido: {CACHE_BACKEND!r} (use 'memoria' ou 'sqlite').")
+
 
 # Cria um cache que guarda no máximo 512 itens e cada item "vive" por um tempo específico (TTL).
 # Usaremos um cache diferente para cada tipo de dado.
 # Cache para dados que mudam com frequência (cotações): 15 minutos (900 segundos)
-market_data_cache = TTLCache(maxsize=512, ttl=900)
+market_data_cache = criar_cache('market_data', maxsize=512, ttl=900)
 
 # Cache para dados que mudam raramente (CDI): 4 horas (14400 segundos)
-infrequent_data_cache = TTLCache(maxsize=128, ttl=14400)
+infrequent_data_cache = criar_cache('infrequent_data', maxsize=128, ttl=14400)
+
+
+# Os caches do cachetools não são thread-safe; todo acesso a eles passa por este lock, que também protege o
+# controle interno do decorator cached. Caches seguros entre threads que fazem E/S (CacheSQLite) são acessados
+# fora dele: uma gravação esperando o banco compartilhado não pode travar as leituras feitas no event loop.
+_lock = threading.RLock()
+
+# Pool das atualizações em segundo plano dos valores expirados: com muitas chaves expirando juntas,
+# as atualizações esperam na fila em vez de abrir uma thread (e uma chamada ao provedor) cada uma
+_executor_atualizacoes = ThreadPoolExecutor(max_workers=CACHE_ATUALIZACOES_MAX_THREADS, thread_name_prefix="cache-atualizacao")
+
 
+def agendar_atualizacao(funcao, *args, **kwargs):
+    """Executa funcao(*args, **kwargs) no pool das atualizações em segundo plano."""
+    return _executor_atualizacoes.submit(funcao, *args, **kwargs)
 
-def cached(cache):
+
+class ValorExpirado(Exception):
+    """Usada internamente por cached_or_stale: a chave expirou e 'valor' é o último valor conhecido."""
+
+    def __init__(self, valor):
+        super().__init__()
+        self.valor = valor
+
+
+def cached(cache, stale_while_revalidate=False, negative_ttl=None, max_negative_ttl=3600):
     """
     Decorator que aplica um cache específico a uma função.
+
+    Chamadas simultâneas para a mesma chave executam a função uma única vez (single-flight):
+    a primeira chamada calcula o valor e as demais aguardam o mesmo resultado.
+    Com stale_while_revalidate=True, uma chave expirada devolve imediatamente o último valor
+    conhecido enquanto uma única atualização roda em segundo plano.
+
+    negative_ttl mapeia tipos de exceção para o tempo (em segundos) durante o qual a falha fica em cache:
+    nesse período a mesma exceção é relançada sem chamar a função (ou o último valor conhecido é servido,
+    se houver). A cada falha seguida da mesma chave o tempo dobra, até max_negative_ttl.
+
+    'cache' pode ser qualquer mapeamento com TTL (leitura com KeyError para chaves ausentes ou expiradas,
+    gravação e o atributo maxsize), como os criados por criar_cache. Se ele tiver executar_uma_vez(chave, funcao),
+    como o CacheSQLite, a execução também é coordenada entre processos: só um deles chama a função por chave.
     """
+    negative_ttl = negative_ttl or {}
 
     def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
+        em_andamento = {}  # chave -> Future da execução em curso
+        # Últimos valores calculados, mantidos mesmo depois de expirarem no cache principal
+        ultimos_valores = LRUCache(maxsize=cache.maxsize) if stale_while_revalidate else None
+        # Falhas recentes: chave -> {'excecao', 'expira_em', 'falhas'}
+        negativos = LRUCache(maxsize=cache.maxsize)
+
+        labels = {'cache': getattr(cache, 'nome', type(cache).__name__), 'funcao': func.__qualname__}
+
+        def make_key(*args, **kwargs):
             # Cria uma chave única baseada no nome da função e seus argumentos
-            key = functools._make_key(args, kwargs, typed=False)
+            return (func.__qualname__, functools._make_key(args, kwargs, typed=False))
+
+        def ttl_negativo(excecao):
+            for tipo, ttl in negative_ttl.items():
+                if isinstance(excecao, tipo):
+                    return ttl
+            return None
+
+        executar_uma_vez = getattr(cache, 'executar_uma_vez', None)
+        seguro_entre_threads = getattr(cache, 'seguro_entre_threads', False)
+        trava_cache = contextlib.nullcontext() if seguro_entre_threads else _lock
+
+        def ler_cache(key):
+            with trava_cache:
+                return cache[key]
+
+        def gravar_cache(key, valor):
+            with trava_cache:
+                cache[key] = valor
+
+        def acerto(key, result):
+            metricas.incrementar('carteira_cache_hits_total', **labels)
+            if ultimos_valores is not None:
+                # Com o cache compartilhado o valor pode ter sido calculado por outro processo;
+                # guardá-lo aqui permite servi-lo como valor expirado depois
+                with _lock:
+                    ultimos_valores[key] = result
+            return result
 
-            # Tenta pegar o resultado do cache
+        def calcular(key, futuro, args, kwargs):
+            inicio = time.perf_counter()
             try:
-                result = cache[key]
-                # print(f"HIT: Servindo do cache para a chave: {key}") # Descomente para debug
-                return result
-            except KeyError:
-                # Se não encontrar, executa a função original
-                # print(f"MISS: Executando função e salvando no cache para a chave: {key}") # Descomente para debug
-                result = func(*args, **kwargs)
-                # Salva o novo resultado no cache
-                cache[key] = result
-                return result
+                if executar_uma_vez is not None:
+                    result, calculado = executar_uma_vez(key, functools.partial(func, *args, **kwargs))
+                else:
+                    result, calculado = func(*args, **kwargs), True
+            except BaseException as e:
+                metricas.observar('carteira_upstream_latency_seconds', time.perf_counter() - inicio, resultado='erro', **labels)
+                with _lock:
+                    em_andamento.pop(key, None)
+                    ttl = ttl_negativo(e)
+                    if ttl is not None:
+                        # Backoff exponencial: cada falha seguida dobra o tempo até a próxima tentativa
+                        falhas = negativos[key]['falhas'] + 1 if key in negativos else 1
+                        espera = min(ttl * 2 ** (falhas - 1), max_negative_ttl)
+                        # Guarda uma cópia sem traceback: a original segue com quem chamou
+                        negativos[key] = {'excecao': copy.copy(e), 'expira_em': time.monotonic() + espera, 'falhas': falhas}
+                futuro.set_exception(e)
+                return
+            metricas.observar('carteira_upstream_latency_seconds', time.perf_counter() - inicio, resultado='ok', **labels)
+            # Salva o novo resultado no cache (com executar_uma_vez ele já está lá, gravado por este ou outro processo)
+            if calculado and executar_uma_vez is None:
+                try:
+                    gravar_cache(key, result)
+                except Exception as e:
+                    # Ex.: 'database is locked' no cache compartilhado. O resultado é entregue mesmo assim,
+                    # e quem espera por ele (futuro) não pode ficar preso
+                    print(f"Erro ao gravar no cache {labels['cache']} o resultado de {labels['funcao']}: {e}")
+            with _lock:
+                if ultimos_valores is not None:
+                    ultimos_valores[key] = result
+                negativos.pop(key, None)
+                em_andamento.pop(key, None)
+            futuro.set_result(result)
+
+        def resolver(key, args, kwargs, somente_cache=False, atualizar_expirado=True):
+            if seguro_entre_threads:
+                # Tenta pegar o resultado do cache (fora do _lock, ver acima)
+                try:
+                    return acerto(key, cache[key])
+                except KeyError:
+                    pass
+            with _lock:
+                if not seguro_entre_threads:
+                    # Tenta pegar o resultado do cache, na mesma seção crítica do controle abaixo
+                    try:
+                        return acerto(key, cache[key])
+                    except KeyError:
+                        pass
+
+                tem_valor_antigo = ultimos_valores is not None and key in ultimos_valores
+                negativo = negativos.get(key)
+                if negativo is not None and time.monotonic() < negativo['expira_em']:
+                    # Falha recente: não chama a função de novo antes do fim do backoff
+                    if tem_valor_antigo:
+                        metricas.incrementar('carteira_cache_stale_hits_total', **labels)
+                        return ultimos_valores[key]
+                    metricas.incrementar('carteira_cache_negative_hits_total', **labels)
+                    # Uma instância nova por chamada: relançar a guardada acumularia os tracebacks (e os frames)
+                    # de todas as chamadas no mesmo objeto, compartilhado entre as threads
+                    raise copy.copy(negativo['excecao']).with_traceback(None)
+
+                futuro = em_andamento.get(key)
+                if futuro is None:
+                    if tem_valor_antigo:
+                        metricas.incrementar('carteira_cache_stale_hits_total', **labels)
+                        if not atualizar_expirado:
+                            raise ValorExpirado(ultimos_valores[key])
+                        # Serve o valor expirado e atualiza em segundo plano
+                        futuro = em_andamento[key] = Future()
+                        agendar_atualizacao(calcular, key, futuro, args, kwargs)
+                        return ultimos_valores[key]
+                    if somente_cache:
+                        raise KeyError(key)
+                    futuro = em_andamento[key] = Future()
+                    metricas.incrementar('carteira_cache_misses_total', **labels)
+                    responsavel = True
+                elif tem_valor_antigo:
+                    metricas.incrementar('carteira_cache_stale_hits_total', **labels)
+                    return ultimos_valores[key]
+                elif somente_cache:
+                    raise KeyError(key)
+                else:
+                    metricas.incrementar('carteira_cache_coalesced_total', **labels)
+                    responsavel = False
+
+            if responsavel:
+                calcular(key, futuro, args, kwargs)
+            # Quem não é responsável pelo cálculo espera o resultado (ou a exceção) da execução em curso
+            return futuro.result()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with perfil.medir_cache():
+                return resolver(make_key(*args, **kwargs), args, kwargs)
+
+        def cached_only(*args, **kwargs):
+            """
+            Resolve a chamada sem executar a função de forma síncrona: devolve o valor em cache ou o último
+            valor conhecido (disparando a atualização em segundo plano), relança uma falha ainda em backoff,
+            ou lança KeyError quando seria preciso calcular.
+            """
+            with perfil.medir_cache():
+                return resolver(make_key(*args, **kwargs), args, kwargs, somente_cache=True)
+
+        def cached_or_stale(*args, **kwargs):
+            """
+            Como cached_only, mas sem disparar a atualização de um valor expirado: retorna (valor, expirado),
+            para que quem chama atualize de uma vez todas as chaves expiradas (ex.: um download em lote).
+            """
+            with perfil.medir_cache():
+                try:
+                    return resolver(make_key(*args, **kwargs), args, kwargs, somente_cache=True, atualizar_expirado=False), False
+                except ValorExpirado as e:
+                    return e.valor, True
+
+        def cache_get(*args, **kwargs):
+            """Retorna o valor em cache para os argumentos (KeyError se não houver)."""
+            return ler_cache(make_key(*args, **kwargs))
+
+        def cache_set(value, *args, **kwargs):
+            """Grava no cache um valor já calculado, como se a função tivesse sido chamada com os argumentos."""
+            key = make_key(*args, **kwargs)
+            gravar_cache(key, value)
+            with _lock:
+                if ultimos_valores is not None:
+                    ultimos_valores[key] = value
+                negativos.pop(key, None)
 
+        # Só com o cache em memória a consulta a ele é rápida o bastante para o event loop (ver chamar_provedor)
+        wrapper.cache_em_memoria = isinstance(cache, Cache)
+        wrapper.cached_only = cached_only
+        wrapper.cached_or_stale = cached_or_stale
+        wrapper.cache_get = cache_get
+        wrapper.cache_set = cache_set
         return wrapper
 
     return decorator
\ No newline at end of file
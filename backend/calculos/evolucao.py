@@ -0,0 +1,78 @@
+# calculos/evolucao.py
+import numpy as np
+import pandas as pd
+
+COLUNAS_FLUXOS = ['ticker', 'data', 'quantidade', 'fluxo']
+
+
+def calcular_evolucao(fluxos: pd.DataFrame, fechamentos: pd.DataFrame, dividendos: pd.DataFrame = None):
+    """
+    Calcula a evolução diária da carteira com operações vetorizadas (sem laços por dia ou por ativo).
+
+    fluxos: colunas ticker, data, quantidade e fluxo, com a variação de quantidade e o caixa aplicado
+    por ativo em cada dia (vendas negativas), como em consultas.fluxos_por_dia.
+    fechamentos / dividendos: matrizes data x ticker com o fechamento e o provento por cota de cada pregão.
+
+    Retorna um DataFrame indexado pela data com valor, investido (aportes líquidos acumulados), fluxo,
+    dividendos e retorno_acumulado (retorno ponderado pelo tempo, em %).
+    """
+    # Os valores vêm do banco como Decimal (coluna Numeric)
+    fluxos = fluxos.assign(data=pd.to_datetime(fluxos['data']), quantidade=fluxos['quantidade'].astype(float),
+                           fluxo=fluxos['fluxo'].astype(float))
+    tickers = sorted(fluxos['ticker'].unique())
+    inicio = fluxos['data'].min()
+
+    # Calendário: pregões a partir da primeira operação, mais os dias com operação
+    calendario = fechamentos.index[fechamentos.index >= inicio] \
+        .union(pd.DatetimeIndex(fluxos['data'].unique())).sort_values()
+
+    por_dia = fluxos.pivot_table(index='data', columns='ticker', values=['quantidade', 'fluxo'], aggfunc='sum')
+    variacoes = por_dia['quantidade'].reindex(index=calendario, columns=tickers).fillna(0)
+    caixa = por_dia['fluxo'].reindex(index=calendario, columns=tickers).fillna(0)
+    quantidades = variacoes.cumsum().to_numpy()
+
+    # Último fechamento conhecido em cada dia do calendário; sem cotação, vale o preço da última operação
+    precos = fechamentos.reindex(columns=tickers)
+    precos = precos.reindex(precos.index.union(calendario)).ffill().reindex(calendario)
+    precos_operacoes = (caixa / variacoes.where(variacoes != 0)).where(lambda p: p > 0).ffill()
+    precos = precos.fillna(precos_operacoes).to_numpy()
+
+    valor = np.where(quantidades != 0, quantidades * np.nan_to_num(precos), 0.0).sum(axis=1)
+    fluxo = caixa.to_numpy().sum(axis=1)
+
+    proventos = np.zeros(len(calendario))
+    if dividendos is not None and not dividendos.empty:
+        por_cota = dividendos.reindex(index=calendario, columns=tickers).fillna(0).to_numpy()
+        # O provento é de quem tinha a cota no fim do dia anterior à data ex
+        quantidades_anteriores = np.vstack([np.zeros((1, len(tickers))), quantidades[:-1]])
+        proventos = (quantidades_anteriores * por_cota).sum(axis=1)
+
+    # Retorno diário ponderado pelo tempo: aportes entram no início do dia e resgates saem no fim,
+    # de modo que nem a primeira compra nem a venda total distorcem o retorno
+    valor_anterior = np.concatenate([[0.0], valor[:-1]])
+    aportes = np.clip(fluxo, 0, None)
+    resgates = np.clip(-fluxo, 0, None)
+    base = valor_anterior + aportes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retorno_dia = np.where(base > 0, (valor + proventos + resgates) / base - 1, 0.0)
+
+    return pd.DataFrame({
+        'valor': valor,
+        'investido': np.cumsum(fluxo),
+        'fluxo': fluxo,
+        'dividendos': proventos,
+        'retorno_acumulado': (np.cumprod(1 + retorno_dia) - 1) * 100,
+    }, index=calendario.rename('data'))
+
+
+def recortar_periodo(evolucao: pd.DataFrame, inicio=None, fim=None):
+    """Restringe a evolução ao período pedido, com o retorno acumulado recalculado a partir do início do período."""
+    if inicio is not None:
+        anteriores = evolucao.loc[evolucao.index < pd.Timestamp(inicio), 'retorno_acumulado']
+        evolucao = evolucao.loc[evolucao.index >= pd.Timestamp(inicio)].copy()
+        if not anteriores.empty:
+            base = 1 + anteriores.iloc[-1] / 100
+            evolucao['retorno_acumulado'] = ((1 + evolucao['retorno_acumulado'] / 100) / base - 1) * 100
+    if fim is not None:
+        evolucao = evolucao.loc[evolucao.index <= pd.Timestamp(fim)]
+    return evolucao
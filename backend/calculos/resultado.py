@@ -0,0 +1,62 @@
+# calculos/resultado.py
+
+# Vendas de ações no mês até este valor são isentas de IR no swing trade (FIIs e ETFs não têm isenção)
+LIMITE_ISENCAO_ACOES = 20000.0
+
+
+def estado_vazio():
+    return {'quantidade': 0, 'custo_total': 0.0, 'lucro_realizado': 0.0}
+
+
+def apurar(operacoes, estado=None):
+    """
+    Apura o resultado realizado pelo método do custo médio em uma única passagem pelas operações.
+
+    operacoes: iterável, em ordem cronológica, de objetos com id_ticker, tipo_ativo, tipo_operacao,
+    data_operacao, preco e quantidade.
+    estado: dicionário id_ticker -> {'quantidade', 'custo_total', 'lucro_realizado'} com a situação de cada
+    ativo antes da primeira operação; é atualizado no lugar, servindo de ponto de partida para a apuração seguinte.
+
+    Retorna um dicionário (mes 'AAAA-MM', tipo_ativo) -> {'total_vendas', 'custo_vendas', 'lucro'}
+    com os meses em que houve vendas.
+    """
+    estado = {} if estado is None else estado
+    meses = {}
+    for op in operacoes:
+        ativo = estado.get(op.id_ticker)
+        if ativo is None:
+            ativo = estado[op.id_ticker] = estado_vazio()
+        quantidade = int(op.quantidade)
+        preco = float(op.preco)
+
+        if op.tipo_operacao == 'Comprar':
+            ativo['quantidade'] += quantidade
+            ativo['custo_total'] += preco * quantidade
+            continue
+        if op.tipo_operacao != 'Vender':
+            continue
+
+        # Venda: a baixa é pelo custo médio; o que for vendido além da posição não tem custo conhecido
+        # e entra pelo próprio preço de venda (sem lucro nem prejuízo)
+        em_carteira = min(quantidade, max(ativo['quantidade'], 0))
+        custo_medio = ativo['custo_total'] / ativo['quantidade'] if ativo['quantidade'] > 0 else 0.0
+        custo = custo_medio * em_carteira + preco * (quantidade - em_carteira)
+        lucro = preco * quantidade - custo
+
+        ativo['quantidade'] -= quantidade
+        ativo['custo_total'] = ativo['custo_total'] - custo_medio * em_carteira if ativo['quantidade'] > 0 else 0.0
+        ativo['lucro_realizado'] += lucro
+
+        mes = meses.get((op.data_operacao.strftime('%Y-%m'), op.tipo_ativo))
+        if mes is None:
+            mes = meses[(op.data_operacao.strftime('%Y-%m'), op.tipo_ativo)] = \
+                {'total_vendas': 0.0, 'custo_vendas': 0.0, 'lucro': 0.0}
+        mes['total_vendas'] += preco * quantidade
+        mes['custo_vendas'] += custo
+        mes['lucro'] += lucro
+    return meses
+
+
+def isento(tipo_ativo, total_vendas):
+    """Indica se o lucro do mês é isento de IR (ações com vendas até LIMITE_ISENCAO_ACOES no mês)."""
+    return tipo_ativo == 'Ação' and total_vendas <= LIMITE_ISENCAO_ACOES
@@ -0,0 +1,56 @@
+# calculos/series.py
+import numpy as np
+import pandas as pd
+
+
+def lttb(y, pontos: int):
+    """
+    Redução de uma série para 'pontos' amostras pelo algoritmo Largest-Triangle-Three-Buckets,
+    que preserva a forma visual (picos e vales) melhor que pegar um ponto a cada k.
+    Retorna os índices (posições) dos pontos escolhidos, sempre incluindo o primeiro e o último.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    # Os pontos do meio são divididos em (pontos - 2) baldes de tamanho quase igual
+    limites = np.linspace(1, n - 1, pontos - 1).astype(int)
+    escolhidos = np.empty(pontos, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    anterior = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # O terceiro vértice do triângulo é a média do balde seguinte (ou o último ponto)
+        prox_inicio, prox_fim = fim, limites[i + 2] if i + 2 < len(limites) else n
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else inicio
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def codificar_compacto(serie: pd.DataFrame, casas: int = 2):
+    """
+    Codifica uma série diária em um formato numérico compacto: as datas viram a diferença em dias para
+    a data anterior (a partir de 'inicio') e cada coluna vira inteiros em escala 10^casas, também como
+    diferenças do valor anterior. Para decodificar basta a soma acumulada de cada lista
+    (dividindo os valores por 'escala'). Valores ausentes são repetidos a partir do anterior.
+    """
+    if serie.empty:
+        return {"inicio": None, "escala": 10 ** casas, "datas": [], "colunas": {}}
+    dias = (serie.index.normalize() - serie.index[0].normalize()).days.to_numpy()
+    colunas = {}
+    for coluna in serie.columns:
+        inteiros = np.rint(serie[coluna].ffill().fillna(0).to_numpy() * 10 ** casas).astype(np.int64)
+        colunas[coluna] = np.diff(inteiros, prepend=0).tolist()
+    return {
+        "inicio": serie.index[0].date().isoformat(),
+        "escala": 10 ** casas,
+        "datas": np.diff(dias, prepend=0).tolist(),
+        "colunas": colunas,
+    }
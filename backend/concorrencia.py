@@ -0,0 +1,31 @@
+# backend/concorrencia.py
+import functools
+import anyio
+from backend import metricas
+from backend.config import PROVEDORES_MAX_THREADS
+
+# Os endpoints síncronos (CRUD) rodam no threadpool padrão do FastAPI. As chamadas bloqueantes aos
+# provedores (Yahoo Finance e BCB) feitas pelos endpoints assíncronos usam um limite de threads próprio,
+# de modo que dashboards lentos esperando o provedor não ocupem as threads do CRUD.
+limitador_provedores = anyio.CapacityLimiter(PROVEDORES_MAX_THREADS)
+
+metricas.descrever('carteira_provedores_threads_em_uso', 'gauge', 'Threads ocupadas com chamadas aos provedores de dados.')
+metricas.registrar_medidor('carteira_provedores_threads_em_uso', lambda: limitador_provedores.borrowed_tokens)
+metricas.descrever('carteira_provedores_threads_maximo', 'gauge', 'Limite de threads para chamadas aos provedores de dados.')
+metricas.registrar_medidor('carteira_provedores_threads_maximo', lambda: limitador_provedores.total_tokens)
+
+
+async def chamar_provedor(func, *args, **kwargs):
+    """
+    Executa uma função bloqueante de acesso a provedor sem travar o event loop.
+    Funções com cache em memória (decorator cached) são resolvidas primeiro direto do cache, sem trocar de
+    thread; só quando seria preciso consultar o provedor a chamada vai para uma thread do limite dos provedores.
+    Com o cache em disco (CacheSQLite) até a leitura bloqueia, então a chamada inteira vai para a thread.
+    """
+    cached_only = getattr(func, 'cached_only', None)
+    if cached_only is not None and getattr(func, 'cache_em_memoria', False):
+        try:
+            return cached_only(*args, **kwargs)
+        except KeyError:
+            pass
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=limitador_provedores)
@@ -0,0 +1,73 @@
+# backend/config.py
+import os
+
+# Configurações do backend. Todas podem ser sobrescritas por variáveis de ambiente.
+
+# --- Dados de mercado (Yahoo Finance) ---
+# Provedor dos dados de mercado e do CDI: 'real' (Yahoo Finance e Banco Central) ou 'falso'
+# (dados sintéticos determinísticos, sem rede; para testes e benchmarks)
+PROVEDOR = os.getenv("CARTEIRA_PROVEDOR", "real")
+# Provedor falso: espera (em segundos) e probabilidade de falha de cada chamada, e semente dos dados gerados
+PROVEDOR_FALSO_LATENCIA = float(os.getenv("CARTEIRA_PROVEDOR_FALSO_LATENCIA", "0"))
+PROVEDOR_FALSO_TAXA_ERRO = float(os.getenv("CARTEIRA_PROVEDOR_FALSO_TAXA_ERRO", "0"))
+PROVEDOR_FALSO_SEMENTE = int(os.getenv("CARTEIRA_PROVEDOR_FALSO_SEMENTE", "0"))
+# Número máximo de tickers buscados em paralelo
+MARKET_DATA_MAX_WORKERS = int(os.getenv("CARTEIRA_MARKET_DATA_MAX_WORKERS", "8"))
+# Tempo máximo (em segundos) de espera pelos dados de cada ticker
+MARKET_DATA_TIMEOUT = float(os.getenv("CARTEIRA_MARKET_DATA_TIMEOUT", "15"))
+# Tempo (em segundos) em que o histórico salvo localmente é considerado atual, sem consultar o provedor
+MARKET_DATA_FRESCOR = int(os.getenv("CARTEIRA_MARKET_DATA_FRESCOR", "900"))
+# Tempo base (em segundos) em que uma falha fica em cache antes de nova tentativa; dobra a cada falha seguida
+NEGATIVE_TTL_ERRO_PROVEDOR = int(os.getenv("CARTEIRA_NEGATIVE_TTL_ERRO_PROVEDOR", "30"))
+NEGATIVE_TTL_NAO_ENCONTRADO = int(os.getenv("CARTEIRA_NEGATIVE_TTL_NAO_ENCONTRADO", "300"))
+
+# --- Cache ---
+# Onde ficam os caches de cotações e do CDI: 'memoria' (um por processo) ou 'sqlite' (um arquivo compartilhado
+# pelos workers da máquina, para que cada dado seja buscado no provedor uma vez só, com qualquer número de workers)
+CACHE_BACKEND = os.getenv("CARTEIRA_CACHE_BACKEND", "memoria")
+CACHE_SQLITE_CAMINHO = os.getenv("CARTEIRA_CACHE_SQLITE_CAMINHO", os.path.join("data", "cache.db"))
+# Tempo máximo (em segundos) em que um processo fica como responsável por buscar uma chave do cache compartilhado;
+# se ele cair no meio da busca, outro processo assume depois desse prazo
+CACHE_ARRENDAMENTO = float(os.getenv("CARTEIRA_CACHE_ARRENDAMENTO", "30"))
+# Threads que atualizam em segundo plano os valores expirados (stale-while-revalidate); as demais atualizações esperam na fila
+CACHE_ATUALIZACOES_MAX_THREADS = int(os.getenv("CARTEIRA_CACHE_ATUALIZACOES_MAX_THREADS", "4"))
+
+# --- Concorrência ---
+# Número máximo de threads ocupadas ao mesmo tempo com chamadas bloqueantes aos provedores (Yahoo Finance, BCB)
+# feitas pelos endpoints assíncronos; é separado do threadpool que atende os endpoints de cadastro
+PROVEDORES_MAX_THREADS = int(os.getenv("CARTEIRA_PROVEDORES_MAX_THREADS", "16"))
+
+# --- Agendador (aquecimento do cache em segundo plano) ---
+# Liga o agendador iniciado junto com a API (0 desliga, por exemplo em testes ou com vários workers)
+AGENDADOR_ATIVO = os.getenv("CARTEIRA_AGENDADOR_ATIVO", "1") == "1"
+# Intervalo (em segundos) entre as atualizações das cotações com o pregão aberto; menor que o TTL do cache de mercado
+AGENDADOR_INTERVALO_PREGAO = int(os.getenv("CARTEIRA_AGENDADOR_INTERVALO_PREGAO", "600"))
+# Intervalo (em segundos) entre as atualizações das cotações fora do pregão
+AGENDADOR_INTERVALO_FORA_PREGAO = int(os.getenv("CARTEIRA_AGENDADOR_INTERVALO_FORA_PREGAO", "3600"))
+# Horário de negociação da B3 (horário de Brasília, HH:MM), incluindo o call de fechamento
+B3_ABERTURA = os.getenv("CARTEIRA_B3_ABERTURA", "10:00")
+B3_FECHAMENTO = os.getenv("CARTEIRA_B3_FECHAMENTO", "18:30")
+# Horário (de Brasília, HH:MM) da atualização diária do CDI; o BCB publica a taxa do dia útil anterior pela manhã
+AGENDADOR_HORARIO_CDI = os.getenv("CARTEIRA_AGENDADOR_HORARIO_CDI", "10:00")
+# Backup diário do banco (ver SQL/backup.py) feito pelo agendador, e o horário (de Brasília, HH:MM) em que roda
+BACKUP_AUTOMATICO = os.getenv("CARTEIRA_BACKUP_AUTOMATICO", "1") == "1"
+AGENDADOR_HORARIO_BACKUP = os.getenv("CARTEIRA_AGENDADOR_HORARIO_BACKUP", "03:00")
+
+# --- Perfil (diagnóstico de desempenho por requisição, ver backend/perfil.py) ---
+# Liga o middleware que mede cada requisição (SQL, funções com cache, serialização, tamanho da resposta)
+PERFIL_ATIVO = os.getenv("CARTEIRA_PERFIL", "0") == "1"
+# Requisições mais lentas que isso (em milissegundos) são registradas no log de lentas
+PERFIL_LIMITE_LENTO_MS = float(os.getenv("CARTEIRA_PERFIL_LIMITE_LENTO_MS", "500"))
+# Arquivo do log de lentas (JSON, uma requisição por linha); vazio imprime na saída padrão
+PERFIL_LOG_LENTAS = os.getenv("CARTEIRA_PERFIL_LOG_LENTAS", os.path.join("data", "requisicoes_lentas.jsonl"))
+# Prefixo das rotas que passam pelo profiler por amostragem (ex.: /api/dashboard/performance); vazio desliga
+PERFIL_AMOSTRAGEM_ROTA = os.getenv("CARTEIRA_PERFIL_AMOSTRAGEM_ROTA", "")
+# Intervalo (em segundos) entre as amostras e pasta onde os perfis (formato folded, para flamegraphs) são gravados
+PERFIL_AMOSTRAGEM_INTERVALO = float(os.getenv("CARTEIRA_PERFIL_AMOSTRAGEM_INTERVALO", "0.005"))
+PERFIL_DIRETORIO = os.getenv("CARTEIRA_PERFIL_DIRETORIO", "perfis")
+
+# --- CDI (Banco Central) ---
+# Data a partir da qual a série diária do CDI é guardada no banco local (AAAA-MM-DD)
+CDI_DATA_INICIAL = os.getenv("CARTEIRA_CDI_DATA_INICIAL", "2010-01-01")
+# Tempo máximo (em segundos) de espera por cada consulta à API do BCB
+CDI_TIMEOUT = float(os.getenv("CARTEIRA_CDI_TIMEOUT", "10"))
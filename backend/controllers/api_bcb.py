@@ -1,34 +1,87 @@
 # backend/controllers/api_bcb.py
-from datetime import datetime
+from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
-import requests
 from backend.caching import cached, infrequent_data_cache  # Importa o decorator e o cache específico
+from backend.config import NEGATIVE_TTL_ERRO_PROVEDOR, CDI_DATA_INICIAL
+from calculos.cdi import IndiceCdi
+from SQL import database, cdi
+from .erros import ErroProvedor
+from .provedores import provedor
 
+# A API do SGS limita as consultas de séries diárias a janelas de até 10 anos
+JANELA_MAXIMA_CONSULTA = timedelta(days=3650)
 
-@cached(infrequent_data_cache)
-def get_cdi_accumulated():
-    """Obtém o CDI acumulado dos últimos 12 meses do Banco Central. O resultado é cacheado."""
-    end_date = datetime.now()
-    start_date = end_date - relativedelta(years=1)
 
-    url = (
-        f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.11/dados"
-        f"?formato=json&dataInicial={start_date.strftime('%d/%m/%Y')}"
-        f"&dataFinal={end_date.strftime('%d/%m/%Y')}"
-    )
+def _baixar_taxas(inicio: date, fim: date):
+    """Baixa as taxas diárias do CDI (série 11 do SGS) entre 'inicio' e 'fim', em quantas consultas forem precisas."""
+    taxas = []
+    while inicio <= fim:
+        fim_consulta = min(fim, inicio + JANELA_MAXIMA_CONSULTA)
+        try:
+            taxas += provedor().taxas_cdi(inicio, fim_consulta)
+        except Exception as e:
+            raise ErroProvedor(f"Erro ao consultar o CDI no Banco Central: {e}") from e
+        inicio = fim_consulta + timedelta(days=1)
+    return taxas
 
+
+def atualizar_cdi():
+    """
+    Complementa a série local com as taxas publicadas depois da última armazenada
+    (na primeira execução, desde CDI_DATA_INICIAL). Retorna quantas taxas foram gravadas.
+    Lança ErroProvedor se a API do BCB falhar.
+    """
+    session = database.get_db_session()
+    try:
+        ultima = cdi.ultima_data(session)
+        inicio = ultima + timedelta(days=1) if ultima else date.fromisoformat(CDI_DATA_INICIAL)
+        if inicio > date.today():
+            return 0
+        taxas = _baixar_taxas(inicio, date.today())
+        cdi.salvar_taxas(session, taxas)
+        session.commit()
+        return len(taxas)
+    finally:
+        session.remove()
+
+
+@cached(infrequent_data_cache, stale_while_revalidate=True, negative_ttl={ErroProvedor: NEGATIVE_TTL_ERRO_PROVEDOR})
+def get_indice_cdi():
+    """
+    Índice da série diária do CDI guardada no banco local. O resultado é cacheado; a cada expiração
+    só as taxas novas são baixadas do Banco Central. Com a API do BCB fora do ar, a série local
+    (mesmo desatualizada) continua sendo usada. Lança ErroProvedor se não houver nenhuma taxa armazenada.
+    """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        atualizar_cdi()
+    except ErroProvedor as e:
+        print(f"Erro ao atualizar o CDI, usando a série local: {e}")
+    return _carregar_indice()
+
+
+def _carregar_indice():
+    session = database.get_db_session()
+    try:
+        datas, taxas = cdi.carregar_serie(session)
+    finally:
+        session.remove()
+    if not len(datas):
+        raise ErroProvedor("Nenhuma taxa do CDI disponível: a série local está vazia e o Banco Central não respondeu.")
+    return IndiceCdi(datas, taxas)
+
 
-        if not data:
-            return 0.0
+def recarregar_indice_cdi():
+    """
+    Baixa as taxas novas e substitui o índice em cache, sem esperar a expiração (usado pelo agendador).
+    Lança ErroProvedor se a API do BCB falhar; nesse caso o índice em cache não é alterado.
+    """
+    atualizar_cdi()
+    indice = _carregar_indice()
+    get_indice_cdi.cache_set(indice)
+    return indice
 
-        acumulado = 1.0
-        for entry in data:
-            acumulado *= (1 + float(entry['valor']) / 100)
 
-        return (acumulado - 1) * 100
-    except Exception:
-        return None
+def acumulado_12m(indice: IndiceCdi):
+    """CDI acumulado (%) dos últimos 12 meses, até hoje (inclusive)."""
+    hoje = date.today()
+    return indice.acumulado(hoje - relativedelta(years=1), hoje + timedelta(days=1))
@@ -0,0 +1,9 @@
+# backend/controllers/erros.py
+
+
+class DadosNaoEncontrados(Exception):
+    """O provedor respondeu normalmente, mas não há dados para o pedido (ex.: ticker inexistente)."""
+
+
+class ErroProvedor(Exception):
+    """Falha ao consultar o provedor externo (rede, tempo limite, resposta inválida)."""
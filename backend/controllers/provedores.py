@@ -0,0 +1,177 @@
+# backend/controllers/provedores.py
+import functools
+import random
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+from backend.config import (PROVEDOR, PROVEDOR_FALSO_LATENCIA, PROVEDOR_FALSO_TAXA_ERRO, PROVEDOR_FALSO_SEMENTE,
+                            MARKET_DATA_TIMEOUT, CDI_TIMEOUT)
+
+# Acesso às fontes externas de dados de mercado. yahoo_finance.py e api_bcb.py cuidam de cache, banco local e
+# tratamento de erros e pedem ao provedor atual (provedor()) só os dados brutos. Além do provedor real (Yahoo
+# Finance e API do BCB) há um provedor falso, determinístico e sem rede, para testes e benchmarks
+# (CARTEIRA_PROVEDOR=falso).
+#
+# Os períodos seguem o Yahoo Finance: period="1y" ou start=/end= (end exclusivo). Os históricos são DataFrames
+# indexados por data com as colunas Open, High, Low, Close, Volume, Dividends e Stock Splits.
+
+
+def _ajustar_ticker(ticker: str) -> str:
+    """Os ativos da B3 seguem o padrão 'SIGLA.SA' no Yahoo Finance."""
+    return ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+
+
+class ProvedorReal:
+    """Yahoo Finance (cotações e dividendos) e API SGS do Banco Central (CDI)."""
+
+    def historicos(self, tickers, **periodo):
+        """
+        Um único download em lote dos tickers. Retorna ticker -> histórico, só com os tickers que vieram
+        no download. Erros do provedor são propagados.
+        """
+        ajustados = {_ajustar_ticker(ticker): ticker for ticker in tickers}
+        dados = yf.download(list(ajustados), actions=True, group_by='ticker', auto_adjust=False,
+                            threads=True, progress=False, timeout=MARKET_DATA_TIMEOUT, **periodo)
+        if dados is None or dados.empty:
+            return {}
+        baixados = {}
+        for ticker_ajustado, ticker in ajustados.items():
+            if ticker_ajustado in dados.columns.get_level_values(0):
+                hist = dados[ticker_ajustado].dropna(how='all')
+                if not hist.empty:
+                    baixados[ticker] = hist
+        return baixados
+
+    def historico(self, ticker, **periodo):
+        """Histórico de um único ticker (vazio se o provedor não tiver dados no período)."""
+        return yf.Ticker(_ajustar_ticker(ticker)).history(actions=True, auto_adjust=False,
+                                                          timeout=MARKET_DATA_TIMEOUT, **periodo)
+
+    def taxas_cdi(self, inicio: date, fim: date):
+        """
+        Taxas diárias do CDI (série 11 do SGS, % ao dia) entre 'inicio' e 'fim', numa única consulta
+        (a API limita cada consulta a 10 anos). Retorna uma lista de {'data', 'taxa'}.
+        """
+        url = (
+            f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.11/dados"
+            f"?formato=json&dataInicial={inicio.strftime('%d/%m/%Y')}"
+            f"&dataFinal={fim.strftime('%d/%m/%Y')}"
+        )
+        response = requests.get(url, timeout=CDI_TIMEOUT)
+        # Um intervalo sem nenhum dia útil (fim de semana, feriado) é respondido com 404
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return [{'data': datetime.strptime(item['data'], '%d/%m/%Y').date(), 'taxa': float(item['valor'])}
+                for item in response.json()]
+
+
+class ErroSimulado(ConnectionError):
+    """Falha injetada pelo provedor falso (simula a rede ou o provedor fora do ar)."""
+
+
+class ProvedorFalso:
+    """
+    Provedor determinístico e sem rede: cada ticker tem um passeio aleatório de preços em dias úteis, gerado
+    a partir do próprio nome e da semente (o mesmo dia tem sempre o mesmo preço, qualquer que seja o período
+    pedido), com dividendos mensais em parte dos tickers. O CDI segue uma taxa anual que varia suavemente.
+    Cada chamada espera 'latencia' segundos e falha com probabilidade 'taxa_erro'; tickers começando com
+    'INEXISTENTE' não têm dados.
+    """
+    INICIO_SERIES = date(2000, 1, 3)
+
+    def __init__(self, latencia: float = 0.0, taxa_erro: float = 0.0, semente: int = 0):
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.semente = semente
+        self.chamadas = 0
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+
+    def _chamar(self):
+        with self._lock:
+            self.chamadas += 1
+            falhar = self._aleatorio.random() < self.taxa_erro
+        if self.latencia:
+            time.sleep(self.latencia)
+        if falhar:
+            raise ErroSimulado("Falha simulada pelo provedor falso")
+
+    @functools.lru_cache(maxsize=1024)
+    def _serie(self, ticker: str, hoje: date):
+        datas = pd.bdate_range(self.INICIO_SERIES, hoje, name='Date')
+        gerador = np.random.default_rng([zlib.crc32(ticker.encode()), self.semente])
+        fechamento = np.round(gerador.uniform(5, 150) * np.exp(np.cumsum(gerador.normal(0.0002, 0.015, len(datas)))), 2)
+        abertura = np.round(fechamento * (1 + gerador.normal(0, 0.005, len(datas))), 2)
+        dividendos = np.zeros(len(datas))
+        if gerador.random() < 0.6:
+            # Pagamento no primeiro dia útil de cada mês, perto de 0,8% do preço
+            primeiro_do_mes = np.r_[True, datas.month[1:] != datas.month[:-1]]
+            dividendos[primeiro_do_mes] = np.round(fechamento[primeiro_do_mes] * 0.008, 4)
+        return pd.DataFrame({
+            'Open': abertura,
+            'High': np.maximum(abertura, fechamento) * 1.01,
+            'Low': np.minimum(abertura, fechamento) * 0.99,
+            'Close': fechamento,
+            'Volume': gerador.integers(1_000, 1_000_000, len(datas)).astype(float),
+            'Dividends': dividendos,
+            'Stock Splits': 0.0,
+        }, index=datas)
+
+    def _recortar(self, ticker, period=None, start=None, end=None):
+        hoje = date.today()
+        if ticker.removesuffix('.SA').startswith('INEXISTENTE'):
+            return self._serie('X', hoje).iloc[:0]
+        hist = self._serie(ticker.removesuffix('.SA'), hoje)
+        if period is not None:
+            start = hoje - timedelta(days=365 * int(period.rstrip('y')))
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        if end is not None:
+            hist = hist[hist.index < pd.Timestamp(end)]
+        return hist
+
+    def historicos(self, tickers, **periodo):
+        self._chamar()
+        baixados = {ticker: self._recortar(ticker, **periodo) for ticker in tickers}
+        return {ticker: hist for ticker, hist in baixados.items() if not hist.empty}
+
+    def historico(self, ticker, **periodo):
+        self._chamar()
+        return self._recortar(ticker, **periodo)
+
+    def taxas_cdi(self, inicio: date, fim: date):
+        self._chamar()
+        datas = pd.bdate_range(inicio, fim)
+        anos = (datas - pd.Timestamp(self.INICIO_SERIES)).days / 365.25
+        taxa_anual = 0.09 + 0.04 * np.sin(anos / 2)
+        taxas = np.round(((1 + taxa_anual) ** (1 / 252) - 1) * 100, 6)
+        return [{'data': data.date(), 'taxa': float(taxa)} for data, taxa in zip(datas, taxas)]
+
+
+def _criar(nome: str):
+    if nome == 'falso':
+        return ProvedorFalso(PROVEDOR_FALSO_LATENCIA, PROVEDOR_FALSO_TAXA_ERRO, PROVEDOR_FALSO_SEMENTE)
+    if nome == 'real':
+        return ProvedorReal()
+    raise ValueError(f"Provedor de dados desconhecido: {nome!r} (use 'real' ou 'falso').")
+
+
+_provedor = _criar(PROVEDOR)
+
+
+def provedor():
+    """Provedor de dados de mercado em uso (escolhido por CARTEIRA_PROVEDOR)."""
+    return _provedor
+
+
+def definir_provedor(novo):
+    """Substitui o provedor em uso (benchmarks e testes); retorna o anterior."""
+    global _provedor
+    anterior, _provedor = _provedor, novo
+    return anterior
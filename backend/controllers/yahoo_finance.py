@@ -1,50 +1,297 @@
 # backend/controllers/yahoo_finance.py
-import yfinance as yf
-from backend.caching import cached, market_data_cache  # Importa o decorator e o cache específico
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+import pandas as pd
+from backend.caching import cached, market_data_cache, agendar_atualizacao  # Importa o decorator e o cache específico
+from backend.config import (MARKET_DATA_MAX_WORKERS, MARKET_DATA_TIMEOUT, MARKET_DATA_FRESCOR,
+                            NEGATIVE_TTL_NAO_ENCONTRADO, NEGATIVE_TTL_ERRO_PROVEDOR)
+from SQL import database, cotacoes
+from .erros import DadosNaoEncontrados, ErroProvedor
+from .provedores import provedor
 
+# Pool compartilhado para as buscas em paralelo; limita quantos tickers ficam "em voo" ao mesmo tempo
+_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_MAX_WORKERS, thread_name_prefix="market-data")
 
-@cached(market_data_cache)
-def get_ativo_info(ticker: str):
-    """Obtém informações de preço, histórico e dividendos do ativo. O resultado é cacheado."""
+
+def _montar_info(hist: pd.DataFrame):
+    """Monta o dicionário de informações do ativo a partir do histórico diário (com a coluna de dividendos)."""
+    hist = hist.dropna(subset=['Close'])
+    if hist.empty:
+        return None
+
+    preco_atual = hist['Close'].iloc[-1]
+    preco_ontem = hist['Close'].iloc[-2] if len(hist) > 1 else preco_atual
+    dividendos = hist['Dividends'] if 'Dividends' in hist else pd.Series(dtype=float)
+    dividendos = dividendos[dividendos.index >= hist.index[-1] - pd.Timedelta(days=365)].sum()
+
+    return {
+        'Preço Atual': preco_atual,
+        'Rendimento Dia (%)': ((preco_atual - preco_ontem) / preco_ontem) * 100 if preco_ontem != 0 else 0,
+        'Dividendos 12M': dividendos,
+        'Histórico': hist
+    }
+
+
+def _inicio_janela() -> date:
+    """Primeiro dia da janela de 1 ano usada nas informações do ativo."""
+    return date.today() - timedelta(days=365)
+
+
+def _precisa_sincronizar(estado) -> bool:
+    """O histórico local é usado sem consultar o provedor enquanto estiver dentro do prazo de frescor."""
+    return estado is None or datetime.now() - estado['atualizado_em'] > timedelta(seconds=MARKET_DATA_FRESCOR)
+
+
+def _baixar_historicos(tickers, **periodo):
+    """
+    Faz um único download em lote no provedor (preços sem ajuste e eventos), separado por ticker.
+    Tickers que não vieram no download ficam de fora do dicionário retornado.
+    """
     try:
-        if not ticker.endswith('.SA'):
-            ticker_adjusted = f"{ticker}.SA"
+        return provedor().historicos(tickers, **periodo)
+    except Exception as e:
+        print(f"Erro no download em lote dos tickers {list(tickers)}: {e}")
+        return {}
+
+
+def _sincronizar_ticker(session, ticker, estado):
+    """Baixa do provedor apenas o que falta no histórico local do ticker (ou o último ano, se ainda não houver nada)."""
+    # O histórico com actions=True já traz os dividendos, então basta uma chamada ao provedor
+    tem_historico = bool(estado and estado['ultima_data'])
+    try:
+        if tem_historico:
+            # A última barra salva pode ter sido parcial (pregão em andamento), por isso é baixada de novo
+            hist = provedor().historico(ticker, start=estado['ultima_data'])
         else:
-            ticker_adjusted = ticker
+            hist = provedor().historico(ticker, period="1y")
+    except Exception as e:
+        raise ErroProvedor(f"Erro ao consultar o Yahoo Finance para o ticker {ticker}: {e}") from e
 
-        ativo = yf.Ticker(ticker_adjusted)
-        inf = ativo.info
-        hist = ativo.history(period="1y")
+    if hist.empty and not tem_historico:
+        raise DadosNaoEncontrados(f"O Yahoo Finance não retornou cotações para o ticker {ticker}.")
+    cotacoes.salvar_historico(session, ticker, hist)
 
 
-        if hist.empty:
-            return None
+@cached(market_data_cache, stale_while_revalidate=True,
+        negative_ttl={DadosNaoEncontrados: NEGATIVE_TTL_NAO_ENCONTRADO, ErroProvedor: NEGATIVE_TTL_ERRO_PROVEDOR})
+def get_ativo_info(ticker: str):
+    """
+    Obtém informações de preço, histórico e dividendos do ativo. O resultado é cacheado.
+    O histórico fica guardado no banco local, e do provedor só é baixado o que mudou desde a última sincronização.
+    Lança DadosNaoEncontrados se não houver cotações para o ticker e ErroProvedor se o provedor falhar
+    sem que exista histórico local para servir.
+    """
+    session = database.get_db_session()
+    try:
+        estado = cotacoes.estado_atualizacao(session, [ticker]).get(ticker)
+        if _precisa_sincronizar(estado):
+            try:
+                _sincronizar_ticker(session, ticker, estado)
+            except ErroProvedor as e:
+                if not estado:
+                    raise
+                # Com o provedor fora do ar, o histórico local (mesmo desatualizado) continua sendo servido
+                print(f"Erro ao atualizar os dados do ticker {ticker}, usando o histórico local: {e}")
 
-        preco_atual = hist['Close'].iloc[-1]
-        preco_ontem = hist['Close'].iloc[-2] if len(hist) > 1 else preco_atual
-        dividendos = ativo.dividends.last('365d').sum()
+        hist = cotacoes.carregar_historicos(session, [ticker], _inicio_janela()).get(ticker)
+        info = _montar_info(hist) if hist is not None else None
+        if info is None:
+            raise DadosNaoEncontrados(f"Nenhuma cotação do último ano encontrada para o ticker {ticker}.")
+        return info
+    finally:
+        session.remove()
 
-        return {
-            'Preço Atual': preco_atual,
-            'Rendimento Dia (%)': ((preco_atual - preco_ontem) / preco_ontem) * 100 if preco_ontem != 0 else 0,
-            'Dividendos 12M': dividendos,
-            'Histórico': hist
-        }
+
+def get_dividendos_12m(ticker: str):
+    """Obtém os dividendos pagos nos últimos 12 meses, reaproveitando o histórico cacheado de get_ativo_info."""
+    hist = get_ativo_info(ticker)['Histórico']
+    if 'Dividends' not in hist:
+        return pd.Series(dtype=float)
+    dividendos = hist['Dividends'][hist['Dividends'] > 0]
+    return dividendos[dividendos.index >= hist.index[-1] - pd.Timedelta(days=365)]
+
+
+# Tickers expirados com atualização em lote já agendada (evita agendar outra a cada requisição enquanto ela não roda)
+_atualizando = set()
+_lock_atualizando = threading.Lock()
+
+
+def _atualizar_expirados(tickers):
+    try:
+        get_ativos_info_batch(tickers, forcar=True)
+    finally:
+        with _lock_atualizando:
+            _atualizando.difference_update(tickers)
+
+
+def _agendar_expirados(tickers):
+    """Atualiza em segundo plano, com um único download em lote, os tickers expirados que ainda não estão sendo atualizados."""
+    with _lock_atualizando:
+        novos = [ticker for ticker in tickers if ticker not in _atualizando]
+        _atualizando.update(novos)
+    if novos:
+        agendar_atualizacao(_atualizar_expirados, novos)
+
+
+def get_ativos_info_batch(tickers, forcar=False):
+    """
+    Busca as informações de vários tickers de uma vez e preenche o cache de get_ativo_info para cada um deles.
+    Tickers em cache não são consultados; os expirados são servidos com o último valor e atualizados juntos em
+    segundo plano, num único lote (em vez de uma atualização por ticker). Os demais são lidos
+    do banco local, que antes é sincronizado com, no máximo, dois downloads em lote: o ano completo para os
+    tickers novos e só as barras recentes para os outros.
+    Com forcar=True (usado pelo agendador para aquecer o cache), o cache e o prazo de frescor do banco local
+    são ignorados: todos os tickers são sincronizados com o provedor e têm a entrada do cache renovada.
+    Retorna uma tupla (resultados, faltantes), com os tickers que não puderam ser resolvidos
+    (inclusive os que falharam recentemente e ainda estão em backoff).
+    """
+    resultados = {}
+    pendentes, faltantes, expirados = [], [], []
+    for ticker in dict.fromkeys(tickers):
+        if forcar:
+            pendentes.append(ticker)
+            continue
+        try:
+            resultados[ticker], expirado = get_ativo_info.cached_or_stale(ticker)
+            if expirado:
+                expirados.append(ticker)
+        except KeyError:
+            pendentes.append(ticker)
+        except (DadosNaoEncontrados, ErroProvedor):
+            # Falha recente ainda em backoff: não entra no download
+            faltantes.append(ticker)
+
+    if expirados:
+        _agendar_expirados(expirados)
+    if not pendentes:
+        return resultados, faltantes
+
+    session = database.get_db_session()
+    try:
+        estado = cotacoes.estado_atualizacao(session, pendentes)
+        novos = [t for t in pendentes if t not in estado or estado[t]['ultima_data'] is None]
+        incrementais = [t for t in pendentes if t not in novos and (forcar or _precisa_sincronizar(estado[t]))]
+
+        baixados = {}
+        if novos:
+            baixados.update(_baixar_historicos(novos, period="1y"))
+        if incrementais:
+            inicio = min(estado[t]['ultima_data'] for t in incrementais)
+            baixados.update(_baixar_historicos(incrementais, start=inicio))
+        for ticker, hist in baixados.items():
+            cotacoes.salvar_historico(session, ticker, hist)
+
+        historicos = cotacoes.carregar_historicos(session, pendentes, _inicio_janela())
     except Exception as e:
-        print(f"Erro ao carregar os dados do ticker {ticker}: {e}")
+        print(f"Erro ao sincronizar os históricos dos tickers {pendentes}: {e}")
+        return resultados, faltantes + pendentes
+    finally:
+        session.remove()
 
+    for ticker in pendentes:
+        info = _montar_info(historicos[ticker]) if ticker in historicos else None
+        if info is None:
+            faltantes.append(ticker)
+            continue
+        get_ativo_info.cache_set(info, ticker)
+        resultados[ticker] = info
 
-@cached(market_data_cache)
-def get_dividendos_12m(ticker: str):
-    """Obtém DataFrame de dividendos pagos nos últimos 12 meses. O resultado é cacheado."""
+    return resultados, faltantes
+
+
+# Tickers cujo período anterior já foi pedido ao provedor, com a data inicial pedida
+# (evita repetir o download quando o provedor não tem cotações anteriores ao que já está no banco)
+_complementos_pedidos = {}
+
+
+def garantir_historico(tickers, inicio: date):
+    """
+    Complementa o banco local com as cotações de 'inicio' até a barra mais antiga já armazenada de cada ticker,
+    em um único download em lote. Deve ser chamada depois da sincronização normal (get_ativos_info_batch),
+    que cuida das barras recentes; tickers sem nenhuma cotação local são ignorados.
+    """
+    session = database.get_db_session()
     try:
-        if not ticker.endswith('.SA'):
-            ticker_adjusted = f"{ticker}.SA"
-        else:
-            ticker_adjusted = ticker
+        primeiras = cotacoes.primeiras_datas(session, tickers)
+        # Uma semana de folga cobre fins de semana e feriados entre 'inicio' e o primeiro pregão
+        faltantes = {
+            ticker: primeira for ticker, primeira in primeiras.items()
+            if primeira > inicio + timedelta(days=7) and _complementos_pedidos.get(ticker, date.max) > inicio
+        }
+        if not faltantes:
+            return
 
-        ativo = yf.Ticker(ticker_adjusted)
-        dividendos = ativo.dividends.last("365d")
-        return dividendos
-    except Exception:
-        return None
+        baixados = _baixar_historicos(list(faltantes), start=inicio, end=max(faltantes.values()))
+        if not baixados:
+            # Download vazio pode ser uma falha do provedor: tenta de novo na próxima chamada
+            return
+        for ticker, primeira in faltantes.items():
+            _complementos_pedidos[ticker] = inicio
+            if ticker in baixados:
+                hist = baixados[ticker]
+                cotacoes.salvar_historico(session, ticker, hist[hist.index.date < primeira], marcar_atualizado=False)
+    finally:
+        session.remove()
+
+
+def get_historico(ticker: str, inicio: date):
+    """Histórico diário do ticker desde 'inicio', lido do banco local (complementado pelo provedor se preciso)."""
+    garantir_historico([ticker], inicio)
+    session = database.get_db_session()
+    try:
+        hist = cotacoes.carregar_historicos(session, [ticker], inicio).get(ticker)
+    finally:
+        session.remove()
+    if hist is None:
+        raise DadosNaoEncontrados(f"Nenhuma cotação encontrada para o ticker {ticker} desde {inicio}.")
+    return hist
+
+
+def get_ativos_info_concorrente(tickers, timeout: float = MARKET_DATA_TIMEOUT):
+    """
+    Busca as informações de vários tickers em paralelo (no máximo MARKET_DATA_MAX_WORKERS ao mesmo tempo).
+    Retorna uma tupla (resultados, falhas): resultados mapeia ticker -> info e falhas mapeia ticker -> {'tipo', 'motivo'}
+    para os tickers sem dados ('nao_encontrado'), com erro no provedor ('erro_provedor' ou 'erro')
+    ou que excederam o tempo limite ('tempo_esgotado').
+    """
+    inicios = {}
+
+    def buscar(ticker):
+        inicios[ticker] = time.monotonic()
+        return get_ativo_info(ticker)
+
+    futuros = {_executor.submit(buscar, ticker): ticker for ticker in dict.fromkeys(tickers)}
+    resultados, falhas = {}, {}
+    pendentes = set(futuros)
+
+    while pendentes:
+        # O prazo de cada ticker só começa a contar quando a busca dele de fato inicia
+        agora = time.monotonic()
+        prazos = [inicios[futuros[f]] + timeout - agora for f in pendentes if futuros[f] in inicios]
+        espera = max(min(prazos), 0) if prazos else timeout
+        if len(prazos) < len(pendentes):
+            espera = min(espera, 0.25)  # Reavalia logo os tickers que ainda estão na fila
+        concluidos, pendentes = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+
+        for futuro in concluidos:
+            ticker = futuros[futuro]
+            try:
+                resultados[ticker] = futuro.result()
+            except DadosNaoEncontrados as e:
+                falhas[ticker] = {'tipo': 'nao_encontrado', 'motivo': str(e)}
+            except ErroProvedor as e:
+                falhas[ticker] = {'tipo': 'erro_provedor', 'motivo': str(e)}
+            except Exception as e:
+                falhas[ticker] = {'tipo': 'erro', 'motivo': f"Erro ao buscar os dados: {e}"}
+
+        agora = time.monotonic()
+        for futuro in list(pendentes):
+            ticker = futuros[futuro]
+            if ticker in inicios and agora - inicios[ticker] >= timeout:
+                # A busca continua em segundo plano e, ao terminar, ainda alimenta o cache
+                falhas[ticker] = {'tipo': 'tempo_esgotado', 'motivo': "Tempo limite excedido"}
+                pendentes.discard(futuro)
+
+    return resultados, falhas
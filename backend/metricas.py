@@ -0,0 +1,87 @@
+# backend/metricas.py
+import threading
+from collections import defaultdict
+
+# Registro simples de métricas em memória, exportadas no formato texto do Prometheus em /api/metrics.
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_descricoes = {}  # nome -> (tipo, descrição)
+_contadores = defaultdict(float)  # (nome, labels) -> valor
+_histogramas = {}  # (nome, labels) -> {'buckets': [...], 'soma': float, 'contagem': int}
+_medidores = {}  # (nome, labels) -> função que retorna o valor atual
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def descrever(nome, tipo, descricao):
+    """Registra o tipo ('counter', 'gauge' ou 'histogram') e a descrição de uma métrica."""
+    _descricoes[nome] = (tipo, descricao)
+
+
+def incrementar(nome, valor=1, **labels):
+    with _lock:
+        _contadores[(nome, _labels(labels))] += valor
+
+
+def observar(nome, valor, **labels):
+    """Registra uma observação (ex.: duração em segundos) em um histograma."""
+    with _lock:
+        hist = _histogramas.get((nome, _labels(labels)))
+        if hist is None:
+            hist = _histogramas[(nome, _labels(labels))] = {'buckets': [0] * len(BUCKETS_LATENCIA), 'soma': 0.0, 'contagem': 0}
+        for i, limite in enumerate(BUCKETS_LATENCIA):
+            if valor <= limite:
+                hist['buckets'][i] += 1
+        hist['soma'] += valor
+        hist['contagem'] += 1
+
+
+def registrar_medidor(nome, funcao, **labels):
+    """Registra um medidor cujo valor é lido (chamando a função) no momento da exportação."""
+    with _lock:
+        _medidores[(nome, _labels(labels))] = funcao
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_labels(labels, extra=()):
+    pares = list(labels) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + "}"
+
+
+def render_prometheus():
+    """Gera o texto de todas as métricas no formato de exposição do Prometheus."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {chave: {'buckets': list(h['buckets']), 'soma': h['soma'], 'contagem': h['contagem']}
+                       for chave, h in _histogramas.items()}
+        medidores = dict(_medidores)
+
+    series = defaultdict(list)
+    for (nome, labels), valor in sorted(contadores.items()):
+        series[nome].append(f"{nome}{_formatar_labels(labels)} {valor:g}")
+    for (nome, labels), funcao in sorted(medidores.items(), key=lambda item: item[0]):
+        series[nome].append(f"{nome}{_formatar_labels(labels)} {float(funcao()):g}")
+    for (nome, labels), hist in sorted(histogramas.items(), key=lambda item: item[0]):
+        for limite, quantidade in zip(BUCKETS_LATENCIA, hist['buckets']):
+            series[nome].append(f"{nome}_bucket{_formatar_labels(labels, [('le', f'{limite:g}')])} {quantidade}")
+        series[nome].append(f"{nome}_bucket{_formatar_labels(labels, [('le', '+Inf')])} {hist['contagem']}")
+        series[nome].append(f"{nome}_sum{_formatar_labels(labels)} {hist['soma']:g}")
+        series[nome].append(f"{nome}_count{_formatar_labels(labels)} {hist['contagem']}")
+
+    linhas = []
+    for nome in sorted(series):
+        tipo, descricao = _descricoes.get(nome, ('untyped', ''))
+        linhas.append(f"# HELP {nome} {descricao}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        linhas.extend(series[nome])
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,249 @@
+# backend/perfil.py
+import collections
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from backend import metricas
+from backend.config import (PERFIL_LIMITE_LENTO_MS, PERFIL_LOG_LENTAS, PERFIL_AMOSTRAGEM_ROTA,
+                            PERFIL_AMOSTRAGEM_INTERVALO, PERFIL_DIRETORIO)
+
+# Diagnóstico de desempenho por requisição, ligado com CARTEIRA_PERFIL=1 (ver MiddlewarePerfil em api.py).
+# Cada requisição ganha uma Medicao (numa ContextVar, que acompanha a requisição também nas threads e nas
+# sessões assíncronas do SQLAlchemy) onde são somados o tempo e o número de consultas SQL, o tempo gasto nas
+# funções com cache (backend/caching.py) e na serialização do JSON (backend/respostas.py). Sem o middleware
+# não há Medicao ativa, e os pontos de registro não fazem nada.
+
+metricas.descrever('carteira_requisicao_duracao_seconds', 'histogram', 'Duração das requisições, por rota (com o perfil ligado).')
+metricas.descrever('carteira_requisicoes_lentas_total', 'counter', 'Requisições acima do limite de lentidão, por rota.')
+
+_medicao_atual = contextvars.ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """Totais de uma requisição. Pode ser atualizada por várias threads (cálculos enviados ao threadpool)."""
+
+    def __init__(self):
+        self.sql_consultas = 0
+        self.sql_tempo = 0.0
+        self.cache_chamadas = 0
+        self.cache_tempo = 0.0
+        self.serializacao_tempo = 0.0
+        self._lock = threading.Lock()
+
+    def somar(self, campo_tempo, duracao, campo_contagem=None):
+        with self._lock:
+            setattr(self, campo_tempo, getattr(self, campo_tempo) + duracao)
+            if campo_contagem:
+                setattr(self, campo_contagem, getattr(self, campo_contagem) + 1)
+
+
+# --- Pontos de registro ---
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _medicao_atual.get() is not None:
+        conn.info.setdefault('perfil_inicios', []).append(time.perf_counter())
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao_atual.get()
+    inicios = conn.info.get('perfil_inicios')
+    if medicao is not None and inicios:
+        medicao.somar('sql_tempo', time.perf_counter() - inicios.pop(), 'sql_consultas')
+
+
+def _ativar_sql():
+    # Vale para todas as engines (a síncrona e a assíncrona de SQL/database.py); só é registrado com o perfil ligado
+    if not event.contains(Engine, "before_cursor_execute", _antes_da_consulta):
+        event.listen(Engine, "before_cursor_execute", _antes_da_consulta)
+        event.listen(Engine, "after_cursor_execute", _depois_da_consulta)
+
+
+_dentro_de_cache = threading.local()
+
+
+class medir_cache:
+    """
+    Context manager que soma à requisição atual o tempo de uma chamada a função com cache. Chamadas aninhadas
+    (uma função com cache chamando outra) contam uma vez só.
+    """
+    __slots__ = ('medicao', 'inicio')
+
+    def __enter__(self):
+        self.medicao = _medicao_atual.get()
+        if self.medicao is not None:
+            profundidade = getattr(_dentro_de_cache, 'profundidade', 0)
+            _dentro_de_cache.profundidade = profundidade + 1
+            self.inicio = time.perf_counter() if profundidade == 0 else None
+
+    def __exit__(self, *excecao):
+        if self.medicao is not None:
+            _dentro_de_cache.profundidade -= 1
+            if self.inicio is not None:
+                self.medicao.somar('cache_tempo', time.perf_counter() - self.inicio, 'cache_chamadas')
+
+
+def registrar_serializacao(duracao):
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.somar('serializacao_tempo', duracao)
+
+
+# --- Log de requisições lentas ---
+
+_lock_log = threading.Lock()
+
+
+def _registrar_lenta(registro):
+    linha = json.dumps(registro, ensure_ascii=False)
+    if not PERFIL_LOG_LENTAS:
+        print(f"Requisição lenta: {linha}")
+        return
+    with _lock_log:
+        os.makedirs(os.path.dirname(PERFIL_LOG_LENTAS) or ".", exist_ok=True)
+        with open(PERFIL_LOG_LENTAS, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+
+
+# --- Profiler por amostragem ---
+
+# Funções em que uma thread está só esperando (sem trabalho da requisição); essas amostras são descartadas
+_ESPERAS = {('threading.py', 'wait'), ('queue.py', 'get'), ('selectors.py', 'select'), ('_base.py', 'result')}
+
+
+class Amostrador:
+    """
+    Profiler estatístico: a cada 'intervalo' segundos registra a pilha de todas as threads (exceto as ociosas)
+    e, ao final, grava as pilhas no formato "folded" (uma linha 'thread;módulo:função;... contagem'), aceito
+    pelo flamegraph.pl, pelo speedscope e por ferramentas parecidas.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pilhas = collections.Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='perfil-amostrador', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        nomes = {}
+        while not self._parar.wait(self.intervalo):
+            if len(nomes) != threading.active_count():
+                nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                codigo = quadro.f_code
+                if (os.path.basename(codigo.co_filename), codigo.co_name) in _ESPERAS:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    codigo = quadro.f_code
+                    pilha.append(f"{os.path.splitext(os.path.basename(codigo.co_filename))[0]}:{codigo.co_name}")
+                    quadro = quadro.f_back
+                pilha.append(nomes.get(ident, str(ident)))
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def gravar(self, caminho):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            for pilha, contagem in self.pilhas.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+
+
+# Uma requisição perfilada por vez: o amostrador vê todas as threads do processo
+_lock_amostragem = threading.Lock()
+
+
+# --- Middleware ---
+
+def _ms(segundos):
+    return round(segundos * 1000, 2)
+
+
+class MiddlewarePerfil:
+    """
+    Middleware ASGI que mede cada requisição: tempo total, consultas SQL (número e tempo), funções com cache,
+    serialização do JSON e tamanho da resposta (em bytes, como enviada, depois da compressão). Os tempos parciais
+    vão no cabeçalho Server-Timing (visível nas ferramentas do navegador); requisições acima de
+    PERFIL_LIMITE_LENTO_MS vão para o log de lentas (JSON, uma por linha). Requisições às rotas que começam com
+    PERFIL_AMOSTRAGEM_ROTA passam pelo Amostrador, e o perfil é gravado em PERFIL_DIRETORIO.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        _ativar_sql()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        resposta = {"status": None, "bytes": 0}
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [
+                    (b"server-timing", self._server_timing(medicao, time.perf_counter() - inicio).encode())]
+            elif mensagem["type"] == "http.response.body":
+                resposta["bytes"] += len(mensagem.get("body", b""))
+            await send(mensagem)
+
+        amostrar = bool(PERFIL_AMOSTRAGEM_ROTA) and scope["path"].startswith(PERFIL_AMOSTRAGEM_ROTA) \
+            and _lock_amostragem.acquire(blocking=False)
+        try:
+            if amostrar:
+                try:
+                    with Amostrador(PERFIL_AMOSTRAGEM_INTERVALO) as amostrador:
+                        await self.app(scope, receive, enviar)
+                finally:
+                    _lock_amostragem.release()
+                nome = re.sub(r"[^\w.-]+", "_", scope["path"].strip("/")) or "raiz"
+                amostrador.gravar(os.path.join(PERFIL_DIRETORIO, f"{nome}_{datetime.now():%Y%m%d_%H%M%S_%f}.folded"))
+            else:
+                await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            self._finalizar(scope, medicao, resposta, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _server_timing(medicao, decorrido):
+        return (f'sql;dur={_ms(medicao.sql_tempo)};desc="{medicao.sql_consultas} consultas", '
+                f'cache;dur={_ms(medicao.cache_tempo)}, json;dur={_ms(medicao.serializacao_tempo)}, '
+                f'app;dur={_ms(decorrido)}')
+
+    @staticmethod
+    def _finalizar(scope, medicao, resposta, duracao):
+        # A rota do FastAPI (ex.: /api/market-data/ativo/{ticker}/info) evita uma série por valor de parâmetro
+        rota = getattr(scope.get("route"), "path", scope["path"])
+        metricas.observar('carteira_requisicao_duracao_seconds', duracao, metodo=scope["method"], rota=rota)
+        if duracao * 1000 < PERFIL_LIMITE_LENTO_MS:
+            return
+        metricas.incrementar('carteira_requisicoes_lentas_total', metodo=scope["method"], rota=rota)
+        _registrar_lenta({
+            "momento": datetime.now().isoformat(timespec="milliseconds"),
+            "metodo": scope["method"], "rota": rota, "caminho": scope["path"],
+            "consulta": scope.get("query_string", b"").decode("latin-1"),
+            "status": resposta["status"], "duracao_ms": _ms(duracao),
+            "sql_consultas": medicao.sql_consultas, "sql_ms": _ms(medicao.sql_tempo),
+            "cache_chamadas": medicao.cache_chamadas, "cache_ms": _ms(medicao.cache_tempo),
+            "json_ms": _ms(medicao.serializacao_tempo), "bytes": resposta["bytes"],
+        })
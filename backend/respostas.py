@@ -0,0 +1,77 @@
+# backend/respostas.py
+import hashlib
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from backend import perfil
+
+
+def _converter(valor):
+    # Tipos que o orjson não serializa sozinho (valores Numeric do banco)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+class RespostaJSON(JSONResponse):
+    """
+    Resposta JSON serializada com orjson, que aceita direto tipos do numpy e datas e é bem mais rápido que o
+    json padrão. Os endpoints que retornam dados de DataFrames devolvem esta resposta já pronta, o que também
+    evita a passagem pelo jsonable_encoder do FastAPI. Valores NaN viram null.
+    """
+
+    def render(self, content) -> bytes:
+        inicio = time.perf_counter()
+        corpo = orjson.dumps(content, default=_converter, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        perfil.registrar_serializacao(time.perf_counter() - inicio)
+        return corpo
+
+
+def _em_utc(momento: datetime) -> datetime:
+    # Datas sem fuso (datetime.now() do banco) são do horário local; o HTTP usa GMT, com resolução de segundos
+    return momento.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def gerar_etag(*partes) -> str:
+    """
+    ETag a partir das partes que identificam a versão dos dados de uma resposta. É fraca (W/) porque vale
+    para o mesmo conteúdo com ou sem compressão.
+    """
+    return 'W/"' + hashlib.sha1("|".join(map(str, partes)).encode()).hexdigest()[:24] + '"'
+
+
+def cabecalhos_validacao(etag: str, modificado_em: datetime = None) -> dict:
+    """
+    Cabeçalhos de validação das respostas condicionais: o cliente pode guardar a resposta,
+    mas deve revalidá-la (If-None-Match / If-Modified-Since) antes de cada uso.
+    """
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modificado_em is not None:
+        cabecalhos["Last-Modified"] = format_datetime(_em_utc(modificado_em), usegmt=True)
+    return cabecalhos
+
+
+def nao_modificado(request: Request, etag: str, modificado_em: datetime = None) -> bool:
+    """
+    Indica se a cópia do cliente ainda é atual. If-None-Match tem precedência; If-Modified-Since só é
+    considerado quando o cliente não envia ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        recebidas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+        return "*" in recebidas or etag.removeprefix("W/") in recebidas
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modificado_em is not None:
+        try:
+            return _em_utc(modificado_em) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def resposta_304(etag: str, modificado_em: datetime = None) -> Response:
+    return Response(status_code=304, headers=cabecalhos_validacao(etag, modificado_em))
@@ -1,5 +1,10 @@
+import os
 import uvicorn
 
+# Número de processos da API. Com mais de um, o auto-reload fica desligado e o ideal é usar o cache
+# compartilhado (CARTEIRA_CACHE_BACKEND=sqlite), para que os workers não repitam as buscas nos provedores
+WORKERS = int(os.getenv("CARTEIRA_WORKERS", "1"))
+
 if __name__ == "__main__":
     """
     Este é o ponto de entrada principal para iniciar o servidor de backend.
@@ -9,10 +14,12 @@ if __name__ == "__main__":
 
     Rodar este arquivo com 'python run.py' é equivalente a executar:
     'uvicorn api:app --host 127.0.0.1 --port 8000 --reload'
+    (ou, com CARTEIRA_WORKERS=N, a 'uvicorn api:app --host 127.0.0.1 --port 8000 --workers N')
     """
     uvicorn.run(
         "api:app",          # A referência para a sua aplicação FastAPI: 'nome_do_arquivo:nome_da_variavel_app'
         host="127.0.0.1",   # O endereço de host para o servidor
         port=8000,          # A porta em que o servidor irá escutar
-        reload=True         # Habilita o auto-reload, que reinicia o servidor automaticamente após mudanças no código
+        reload=WORKERS == 1,  # Habilita o auto-reload, que reinicia o servidor automaticamente após mudanças no código
+        workers=WORKERS
     )
@@ -0,0 +1,70 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+import pytest
+
+# Os módulos da API são importados como no uvicorn (a partir da pasta backend) e como pacote 'backend'
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.dirname(BACKEND), BACKEND]
+
+# Configuração lida na importação: provedor sem rede, sem agendador e um banco temporário para o init_db da API
+os.environ.update(CARTEIRA_PROVEDOR="falso", CARTEIRA_AGENDADOR_ATIVO="0", CARTEIRA_CACHE_BACKEND="memoria",
+                  CARTEIRA_PERFIL="0")
+os.environ.setdefault("CARTEIRA_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="carteira_testes_"), "ativos.db"))
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """
+    Banco novo e vazio para o teste, no diretório temporário (que também vira o diretório atual,
+    onde ficam os backups e demais arquivos relativos). Retorna o caminho do arquivo.
+    """
+    from SQL import database
+    monkeypatch.chdir(tmp_path)
+    caminho = str(tmp_path / "ativos.db")
+    monkeypatch.setattr(database, "DB_ARQUIVO", caminho)
+    for nome in ("_engine", "_session_factory", "_async_session_factory"):
+        monkeypatch.setattr(database, nome, None)
+    database.init_db()
+    yield caminho
+    database._engine.dispose()
+
+
+@pytest.fixture
+def provedor():
+    """Provedor falso novo (contador de chamadas zerado) em uso durante o teste."""
+    from controllers import provedores
+    novo = provedores.ProvedorFalso()
+    anterior = provedores.definir_provedor(novo)
+    yield novo
+    provedores.definir_provedor(anterior)
+
+
+@pytest.fixture
+def cliente(banco, provedor):
+    from fastapi.testclient import TestClient
+    import api
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def sessao(banco):
+    from SQL import database
+    db = database.get_db_session()()
+    yield db
+    db.close()
+
+
+def criar_ativo(cliente, ticker, tipo_ativo="Ação"):
+    resposta = cliente.post("/api/ativos/", json={"ticker": ticker, "tipo_ativo": tipo_ativo})
+    assert resposta.status_code == 201, resposta.text
+    return resposta.json()["id"]
+
+
+def criar_operacao(cliente, id_ticker, tipo_operacao, data_operacao, preco, quantidade):
+    resposta = cliente.post("/api/operacoes/", json={
+        "id_ticker": id_ticker, "tipo_operacao": tipo_operacao, "data_operacao": str(data_operacao),
+        "preco": preco, "quantidade": quantidade})
+    assert resposta.status_code == 201, resposta.text
+    return resposta.json()["id"]
@@ -0,0 +1,94 @@
+# backend/tests/test_agendador.py
+import time
+from datetime import datetime
+import anyio
+from backend import agendador, metricas
+from backend.cache_sqlite import CacheSQLite
+from backend.config import AGENDADOR_INTERVALO_PREGAO, AGENDADOR_INTERVALO_FORA_PREGAO
+from conftest import criar_ativo
+from controllers import api_bcb
+
+
+def _b3(*args):
+    return datetime(*args, tzinfo=agendador.FUSO_B3)
+
+
+def _execucoes(tarefa, resultado):
+    return metricas._contadores.get(('carteira_agendador_execucoes_total',
+                                     metricas._labels({'tarefa': tarefa, 'resultado': resultado})), 0)
+
+
+def test_pregao_aberto():
+    assert agendador.pregao_aberto(_b3(2024, 1, 8, 10, 0))       # Segunda-feira, abertura
+    assert agendador.pregao_aberto(_b3(2024, 1, 8, 18, 29))
+    assert not agendador.pregao_aberto(_b3(2024, 1, 8, 9, 59))
+    assert not agendador.pregao_aberto(_b3(2024, 1, 8, 18, 30))
+    assert not agendador.pregao_aberto(_b3(2024, 1, 6, 12, 0))   # Sábado
+
+
+def test_espera_cotacoes():
+    assert agendador.espera_cotacoes(_b3(2024, 1, 8, 12, 0)) == AGENDADOR_INTERVALO_PREGAO
+    assert agendador.espera_cotacoes(_b3(2024, 1, 8, 20, 0)) == AGENDADOR_INTERVALO_FORA_PREGAO
+    # Sem passar da abertura do próximo pregão, inclusive depois do fim de semana
+    assert agendador.espera_cotacoes(_b3(2024, 1, 8, 9, 45)) == 15 * 60
+    assert agendador.espera_cotacoes(_b3(2024, 1, 8, 9, 59, 59, 900000)) == 1
+    sexta = agendador.espera_cotacoes(_b3(2024, 1, 12, 19, 0))
+    assert sexta == min(AGENDADOR_INTERVALO_FORA_PREGAO, (_b3(2024, 1, 15, 10, 0) - _b3(2024, 1, 12, 19, 0)).total_seconds())
+
+
+def test_esperas_diarias():
+    assert agendador.espera_cdi(_b3(2024, 1, 8, 9, 0)) == 3600
+    assert agendador.espera_cdi(_b3(2024, 1, 8, 10, 0)) == 24 * 3600
+    assert agendador.espera_backup(_b3(2024, 1, 8, 4, 0)) == 23 * 3600
+
+
+def test_atualizar_cotacoes_baixa_todos_os_ativos_mesmo_em_cache(cliente, provedor, monkeypatch):
+    for ticker in ("VALE3", "PETR4"):
+        criar_ativo(cliente, ticker)
+    pedidos = []
+    original = provedor.historicos
+
+    def historicos(tickers, **periodo):
+        pedidos.append(sorted(tickers))
+        return original(tickers, **periodo)
+    monkeypatch.setattr(provedor, "historicos", historicos)
+
+    agendador.atualizar_cotacoes()
+    agendador.atualizar_cotacoes()
+
+    # Um download em lote por rodada, sem esperar o cache expirar
+    assert pedidos == [["PETR4", "VALE3"]] * 2
+
+
+def test_atualizar_cdi_substitui_o_indice_em_cache(banco, provedor):
+    agendador.atualizar_cdi()
+
+    indice = api_bcb.get_indice_cdi.cache_get()
+    assert len(indice) > 3000 and provedor.chamadas >= 2
+
+
+def test_rodada_reservada_por_outro_processo_e_pulada(tmp_path, monkeypatch):
+    cache = CacheSQLite('teste_agendador', maxsize=8, ttl=60, caminho=str(tmp_path / "cache.db"))
+    monkeypatch.setattr(agendador, 'market_data_cache', cache)
+    chamadas = []
+    antes = {resultado: _execucoes('teste', resultado) for resultado in ('ok', 'outro_processo', 'erro')}
+
+    assert cache.reservar(('agendador', 'teste'), 0.1)  # Outro worker começou a rodada
+    anyio.run(agendador._executar, 'teste', lambda: chamadas.append(1))
+    assert chamadas == []
+    assert _execucoes('teste', 'outro_processo') == antes['outro_processo'] + 1
+
+    time.sleep(0.15)  # Rodada seguinte
+    anyio.run(agendador._executar, 'teste', lambda: chamadas.append(1))
+    assert chamadas == [1]
+    assert _execucoes('teste', 'ok') == antes['ok'] + 1
+
+
+def test_falha_na_tarefa_nao_interrompe_o_agendador(monkeypatch):
+    def falhar():
+        raise RuntimeError("provedor fora do ar")
+    antes = _execucoes('teste_erro', 'erro')
+
+    anyio.run(agendador._executar, 'teste_erro', falhar)
+
+    assert _execucoes('teste_erro', 'erro') == antes + 1
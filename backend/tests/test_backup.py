@@ -0,0 +1,96 @@
+# backend/tests/test_backup.py
+import gzip
+import os
+import sqlite3
+from datetime import date
+import pytest
+from conftest import criar_ativo, criar_operacao
+from SQL import backup
+
+PERIODO = {"data_inicio": "2020-01-01", "data_fim": "2030-01-01"}
+
+
+@pytest.fixture
+def carteira(cliente):
+    petr = criar_ativo(cliente, "PETR4")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    criar_operacao(cliente, petr, "Vender", date(2024, 2, 2), 12.0, 50)
+    return petr
+
+
+def _tocar(diretorio, *nomes):
+    os.makedirs(diretorio, exist_ok=True)
+    for nome in nomes:
+        open(os.path.join(diretorio, nome), "wb").close()
+
+
+def test_backup_compactado_e_verificado(carteira, tmp_path):
+    arquivo = backup.fazer_backup(diretorio=str(tmp_path / "bk"))
+
+    assert arquivo.endswith(".db.gz")
+    assert os.listdir(tmp_path / "bk") == [os.path.basename(arquivo)]  # Sem restos da cópia parcial
+    assert backup.verificar_backup(arquivo) == {"ativos": 1, "operacoes": 2}
+
+    simples = backup.fazer_backup(diretorio=str(tmp_path / "bk"), comprimir=False)
+    assert simples.endswith(".db") and simples != arquivo
+    assert backup.verificar_backup(simples) == {"ativos": 1, "operacoes": 2}
+    assert {caminho for caminho, _, _ in backup.listar_backups(str(tmp_path / "bk"))} == {simples, arquivo}
+
+
+def test_backup_sem_banco(tmp_path):
+    assert backup.fazer_backup(diretorio=str(tmp_path / "bk"), origem=str(tmp_path / "nao_existe.db")) is None
+    assert backup.listar_backups(str(tmp_path / "bk")) == []
+
+
+def test_retencao(tmp_path):
+    diretorio = str(tmp_path)
+    _tocar(diretorio, "ativos_20240101_030000.db.gz", "ativos_20240101_150000.db.gz", "ativos_20240102_030000.db.gz",
+           "ativos_20240103_030000.db.gz", "ativos_20240103_120000.db", "ativos_20240103_120000_1.db",
+           "outro_arquivo.db")
+
+    removidos = backup.aplicar_retencao(diretorio, manter_ultimos=2, manter_diarios=2)
+
+    # Os 2 mais recentes (do dia 3) e o último de cada um dos 2 últimos dias com backup
+    assert sorted(os.path.basename(caminho) for caminho in removidos) == [
+        "ativos_20240101_030000.db.gz", "ativos_20240101_150000.db.gz", "ativos_20240103_030000.db.gz"]
+    assert sorted(os.listdir(diretorio)) == [
+        "ativos_20240102_030000.db.gz", "ativos_20240103_120000.db", "ativos_20240103_120000_1.db", "outro_arquivo.db"]
+
+
+def test_restauracao(carteira, cliente, banco):
+    arquivo = backup.fazer_backup(diretorio="copias")
+    etag = cliente.get("/api/operacoes/", params=PERIODO).headers["ETag"]
+    criar_operacao(cliente, carteira, "Comprar", date(2024, 3, 2), 11.0, 10)
+
+    contagens = backup.restaurar_backup(arquivo)
+
+    assert contagens == {"ativos": 1, "operacoes": 2}
+    assert len(cliente.get("/api/operacoes/", params=PERIODO).json()["operacoes"]) == 2
+    # O banco anterior foi salvo antes, no diretório padrão
+    assert backup.verificar_backup(backup.listar_backups()[0][0])["operacoes"] == 3
+    # As versões avançam: a ETag guardada antes do backup não vale para o banco restaurado
+    assert cliente.get("/api/operacoes/", params=PERIODO, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_backup_invalido_nao_e_restaurado(carteira, tmp_path, banco):
+    sem_tabelas = str(tmp_path / "ativos_20240101_000000.db")
+    sqlite3.connect(sem_tabelas).execute("CREATE TABLE outra (id INTEGER)").connection.close()
+    corrompido = str(tmp_path / "ativos_20240102_000000.db.gz")
+    with gzip.open(corrompido, "wb") as saida:
+        saida.write(b"SQLite format 3\x00" + b"\xff" * 4096)
+
+    with pytest.raises(ValueError, match="sem as tabelas"):
+        backup.verificar_backup(sem_tabelas)
+    with pytest.raises(ValueError):
+        backup.restaurar_backup(sem_tabelas)
+    with pytest.raises(sqlite3.DatabaseError):
+        backup.restaurar_backup(corrompido)
+    assert backup.verificar_backup(backup.fazer_backup(diretorio=str(tmp_path / "bk")))["operacoes"] == 2
+    assert backup.listar_backups() == []  # Nada foi salvo nem restaurado
+
+
+def test_endpoints_de_backup(carteira, cliente):
+    criado = cliente.post("/api/backups")
+
+    assert criado.status_code == 201 and criado.json()["tamanho"] > 0
+    assert [b["arquivo"] for b in cliente.get("/api/backups").json()] == [criado.json()["arquivo"]]
@@ -0,0 +1,101 @@
+# backend/tests/test_cache_sqlite.py
+import sqlite3
+import threading
+import time
+import pandas as pd
+import pytest
+from backend.cache_sqlite import CacheSQLite
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_leitura_e_gravacao(caminho):
+    cache = CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)
+    hist = pd.DataFrame({"Close": [10.0, 11.0]}, index=pd.bdate_range("2024-01-02", periods=2))
+
+    with pytest.raises(KeyError):
+        cache['PETR4']
+    cache['PETR4'] = hist
+    cache[('VALE3', 1)] = {"Preço Atual": 60.0}
+
+    assert cache['PETR4'].equals(hist)
+    assert ('VALE3', 1) in cache and 'ITUB4' not in cache
+    assert len(cache) == 2 and cache.geracao == 2
+    # Outro processo (outra instância sobre o mesmo arquivo) enxerga os mesmos valores
+    assert CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)['PETR4'].equals(hist)
+    assert len(CacheSQLite('outro', maxsize=8, ttl=60, caminho=caminho)) == 0
+
+
+def test_ttl_e_tamanho_maximo(caminho):
+    curto = CacheSQLite('curto', maxsize=8, ttl=0.05, caminho=caminho)
+    curto['a'] = 1
+    time.sleep(0.1)
+    assert 'a' not in curto
+
+    pequeno = CacheSQLite('pequeno', maxsize=3, ttl=60, caminho=caminho)
+    for i in range(5):
+        pequeno[i] = i
+    # Saem primeiro os que expiram antes (os gravados há mais tempo)
+    assert len(pequeno) == 3
+    assert [i in pequeno for i in range(5)] == [False, False, True, True, True]
+
+
+def test_reservar(caminho):
+    cache = CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)
+    outro_processo = CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)
+
+    assert cache.reservar('rodada', 0.1)
+    assert not outro_processo.reservar('rodada', 0.1)
+    assert outro_processo.reservar('outra_rodada', 0.1)
+    time.sleep(0.15)
+    assert outro_processo.reservar('rodada', 0.1)
+
+
+def test_executar_uma_vez_entre_processos(caminho):
+    chamadas, resultados = [], []
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return "valor"
+
+    def worker():
+        # Uma instância por thread, como cada worker do uvicorn
+        resultados.append(CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho).executar_uma_vez('PETR4', calcular))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(chamadas) == 1
+    assert sorted(resultados) == [("valor", False)] * 5 + [("valor", True)]
+
+
+def test_executar_uma_vez_grava_antes_de_liberar(caminho, monkeypatch):
+    cache = CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)
+    liberar = cache._liberar
+    gravado_na_liberacao = []
+
+    def verificar_e_liberar(chave, dono):
+        gravado_na_liberacao.append('PETR4' in cache)
+        liberar(chave, dono)
+    monkeypatch.setattr(cache, '_liberar', verificar_e_liberar)
+
+    assert cache.executar_uma_vez('PETR4', lambda: 42) == (42, True)
+    assert gravado_na_liberacao == [True]
+
+
+def test_executar_uma_vez_com_falha_na_gravacao(caminho, monkeypatch):
+    cache = CacheSQLite('teste', maxsize=8, ttl=60, caminho=caminho)
+
+    def gravar(self, chave, valor):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(CacheSQLite, '__setitem__', gravar)
+
+    assert cache.executar_uma_vez('PETR4', lambda: 42) == (42, True)
+    assert cache.reservar('PETR4', 1)  # O arrendamento foi liberado
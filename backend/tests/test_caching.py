@@ -0,0 +1,279 @@
+# backend/tests/test_caching.py
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from cachetools import TTLCache
+from backend import metricas
+from backend.caching import cached, MonitoredTTLCache
+
+
+def contador(nome, **labels):
+    return metricas._contadores.get((nome, metricas._labels(labels)), 0)
+
+
+def esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+def test_funcoes_no_mesmo_cache_tem_chaves_proprias():
+    cache = TTLCache(maxsize=8, ttl=60)
+
+    @cached(cache)
+    def preco(ticker):
+        return 10.0
+
+    @cached(cache)
+    def dividendos(ticker):
+        return 0.5
+
+    assert (preco("PETR4"), dividendos("PETR4")) == (10.0, 0.5)
+    assert len(cache) == 2
+
+
+def test_cache_get_e_cache_set():
+    cache = TTLCache(maxsize=8, ttl=60)
+    chamadas = []
+
+    @cached(cache)
+    def preco(ticker):
+        chamadas.append(ticker)
+        return 10.0
+
+    with pytest.raises(KeyError):
+        preco.cache_get("PETR4")
+    preco.cache_set(12.5, "PETR4")
+
+    assert preco.cache_get("PETR4") == 12.5
+    assert preco("PETR4") == 12.5 and chamadas == []
+
+
+def test_chamadas_simultaneas_executam_a_funcao_uma_vez():
+    cache = MonitoredTTLCache('teste_single_flight', maxsize=8, ttl=60)
+    chamadas = []
+    liberar = threading.Event()
+
+    @cached(cache)
+    def lenta(x):
+        chamadas.append(x)
+        liberar.wait(5)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futuros = [executor.submit(lenta, 21) for _ in range(8)]
+        esperar(lambda: contador('carteira_cache_coalesced_total', cache='teste_single_flight',
+                                 funcao=lenta.__qualname__) == 7)
+        liberar.set()
+        assert [f.result(5) for f in futuros] == [42] * 8
+    assert chamadas == [21]
+    assert lenta(21) == 42 and chamadas == [21]
+
+
+def test_valor_expirado_e_servido_enquanto_atualiza_em_segundo_plano():
+    cache = MonitoredTTLCache('teste_swr', maxsize=8, ttl=0.05)
+    versao = [1]
+    liberar = threading.Event()
+
+    @cached(cache, stale_while_revalidate=True)
+    def cotacao(ticker):
+        if versao[0] > 1:
+            liberar.wait(5)
+        return (ticker, versao[0])
+
+    assert cotacao("PETR4") == ("PETR4", 1)
+    time.sleep(0.1)
+    versao[0] = 2
+    # Expirado: o último valor volta na hora, sem esperar a atualização
+    assert cotacao("PETR4") == ("PETR4", 1)
+    assert cotacao("PETR4") == ("PETR4", 1)
+    liberar.set()
+    esperar(lambda: cotacao("PETR4") == ("PETR4", 2))
+
+
+def test_cached_or_stale_nao_dispara_a_atualizacao():
+    cache = MonitoredTTLCache('teste_cached_or_stale', maxsize=8, ttl=0.05)
+    chamadas = []
+
+    @cached(cache, stale_while_revalidate=True)
+    def valor(x):
+        chamadas.append(x)
+        return x
+
+    with pytest.raises(KeyError):
+        valor.cached_or_stale(1)
+    valor(1)
+    assert valor.cached_or_stale(1) == (1, False)
+    time.sleep(0.1)
+    assert valor.cached_or_stale(1) == (1, True)
+    time.sleep(0.05)
+    assert chamadas == [1]
+
+
+def test_falha_fica_em_cache_com_backoff_exponencial():
+    cache = MonitoredTTLCache('teste_negativo', maxsize=8, ttl=60)
+    chamadas = []
+
+    @cached(cache, negative_ttl={LookupError: 0.2})
+    def buscar(ticker):
+        chamadas.append(ticker)
+        raise LookupError(ticker)
+
+    with pytest.raises(LookupError):
+        buscar("XPTO3")
+    with pytest.raises(LookupError):
+        buscar("XPTO3")
+    assert len(chamadas) == 1  # A segunda falha veio do cache
+
+    time.sleep(0.25)
+    with pytest.raises(LookupError):
+        buscar("XPTO3")
+    assert len(chamadas) == 2
+    # Segunda falha seguida: o backoff dobra para 0,4 s
+    time.sleep(0.25)
+    with pytest.raises(LookupError):
+        buscar("XPTO3")
+    assert len(chamadas) == 2
+    assert contador('carteira_cache_negative_hits_total', cache='teste_negativo', funcao=buscar.__qualname__) == 2
+
+
+def test_excecoes_fora_de_negative_ttl_nao_ficam_em_cache():
+    cache = MonitoredTTLCache('teste_sem_negativo', maxsize=8, ttl=60)
+    chamadas = []
+
+    @cached(cache, negative_ttl={LookupError: 60})
+    def buscar(ticker):
+        chamadas.append(ticker)
+        raise ValueError(ticker)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            buscar("XPTO3")
+    assert len(chamadas) == 2
+
+
+def test_falha_em_cache_e_relancada_como_copia_nova():
+    cache = MonitoredTTLCache('teste_copia', maxsize=8, ttl=60)
+
+    @cached(cache, negative_ttl={LookupError: 60})
+    def buscar(ticker):
+        raise LookupError(ticker)
+
+    excecoes = []
+    for _ in range(3):
+        with pytest.raises(LookupError) as info:
+            buscar("XPTO3")
+        excecoes.append(info.value)
+    assert excecoes[1] is not excecoes[2]
+    # O traceback não acumula os frames das chamadas anteriores
+    assert len(traceback.extract_tb(excecoes[1].__traceback__)) == len(traceback.extract_tb(excecoes[2].__traceback__))
+
+
+def test_falha_com_valor_anterior_serve_o_valor_expirado():
+    cache = MonitoredTTLCache('teste_negativo_swr', maxsize=8, ttl=0.05)
+    falhar = [False]
+
+    @cached(cache, stale_while_revalidate=True, negative_ttl={LookupError: 60})
+    def buscar(ticker):
+        if falhar[0]:
+            raise LookupError(ticker)
+        return 10.0
+
+    assert buscar("PETR4") == 10.0
+    time.sleep(0.1)
+    falhar[0] = True
+    assert buscar("PETR4") == 10.0  # Expirado: serve o último valor e atualiza em segundo plano (que falha)
+    esperar(lambda: contador('carteira_cache_stale_hits_total', cache='teste_negativo_swr',
+                             funcao=buscar.__qualname__) >= 1)
+    time.sleep(0.05)
+    assert buscar("PETR4") == 10.0
+
+
+def test_erro_ao_gravar_no_cache_nao_prende_quem_espera():
+    class CacheQuebrado(MonitoredTTLCache):
+        def __setitem__(self, key, value, *args, **kwargs):
+            raise OSError("database is locked")
+
+    cache = CacheQuebrado('teste_gravacao_falha', maxsize=8, ttl=60)
+    liberar = threading.Event()
+
+    @cached(cache)
+    def valor(x):
+        liberar.wait(5)
+        return x
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futuros = [executor.submit(valor, 7) for _ in range(2)]
+        esperar(lambda: contador('carteira_cache_coalesced_total', cache='teste_gravacao_falha',
+                                 funcao=valor.__qualname__) == 1)
+        liberar.set()
+        assert [f.result(5) for f in futuros] == [7, 7]
+
+
+def test_leitura_do_cache_compartilhado_fica_fora_do_lock(tmp_path):
+    from backend.cache_sqlite import CacheSQLite
+    lendo, liberar = threading.Event(), threading.Event()
+
+    class CacheLento(CacheSQLite):
+        def __getitem__(self, key):
+            lendo.set()
+            liberar.wait(5)
+            return super().__getitem__(key)
+
+    @cached(CacheLento('teste_lock_disco', maxsize=8, ttl=60, caminho=str(tmp_path / "cache.db")))
+    def em_disco(x):
+        return x
+
+    @cached(MonitoredTTLCache('teste_lock_memoria', maxsize=8, ttl=60))
+    def em_memoria(x):
+        return x
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futuro = executor.submit(em_disco, 1)
+        assert lendo.wait(5)
+        # Enquanto a leitura do disco espera, as outras funções cacheadas continuam respondendo
+        assert executor.submit(em_memoria, 2).result(1) == 2
+        liberar.set()
+        assert futuro.result(5) == 1
+
+
+def test_metricas_de_acertos_e_faltas():
+    cache = MonitoredTTLCache('teste_metricas', maxsize=8, ttl=60)
+
+    @cached(cache)
+    def dobro(x):
+        return 2 * x
+
+    dobro(1), dobro(1), dobro(2)
+    labels = {'cache': 'teste_metricas', 'funcao': dobro.__qualname__}
+    assert contador('carteira_cache_misses_total', **labels) == 2
+    assert contador('carteira_cache_hits_total', **labels) == 1
+    texto = metricas.render_prometheus()
+    assert '# TYPE carteira_cache_hits_total counter' in texto
+    assert 'carteira_cache_size{cache="teste_metricas"} 2' in texto
+    assert 'carteira_upstream_latency_seconds_count{cache="teste_metricas",funcao="' in texto
+
+
+def test_endpoint_de_metricas(cliente):
+    resposta = cliente.get("/api/metrics")
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/plain")
+    assert 'carteira_cache_maxsize{cache="market_data"} 512' in resposta.text
+
+
+def test_cache_em_memoria(tmp_path):
+    from backend.cache_sqlite import CacheSQLite
+
+    @cached(MonitoredTTLCache('teste_em_memoria', maxsize=8, ttl=60))
+    def em_memoria():
+        return 1
+
+    @cached(CacheSQLite('teste_em_disco', maxsize=8, ttl=60, caminho=str(tmp_path / "cache.db")))
+    def em_disco():
+        return 1
+
+    assert em_memoria.cache_em_memoria is True
+    assert em_disco.cache_em_memoria is False
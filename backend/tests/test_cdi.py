@@ -0,0 +1,82 @@
+# backend/tests/test_cdi.py
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from calculos.cdi import IndiceCdi
+from controllers import api_bcb
+from SQL import cdi, models
+
+DATAS = [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+
+
+def test_indice_acumula_o_periodo_semiaberto():
+    indice = IndiceCdi(DATAS, [1.0, 2.0, 3.0])
+
+    assert len(indice) == 3 and indice.ultima_data == date(2024, 1, 4)
+    # [inicio, fim): a taxa do dia do resgate não entra
+    assert indice.acumulado(date(2024, 1, 2), date(2024, 1, 4)) == pytest.approx((1.01 * 1.02 - 1) * 100)
+    assert indice.acumulado(date(2024, 1, 3), date(2024, 1, 5)) == pytest.approx((1.02 * 1.03 - 1) * 100)
+    # Datas sem taxa (fim de semana, antes ou depois da série) caem na próxima taxa publicada
+    assert indice.acumulado(date(2023, 12, 30), date(2024, 12, 31)) == pytest.approx((1.01 * 1.02 * 1.03 - 1) * 100)
+
+
+def test_indice_janela_vazia_ou_invertida():
+    indice = IndiceCdi(DATAS, [1.0, 2.0, 3.0])
+
+    assert indice.acumulado(date(2024, 1, 3), date(2024, 1, 3)) == 0.0
+    assert indice.acumulado(date(2024, 1, 4), date(2024, 1, 2)) == 0.0
+    assert indice.acumulado(date(2024, 2, 1), date(2024, 3, 1)) == 0.0
+    assert IndiceCdi([], []).acumulado(date(2024, 1, 1), date(2024, 2, 1)) == 0.0
+    assert IndiceCdi([], []).ultima_data is None
+
+
+def test_indice_acumulados_vetorizado():
+    indice = IndiceCdi(DATAS, [1.0, 2.0, 3.0])
+    inicios = [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 1)]
+    fins = [date(2024, 1, 5), date(2024, 1, 4), date(2024, 1, 2), date(2024, 1, 3)]
+
+    esperados = [indice.acumulado(i, f) for i, f in zip(inicios, fins)]
+
+    assert np.allclose(indice.acumulados(inicios, fins), esperados)
+    assert np.allclose(indice.acumulados(np.array(inicios, dtype='datetime64[D]'), fins), esperados)
+
+
+def test_serie_local(sessao):
+    assert cdi.ultima_data(sessao) is None
+    assert len(cdi.carregar_serie(sessao)[0]) == 0
+
+    cdi.salvar_taxas(sessao, [{'data': DATAS[1], 'taxa': 0.04}, {'data': DATAS[0], 'taxa': 0.05}])
+    cdi.salvar_taxas(sessao, [{'data': DATAS[1], 'taxa': 0.045}])
+
+    datas, taxas = cdi.carregar_serie(sessao)
+    assert datas.astype(object).tolist() == DATAS[:2]
+    assert taxas.tolist() == [0.05, 0.045]
+    assert cdi.ultima_data(sessao) == DATAS[1]
+
+
+def test_atualizacao_incremental(sessao, provedor):
+    gravadas = api_bcb.atualizar_cdi()
+    assert gravadas > 3000 and provedor.chamadas >= 2  # Mais de 10 anos: janelas de até 10 anos por consulta
+
+    ultima = cdi.ultima_data(sessao)
+    sessao.query(models.CdiDiario).filter(models.CdiDiario.data > ultima - timedelta(days=10)).delete()
+    sessao.commit()
+    chamadas = provedor.chamadas
+
+    regravadas = api_bcb.atualizar_cdi()
+
+    assert 0 < regravadas <= 10 and provedor.chamadas == chamadas + 1
+    assert cdi.ultima_data(sessao) == ultima
+    assert len(cdi.carregar_serie(sessao)[0]) == gravadas
+
+
+def test_endpoint_cdi(cliente):
+    indice = api_bcb.recarregar_indice_cdi()
+
+    corpo = cliente.get("/api/market-data/cdi", params={"data_inicio": "2024-01-01", "data_fim": "2024-12-31"}).json()
+
+    assert corpo["cdi_acumulado_12m"] == pytest.approx(api_bcb.acumulado_12m(indice))
+    assert corpo["cdi_acumulado_periodo"] == pytest.approx(indice.acumulado(date(2024, 1, 1), date(2025, 1, 1)))
+    assert 8 < corpo["cdi_acumulado_periodo"] < 14
+    resposta = cliente.get("/api/market-data/cdi", params={"data_inicio": "2024-02-01", "data_fim": "2024-01-01"})
+    assert resposta.status_code == 400
@@ -0,0 +1,60 @@
+# backend/tests/test_concorrencia.py
+import threading
+import anyio
+import pytest
+from backend import concorrencia
+from backend.cache_sqlite import CacheSQLite
+from backend.caching import cached, MonitoredTTLCache
+from backend.concorrencia import chamar_provedor
+
+
+@pytest.fixture
+def trocas_de_thread(monkeypatch):
+    """Conta as chamadas que foram para uma thread do limite dos provedores."""
+    trocas = []
+    original = anyio.to_thread.run_sync
+
+    async def run_sync(funcao, *args, **kwargs):
+        trocas.append(kwargs.get('limiter'))
+        return await original(funcao, *args, **kwargs)
+    monkeypatch.setattr(concorrencia.anyio.to_thread, 'run_sync', run_sync)
+    return trocas
+
+
+def test_cache_em_memoria_responde_sem_trocar_de_thread(trocas_de_thread):
+    threads = []
+
+    @cached(MonitoredTTLCache('teste_concorrencia_memoria', maxsize=8, ttl=60))
+    def cotacao(ticker):
+        threads.append(threading.get_ident())
+        return {"ticker": ticker}
+
+    async def principal():
+        return [await chamar_provedor(cotacao, "PETR4") for _ in range(3)]
+
+    assert anyio.run(principal) == [{"ticker": "PETR4"}] * 3
+    # Só a primeira chamada (falta no cache) foi ao provedor, numa thread do limite próprio
+    assert trocas_de_thread == [concorrencia.limitador_provedores]
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
+
+
+def test_cache_em_disco_sempre_vai_para_a_thread(tmp_path, trocas_de_thread):
+    @cached(CacheSQLite('teste_concorrencia_disco', maxsize=8, ttl=60, caminho=str(tmp_path / "cache.db")))
+    def cotacao(ticker):
+        return {"ticker": ticker}
+
+    async def principal():
+        for _ in range(3):
+            await chamar_provedor(cotacao, "PETR4")
+
+    anyio.run(principal)
+
+    assert len(trocas_de_thread) == 3
+
+
+def test_funcao_sem_cache_vai_para_a_thread(trocas_de_thread):
+    async def principal():
+        return await chamar_provedor(lambda a, b=0: threading.get_ident() + 0 * (a + b), 1, b=2)
+
+    assert anyio.run(principal) != threading.get_ident()
+    assert trocas_de_thread == [concorrencia.limitador_provedores]
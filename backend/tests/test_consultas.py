@@ -0,0 +1,42 @@
+# backend/tests/test_consultas.py
+from datetime import date
+from conftest import criar_ativo, criar_operacao
+from SQL import consultas
+
+
+def test_posicoes_por_ativo_agrega_as_operacoes(cliente, sessao):
+    petr = criar_ativo(cliente, "PETR4")
+    hglg = criar_ativo(cliente, "HGLG11", "FII")
+    criar_ativo(cliente, "VALE3")  # Sem operações: não aparece
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    criar_operacao(cliente, petr, "Comprar", date(2024, 2, 1), 20.0, 100)
+    criar_operacao(cliente, petr, "Vender", date(2024, 3, 1), 25.0, 50)
+    criar_operacao(cliente, hglg, "Comprar", date(2024, 1, 5), 150.0, 10)
+
+    posicoes = {p['ticker']: p for p in consultas.posicoes_por_ativo(sessao)}
+
+    assert set(posicoes) == {"PETR4", "HGLG11"}
+    petr4 = posicoes["PETR4"]
+    assert petr4['tipo_ativo'] == "Ação"
+    assert petr4['total_comprado'] == 3000.0
+    assert petr4['total_vendido'] == 1250.0
+    assert petr4['quantidade'] == 150
+    assert petr4['preco_medio'] == 15.0
+    assert (petr4['primeira_operacao'], petr4['ultima_operacao']) == (date(2024, 1, 2), date(2024, 3, 1))
+    assert posicoes["HGLG11"]['quantidade'] == 10
+
+
+def test_posicoes_por_ativo_sem_operacoes(banco, sessao):
+    assert consultas.posicoes_por_ativo(sessao) == []
+
+
+def test_fluxos_por_dia_soma_as_operacoes_do_mesmo_dia(cliente, sessao):
+    petr = criar_ativo(cliente, "PETR4")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 12.0, 50)
+    criar_operacao(cliente, petr, "Vender", date(2024, 1, 3), 11.0, 30)
+
+    fluxos = {(linha.ticker, linha.data_operacao): (linha.quantidade, float(linha.fluxo))
+              for linha in consultas.fluxos_por_dia(sessao)}
+
+    assert fluxos == {("PETR4", date(2024, 1, 2)): (150, 1600.0), ("PETR4", date(2024, 1, 3)): (-30, -330.0)}
@@ -0,0 +1,43 @@
+# backend/tests/test_database.py
+import sqlite3
+import pytest
+from sqlalchemy import inspect, select, text
+from SQL import database, models
+
+
+def test_indices_das_operacoes(banco):
+    indices = {indice['name']: indice['column_names'] for indice in inspect(database._engine).get_indexes('operacoes')}
+    assert indices['ix_operacoes_id_ticker_data'] == ['id_ticker', 'data_operacao']
+    assert indices['ix_operacoes_data_operacao'] == ['data_operacao']
+
+
+def test_ajustes_do_sqlite_em_cada_conexao(banco):
+    with database._engine.connect() as conexao:
+        assert conexao.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conexao.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert conexao.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_transacao_imediata_reserva_a_escrita_desde_o_inicio(banco):
+    outra = sqlite3.connect(banco, timeout=0.1)
+    try:
+        with database.transacao_imediata(database._engine) as conexao:
+            conexao.execute(select(models.Ativo.id)).all()  # Só leitura, e a escrita já está reservada
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                outra.execute("INSERT INTO ativos (ticker, tipo_ativo) VALUES ('PETR4', 'Ação')")
+            conexao.execute(models.Ativo.__table__.insert().values(ticker="VALE3", tipo_ativo="Ação"))
+        outra.execute("INSERT INTO ativos (ticker, tipo_ativo) VALUES ('PETR4', 'Ação')")
+        outra.commit()
+    finally:
+        outra.close()
+    with database._engine.connect() as conexao:
+        assert sorted(conexao.execute(text("SELECT ticker FROM ativos")).scalars()) == ["PETR4", "VALE3"]
+
+
+def test_transacao_imediata_desfaz_em_caso_de_erro(banco):
+    with pytest.raises(RuntimeError):
+        with database.transacao_imediata(database._engine) as conexao:
+            conexao.execute(models.Ativo.__table__.insert().values(ticker="VALE3", tipo_ativo="Ação"))
+            raise RuntimeError("falha no meio da gravação")
+    with database._engine.connect() as conexao:
+        assert conexao.execute(text("SELECT count(*) FROM ativos")).scalar() == 0
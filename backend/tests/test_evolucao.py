@@ -0,0 +1,71 @@
+# backend/tests/test_evolucao.py
+from datetime import date
+import pandas as pd
+import pytest
+from conftest import criar_ativo, criar_operacao
+from calculos import evolucao
+
+
+def _fluxos(*linhas):
+    return pd.DataFrame(linhas, columns=evolucao.COLUNAS_FLUXOS)
+
+
+def test_evolucao_valor_investido_e_retorno():
+    datas = pd.bdate_range("2024-01-02", periods=3)
+    fechamentos = pd.DataFrame({"PETR4": [10.0, 11.0, 12.1]}, index=datas)
+    fluxos = _fluxos(("PETR4", date(2024, 1, 2), 100, 1000.0), ("PETR4", date(2024, 1, 3), 100, 1100.0))
+
+    calculada = evolucao.calcular_evolucao(fluxos, fechamentos)
+
+    assert calculada['valor'].tolist() == pytest.approx([1000.0, 2200.0, 2420.0])
+    assert calculada['investido'].tolist() == [1000.0, 2100.0, 2100.0]
+    # O aporte entra no início do dia: a base do segundo dia é 1000 + 1100
+    dia2 = 2200.0 / 2100.0
+    assert calculada['retorno_acumulado'].tolist() == pytest.approx([0.0, (dia2 - 1) * 100, (dia2 * 1.1 - 1) * 100])
+
+
+def test_evolucao_venda_total_e_dividendos():
+    datas = pd.bdate_range("2024-01-02", periods=3)
+    fechamentos = pd.DataFrame({"HGLG11": [100.0, 100.0, 100.0]}, index=datas)
+    dividendos = pd.DataFrame({"HGLG11": [0.0, 1.0, 0.0]}, index=datas)
+    fluxos = _fluxos(("HGLG11", date(2024, 1, 2), 10, 1000.0), ("HGLG11", date(2024, 1, 4), -10, -1000.0))
+
+    calculada = evolucao.calcular_evolucao(fluxos, fechamentos, dividendos)
+
+    assert calculada['dividendos'].tolist() == [0.0, 10.0, 0.0]
+    assert calculada['valor'].iloc[-1] == 0.0
+    # O resgate sai no fim do dia: a venda total não derruba o retorno para -100%
+    assert calculada['retorno_acumulado'].iloc[-1] == pytest.approx(1.0)
+
+
+def test_evolucao_sem_cotacao_usa_o_preco_da_operacao():
+    fechamentos = pd.DataFrame(index=pd.bdate_range("2024-01-02", periods=2))
+    fluxos = _fluxos(("XPTO11", date(2024, 1, 2), 10, 500.0))
+
+    assert evolucao.calcular_evolucao(fluxos, fechamentos)['valor'].tolist() == [500.0, 500.0]
+
+
+def test_recortar_periodo_rebaseia_o_retorno():
+    calculada = pd.DataFrame({"retorno_acumulado": [0.0, 10.0, 21.0]}, index=pd.bdate_range("2024-01-02", periods=3))
+
+    recortada = evolucao.recortar_periodo(calculada, date(2024, 1, 3), date(2024, 1, 3))
+
+    assert list(recortada.index.date) == [date(2024, 1, 3)]
+    # O retorno do primeiro dia do período conta a partir do fechamento anterior
+    assert recortada['retorno_acumulado'].iloc[0] == pytest.approx(10.0)
+    assert evolucao.recortar_periodo(calculada, date(2024, 1, 4))['retorno_acumulado'].iloc[0] == pytest.approx(10.0)
+    assert evolucao.recortar_periodo(calculada)['retorno_acumulado'].tolist() == [0.0, 10.0, 21.0]
+
+
+def test_endpoint_evolucao(cliente):
+    petr = criar_ativo(cliente, "EVOL3")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    criar_operacao(cliente, criar_ativo(cliente, "INEXISTENTE9"), "Comprar", date(2024, 1, 2), 10.0, 1)
+
+    corpo = cliente.get("/api/dashboard/evolucao", params={"data_inicio": "2024-02-01", "data_fim": "2024-02-29"}).json()
+
+    assert corpo["sem_cotacao"] == ["INEXISTENTE9"]
+    datas = [linha["data"] for linha in corpo["evolucao"]]
+    assert datas[0] >= "2024-02-01" and datas[-1] <= "2024-02-29"
+    assert corpo["evolucao"][0]["investido"] == 1010.0
+    assert cliente.get("/api/dashboard/evolucao").status_code == 200
@@ -0,0 +1,107 @@
+# backend/tests/test_importacao.py
+import io
+from datetime import date
+import pytest
+from openpyxl import Workbook
+from conftest import criar_ativo
+from SQL import database, importacao, models, posicoes
+
+CABECALHO = "ticker;tipo_operacao;data_operacao;preco;quantidade;tipo_ativo\n"
+
+
+def importar(cliente, conteudo, nome="operacoes.csv"):
+    return cliente.post("/api/operacoes/importar", files={"arquivo": (nome, io.BytesIO(conteudo))})
+
+
+def contar_operacoes():
+    db = database.get_db_session()()
+    try:
+        return db.query(models.Operacao).count()
+    finally:
+        db.close()
+
+
+def test_importa_csv_e_relata_os_erros_por_linha(cliente, sessao):
+    criar_ativo(cliente, "PETR4")
+    conteudo = (CABECALHO +
+                "petr4;Compra;02/01/2024;R$ 10,50;100;\n"
+                "HGLG11;C;2024-01-03;150;10;FII\n"
+                "PETR4;Venda;2024-02-01;12;50;\n"
+                "VALE3;Comprar;2024-01-02;60;10;\n"          # Ativo novo sem tipo_ativo
+                "PETR4;Bonificar;2024-01-02;1;1;\n"
+                "PETR4;Comprar;31/02/2024;1;1;\n"
+                "PETR4;Comprar;2024-01-02;nan;1;\n"
+                "PETR4;Comprar;2024-01-02;10;1,5;\n").encode("cp1252")
+
+    resposta = importar(cliente, conteudo)
+
+    assert resposta.status_code == 200
+    relatorio = resposta.json()
+    assert relatorio['importadas'] == 3
+    assert relatorio['ativos_criados'] == ["HGLG11"]
+    assert relatorio['total_erros'] == 5
+    assert [erro['linha'] for erro in relatorio['erros']] == [5, 6, 7, 8, 9]
+    assert "tipo_ativo" in relatorio['erros'][0]['erro']
+    assert posicoes.verificar(sessao) == []
+    compra = sessao.query(models.Operacao).order_by(models.Operacao.id).first()
+    assert (compra.tipo_operacao, compra.data_operacao, float(compra.preco)) == ("Comprar", date(2024, 1, 2), 10.5)
+
+
+def test_importa_xlsx(cliente):
+    livro = Workbook()
+    planilha = livro.active
+    planilha.append(["Ticker", "Tipo_Operacao", "Data_Operacao", "Preco", "Quantidade", "Tipo_Ativo"])
+    planilha.append(["BOVA11", "Comprar", date(2024, 1, 2), 120.5, 3, "ETF"])
+    planilha.append([None, None, None, None, None, None])
+    arquivo = io.BytesIO()
+    livro.save(arquivo)
+
+    resposta = importar(cliente, arquivo.getvalue(), "corretora.xlsx")
+
+    assert resposta.status_code == 200
+    assert resposta.json()['importadas'] == 1 and resposta.json()['total_erros'] == 0
+
+
+@pytest.mark.parametrize("nome, conteudo", [
+    ("operacoes.txt", b"qualquer coisa"),
+    ("operacoes.xlsx", b"nao e um zip"),
+    ("operacoes.csv", CABECALHO.encode() + b"PETR4;Comprar;2024-01-02;10;1;\x81\x8d\x8f\x90\x9d\n"),
+])
+def test_arquivo_invalido_responde_400_sem_gravar(cliente, nome, conteudo):
+    assert importar(cliente, conteudo, nome).status_code == 400
+    assert contar_operacoes() == 0
+
+
+def test_erro_no_meio_da_importacao_desfaz_os_lotes_anteriores(cliente, monkeypatch):
+    criar_ativo(cliente, "PETR4")
+    monkeypatch.setattr(importacao, "TAMANHO_LOTE", 2)
+    linhas = [{'ticker': 'PETR4', 'tipo_operacao': 'Comprar', 'data_operacao': '2024-01-02', 'preco': '10',
+               'quantidade': '1'}] * 5
+    original = importacao._gravar_lote
+    lotes = []
+
+    def gravar_lote(db, lote, ids_ativos, relatorio):
+        lotes.append(len(lote))
+        if len(lotes) == 3:
+            raise RuntimeError("falha no terceiro lote")
+        original(db, lote, ids_ativos, relatorio)
+    monkeypatch.setattr(importacao, "_gravar_lote", gravar_lote)
+
+    db = database.get_db_session()()
+    try:
+        with pytest.raises(RuntimeError):
+            importacao.importar_operacoes(db, iter(linhas))
+    finally:
+        db.close()
+
+    assert lotes == [2, 2, 1]
+    assert contar_operacoes() == 0
+
+
+def test_converter_numero():
+    assert importacao._converter_numero("1.234,56") == 1234.56
+    assert importacao._converter_numero("R$ 7,5") == 7.5
+    assert importacao._converter_numero(3) == 3.0
+    for invalido in ("inf", "nan", "abc"):
+        with pytest.raises(ValueError):
+            importacao._converter_numero(invalido)
@@ -0,0 +1,90 @@
+# backend/tests/test_migrate.py
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import date
+from sqlalchemy import create_engine, inspect, text
+from SQL import database, migrate, posicoes
+
+
+def _abrir(monkeypatch, caminho):
+    """Inicializa a aplicação sobre o banco 'caminho' (init_db aplica as migrações pendentes)."""
+    monkeypatch.setattr(database, "DB_ARQUIVO", caminho)
+    for nome in ("_engine", "_session_factory", "_async_session_factory"):
+        monkeypatch.setattr(database, nome, None)
+    database.init_db()
+    return database._engine
+
+
+def _banco_antigo(caminho, operacoes=7):
+    """Banco de uma versão antiga: sem controle de versões, sem índices e com o ativo da operação em 'ativo_id'."""
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript("""
+        CREATE TABLE ativos (id INTEGER PRIMARY KEY AUTOINCREMENT, ticker VARCHAR(10) NOT NULL UNIQUE,
+                             tipo_ativo VARCHAR(4) NOT NULL);
+        CREATE TABLE operacoes (id INTEGER PRIMARY KEY AUTOINCREMENT, ativo_id INTEGER NOT NULL REFERENCES ativos (id),
+                                tipo_operacao VARCHAR(7) NOT NULL, data_operacao DATE NOT NULL,
+                                preco NUMERIC(10, 2) NOT NULL, quantidade INTEGER NOT NULL);
+        INSERT INTO ativos (ticker, tipo_ativo) VALUES ('PETR4', 'Ação'), ('HGLG11', 'FII');
+    """)
+    conexao.executemany(
+        "INSERT INTO operacoes (ativo_id, tipo_operacao, data_operacao, preco, quantidade) VALUES (?, ?, ?, ?, ?)",
+        [(1 + i % 2, 'Comprar', date(2024, 1, 1 + i).isoformat(), 10.0 + i, 10) for i in range(operacoes)])
+    conexao.commit()
+    conexao.close()
+
+
+def test_banco_novo_recebe_todas_as_versoes(banco):
+    aplicadas = migrate.versoes_aplicadas(database._engine)
+
+    assert sorted(aplicadas) == [versao for versao, _, _ in migrate.MIGRACOES]
+    assert migrate.aplicar(database._engine) == []
+
+
+def test_banco_antigo_e_migrado(tmp_path, monkeypatch, capsys):
+    caminho = str(tmp_path / "antigo.db")
+    _banco_antigo(caminho)
+
+    engine = _abrir(monkeypatch, caminho)
+
+    assert sorted(migrate.versoes_aplicadas(engine)) == [versao for versao, _, _ in migrate.MIGRACOES]
+    assert "Migração 2 aplicada" in capsys.readouterr().out
+    with engine.connect() as conexao:
+        assert conexao.execute(text("SELECT count(*) FROM operacoes WHERE id_ticker IS NULL OR id_ticker != ativo_id")).scalar() == 0
+        assert {i['name'] for i in inspect(conexao).get_indexes('operacoes')} >= \
+            {'ix_operacoes_id_ticker_data', 'ix_operacoes_data_operacao'}
+        # Posições preenchidas a partir das operações que já existiam
+        assert posicoes.verificar(conexao) == []
+        assert conexao.execute(text("SELECT count(*) FROM posicoes")).scalar() == 2
+    database._engine.dispose()
+
+    # Reabrir o banco não aplica nada de novo
+    assert migrate.aplicar(create_engine(f"sqlite:///{caminho}")) == []
+
+
+def test_atualizar_em_lotes_pode_ser_retomada(tmp_path, capsys):
+    caminho = str(tmp_path / "antigo.db")
+    _banco_antigo(caminho, operacoes=10)
+    engine = create_engine(f"sqlite:///{caminho}")
+    with engine.begin() as conexao:
+        conexao.execute(text("ALTER TABLE operacoes ADD COLUMN id_ticker INTEGER"))
+        conexao.execute(text("UPDATE operacoes SET id_ticker = ativo_id WHERE id <= 4"))  # Interrompida antes
+
+    alteradas = migrate.atualizar_em_lotes(engine, 2, 'operacoes', "id_ticker = ativo_id", "id_ticker IS NULL", tamanho=3)
+
+    assert alteradas == 6
+    assert capsys.readouterr().out.count("Migração 2:") == 4  # Um aviso de progresso por lote
+    with engine.connect() as conexao:
+        assert conexao.execute(text("SELECT count(*) FROM operacoes WHERE id_ticker = ativo_id")).scalar() == 10
+    assert migrate.atualizar_em_lotes(create_engine(f"sqlite:///{tmp_path / 'vazio.db'}"), 2, 'sqlite_master', "x = 1") == 0
+
+
+def test_status_pela_linha_de_comando(banco):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run([sys.executable, "-m", "SQL.migrate", "status"], cwd=backend, capture_output=True,
+                           text=True, check=True, env={**os.environ, "CARTEIRA_DB_PATH": banco}).stdout
+
+    linhas = saida.splitlines()
+    assert len(linhas) == len(migrate.MIGRACOES)
+    assert all("aplicada em" in linha for linha in linhas)
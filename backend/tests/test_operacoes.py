@@ -0,0 +1,88 @@
+# backend/tests/test_operacoes.py
+import csv
+import io
+from datetime import date, timedelta
+from openpyxl import load_workbook
+from conftest import criar_ativo
+from SQL import database, models, posicoes
+
+PERIODO = {"data_inicio": "2020-01-01", "data_fim": "2030-01-01"}
+
+
+def inserir_operacoes(id_ticker, quantidade, inicio=date(2024, 1, 1)):
+    """Operações direto no banco (várias no mesmo dia, para o desempate do cursor pelo id)."""
+    db = database.get_db_session()()
+    linhas = [{'id_ticker': id_ticker, 'tipo_operacao': 'Comprar', 'data_operacao': inicio + timedelta(days=i // 3),
+               'preco': 10.0 + i, 'quantidade': 1} for i in range(quantidade)]
+    db.execute(models.Operacao.__table__.insert(), linhas)
+    posicoes.registrar_operacoes(db, linhas)
+    db.commit()
+    db.close()
+
+
+def test_paginacao_por_cursor_percorre_todas_as_operacoes(cliente):
+    inserir_operacoes(criar_ativo(cliente, "PETR4"), 25)
+
+    vistos, cursor = [], None
+    while True:
+        params = {**PERIODO, "limite": 10, **({"cursor": cursor} if cursor else {})}
+        corpo = cliente.get("/api/operacoes/", params=params).json()
+        assert corpo["total"] == 25
+        vistos += corpo["operacoes"]
+        cursor = corpo["proximo_cursor"]
+        if cursor is None:
+            break
+
+    assert len(vistos) == 25 and len({op["id"] for op in vistos}) == 25
+    chaves = [(op["data_operacao"], op["id"]) for op in vistos]
+    assert chaves == sorted(chaves, reverse=True)
+
+
+def test_paginacao_com_filtro_e_colunas_escolhidas(cliente):
+    inserir_operacoes(criar_ativo(cliente, "PETR4"), 5)
+    inserir_operacoes(criar_ativo(cliente, "VALE3"), 3)
+
+    corpo = cliente.get("/api/operacoes/", params={**PERIODO, "ticker": "VALE3", "campos": "ticker,preco"}).json()
+
+    assert corpo["total"] == 3 and corpo["proximo_cursor"] is None
+    assert corpo["operacoes"][0] == {"ticker": "VALE3", "preco": 12.0}
+
+
+def test_paginacao_rejeita_cursor_e_campos_invalidos(cliente):
+    assert cliente.get("/api/operacoes/", params={**PERIODO, "cursor": "invalido"}).status_code == 400
+    assert cliente.get("/api/operacoes/", params={**PERIODO, "campos": "id,senha"}).status_code == 400
+
+
+def test_exportacao_csv(cliente):
+    inserir_operacoes(criar_ativo(cliente, "PETR4"), 4)
+    inserir_operacoes(criar_ativo(cliente, "VALE3"), 2)
+
+    resposta = cliente.get("/api/operacoes/exportar", params={**PERIODO, "formato": "csv", "ticker": "PETR4"})
+
+    assert resposta.status_code == 200
+    assert 'filename="operacoes_2020-01-01_2030-01-01.csv"' in resposta.headers["content-disposition"]
+    linhas = list(csv.reader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+    assert linhas[0] == ['id', 'ticker', 'tipo_ativo', 'tipo_operacao', 'data_operacao', 'preco', 'quantidade', 'Total']
+    assert len(linhas) == 5 and {linha[1] for linha in linhas[1:]} == {"PETR4"}
+
+
+def test_exportacao_xlsx(cliente):
+    inserir_operacoes(criar_ativo(cliente, "PETR4"), 3)
+
+    resposta = cliente.get("/api/operacoes/exportar", params={**PERIODO, "formato": "xlsx"})
+
+    assert resposta.status_code == 200
+    planilha = load_workbook(io.BytesIO(resposta.content), read_only=True).worksheets[0]
+    linhas = list(planilha.iter_rows(values_only=True))
+    assert linhas[0][:2] == ('id', 'ticker') and len(linhas) == 4
+
+
+def test_exportacao_rejeita_formato_desconhecido(cliente):
+    assert cliente.get("/api/operacoes/exportar", params={**PERIODO, "formato": "pdf"}).status_code == 400
+
+
+def test_tipo_de_operacao_desconhecido_e_rejeitado(cliente):
+    id_ticker = criar_ativo(cliente, "PETR4")
+    resposta = cliente.post("/api/operacoes/", json={
+        "id_ticker": id_ticker, "tipo_operacao": "Bonificar", "data_operacao": "2024-01-02", "preco": 1, "quantidade": 1})
+    assert resposta.status_code == 422
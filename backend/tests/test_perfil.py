@@ -0,0 +1,61 @@
+# backend/tests/test_perfil.py
+import json
+import pytest
+from fastapi.testclient import TestClient
+from conftest import criar_ativo
+from backend import perfil
+
+
+@pytest.fixture
+def cliente_perfilado(banco, provedor):
+    import api
+    return TestClient(perfil.MiddlewarePerfil(api.app))
+
+
+def test_server_timing(cliente_perfilado):
+    criar_ativo(cliente_perfilado, "PETR4")
+
+    resposta = cliente_perfilado.get("/api/ativos/")
+
+    assert resposta.status_code == 200
+    partes = dict(parte.strip().split(";", 1) for parte in resposta.headers["Server-Timing"].split(","))
+    assert set(partes) == {"sql", "cache", "json", "app"}
+    # Versões dos dados e a listagem
+    assert 'desc="2 consultas"' in partes["sql"]
+
+
+def test_log_de_requisicoes_lentas(cliente_perfilado, tmp_path, monkeypatch):
+    log = tmp_path / "lentas.jsonl"
+    monkeypatch.setattr(perfil, "PERFIL_LIMITE_LENTO_MS", 0)
+    monkeypatch.setattr(perfil, "PERFIL_LOG_LENTAS", str(log))
+
+    cliente_perfilado.get("/api/market-data/ativo/PERF3/info")
+    cliente_perfilado.get("/api/ativos/", params={"x": "1"})
+
+    registros = [json.loads(linha) for linha in log.read_text(encoding="utf-8").splitlines()]
+    assert [(r["rota"], r["caminho"], r["status"]) for r in registros] == [
+        ("/api/market-data/ativo/{ticker}/info", "/api/market-data/ativo/PERF3/info", 200),
+        ("/api/ativos/", "/api/ativos/", 200)]
+    assert registros[0]["cache_chamadas"] >= 1 and registros[0]["bytes"] > 0
+    assert registros[1]["consulta"] == "x=1" and registros[1]["sql_consultas"] == 2
+
+
+def test_amostragem_grava_o_perfil(cliente_perfilado, tmp_path, monkeypatch):
+    monkeypatch.setattr(perfil, "PERFIL_AMOSTRAGEM_ROTA", "/api/dashboard")
+    monkeypatch.setattr(perfil, "PERFIL_AMOSTRAGEM_INTERVALO", 0.001)
+    monkeypatch.setattr(perfil, "PERFIL_DIRETORIO", str(tmp_path / "perfis"))
+
+    cliente_perfilado.get("/api/dashboard/resultados")
+    cliente_perfilado.get("/api/ativos/")
+
+    arquivos = list((tmp_path / "perfis").iterdir())
+    assert len(arquivos) == 1 and arquivos[0].name.startswith("api_dashboard_resultados_")
+    for linha in arquivos[0].read_text(encoding="utf-8").splitlines():
+        pilha, contagem = linha.rsplit(" ", 1)
+        assert int(contagem) > 0 and ";" in pilha
+
+
+def test_sem_middleware_nada_e_medido(cliente):
+    resposta = cliente.get("/api/ativos/")
+    assert "Server-Timing" not in resposta.headers
+    perfil.registrar_serializacao(1.0)  # Sem medição ativa: não faz nada
@@ -0,0 +1,89 @@
+# backend/tests/test_posicoes.py
+from datetime import date
+from conftest import criar_ativo, criar_operacao
+from SQL import models, posicoes
+
+
+def _posicao(sessao, id_ticker):
+    sessao.expire_all()
+    return sessao.get(models.Posicao, id_ticker)
+
+
+def test_escritas_atualizam_a_posicao_por_diferencas(cliente, sessao):
+    petr = criar_ativo(cliente, "PETR4")
+    primeira = criar_operacao(cliente, petr, "Comprar", date(2024, 1, 10), 10.0, 100)
+    criar_operacao(cliente, petr, "Comprar", date(2024, 2, 1), 20.0, 100)
+    venda = criar_operacao(cliente, petr, "Vender", date(2024, 3, 1), 25.0, 50)
+
+    posicao = _posicao(sessao, petr)
+    assert (posicao.quantidade, posicao.quantidade_comprada, posicao.quantidade_vendida) == (150, 200, 50)
+    assert (posicao.total_comprado, posicao.total_vendido, posicao.preco_medio) == (3000.0, 1250.0, 15.0)
+    assert (posicao.primeira_operacao, posicao.ultima_operacao) == (date(2024, 1, 10), date(2024, 3, 1))
+
+    # Alteração: sai a operação anterior e entra a nova
+    resposta = cliente.put(f"/api/operacoes/{primeira}", json={
+        "id_ticker": petr, "tipo_operacao": "Comprar", "data_operacao": "2024-01-20", "preco": 12.0, "quantidade": 100})
+    assert resposta.status_code == 200
+    posicao = _posicao(sessao, petr)
+    assert (posicao.total_comprado, posicao.preco_medio) == (3200.0, 16.0)
+    assert posicao.primeira_operacao == date(2024, 1, 20)
+
+    # Exclusão: as datas extremas são relidas das operações restantes
+    assert cliente.post("/api/operacoes/delete", json={"ids": [venda]}).status_code == 200
+    posicao = _posicao(sessao, petr)
+    assert (posicao.quantidade, posicao.quantidade_vendida, posicao.total_vendido) == (200, 0, 0.0)
+    assert posicao.ultima_operacao == date(2024, 2, 1)
+    assert posicoes.verificar(sessao) == []
+
+
+def test_posicao_removida_com_a_ultima_operacao(cliente, sessao):
+    vale = criar_ativo(cliente, "VALE3")
+    operacao = criar_operacao(cliente, vale, "Comprar", date(2024, 1, 10), 60.0, 10)
+
+    cliente.post("/api/operacoes/delete", json={"ids": [operacao]})
+
+    assert _posicao(sessao, vale) is None
+    assert posicoes.verificar(sessao) == []
+
+
+def test_exclusao_do_ativo_remove_a_posicao(cliente, sessao):
+    itub = criar_ativo(cliente, "ITUB4")
+    criar_operacao(cliente, itub, "Comprar", date(2024, 1, 10), 30.0, 10)
+
+    assert cliente.post("/api/ativos/delete", json={"ids": [itub]}).status_code == 200
+
+    assert _posicao(sessao, itub) is None
+    assert posicoes.verificar(sessao) == []
+
+
+def test_tipo_desconhecido_so_conta_como_operacao(banco, sessao):
+    ativo = models.Ativo(ticker="BBAS3", tipo_ativo="Ação")
+    sessao.add(ativo)
+    sessao.flush()
+    operacoes = [
+        {'id_ticker': ativo.id, 'tipo_operacao': 'Comprar', 'data_operacao': date(2024, 1, 2), 'preco': 10.0, 'quantidade': 10},
+        {'id_ticker': ativo.id, 'tipo_operacao': 'Vender', 'data_operacao': date(2024, 1, 3), 'preco': 12.0, 'quantidade': 4},
+        {'id_ticker': ativo.id, 'tipo_operacao': 'Desdobrar', 'data_operacao': date(2024, 1, 4), 'preco': 0.0, 'quantidade': 10},
+    ]
+    sessao.execute(models.Operacao.__table__.insert(), operacoes)
+    posicoes.registrar_operacoes(sessao, operacoes)
+
+    posicao = _posicao(sessao, ativo.id)
+    # Como na consulta agregada: o tipo desconhecido não é tratado como venda
+    assert (posicao.quantidade, posicao.quantidade_vendida, posicao.numero_operacoes) == (6, 4, 3)
+    assert posicoes.verificar(sessao) == []
+
+
+def test_verificar_e_reconstruir(cliente, sessao):
+    petr = criar_ativo(cliente, "PETR4")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 10), 10.0, 100)
+    sessao.execute(models.Posicao.__table__.update().values(quantidade=1, total_comprado=5.0))
+    sessao.commit()
+
+    divergencias = {d['campo']: (d['esperado'], d['atual']) for d in posicoes.verificar(sessao)}
+    assert divergencias == {'quantidade': (100, 1), 'total_comprado': (1000.0, 5.0)}
+
+    posicoes.reconstruir(sessao)
+    sessao.commit()
+    assert posicoes.verificar(sessao) == []
+    assert _posicao(sessao, petr).preco_medio == 10.0
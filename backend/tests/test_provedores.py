@@ -0,0 +1,45 @@
+# backend/tests/test_provedores.py
+from datetime import date
+import pytest
+from controllers import provedores
+
+
+def test_provedor_falso_deterministico():
+    a = provedores.ProvedorFalso().historico("PETR4", start=date(2023, 1, 1), end=date(2023, 2, 1))
+    b = provedores.ProvedorFalso().historicos(["PETR4"], period="5y")["PETR4"]
+
+    assert len(a) == 22 and a.index[-1].date() < date(2023, 2, 1)
+    # O mesmo dia tem o mesmo preço, qualquer que seja o período pedido
+    assert a['Close'].equals(b.loc[a.index, 'Close'])
+    assert not a['Close'].equals(provedores.ProvedorFalso(semente=1).historico("PETR4", start=date(2023, 1, 1),
+                                                                               end=date(2023, 2, 1))['Close'])
+
+
+def test_provedor_falso_ticker_inexistente():
+    falso = provedores.ProvedorFalso()
+
+    assert falso.historicos(["INEXISTENTE1", "VALE3"], period="1y").keys() == {"VALE3"}
+    assert falso.historico("INEXISTENTE1.SA", period="1y").empty
+    assert falso.chamadas == 2
+
+
+def test_provedor_falso_taxas_cdi_em_dias_uteis():
+    taxas = provedores.ProvedorFalso().taxas_cdi(date(2024, 1, 1), date(2024, 1, 7))
+
+    assert [t['data'] for t in taxas] == [date(2024, 1, d) for d in range(1, 6)]
+    assert all(0.02 < t['taxa'] < 0.06 for t in taxas)
+
+
+def test_provedor_falso_injeta_falhas():
+    falso = provedores.ProvedorFalso(taxa_erro=1.0)
+    with pytest.raises(provedores.ErroSimulado):
+        falso.historico("PETR4", period="1y")
+    with pytest.raises(ConnectionError):
+        falso.taxas_cdi(date(2024, 1, 1), date(2024, 1, 2))
+
+
+def test_definir_provedor(provedor):
+    assert provedores.provedor() is provedor
+    anterior = provedores.definir_provedor(provedores.ProvedorFalso())
+    assert anterior is provedor
+    provedores.definir_provedor(anterior)
@@ -0,0 +1,101 @@
+# backend/tests/test_respostas.py
+from datetime import date
+from decimal import Decimal
+import numpy as np
+import orjson
+from conftest import criar_ativo, criar_operacao
+from backend.respostas import RespostaJSON, gerar_etag
+from SQL import versoes
+
+PERIODO = {"data_inicio": "2020-01-01", "data_fim": "2030-01-01"}
+
+
+def test_listagem_condicional(cliente):
+    criar_ativo(cliente, "PETR4")
+    resposta = cliente.get("/api/ativos/")
+    etag, modificado_em = resposta.headers["ETag"], resposta.headers["Last-Modified"]
+    assert etag.startswith('W/"') and resposta.headers["Cache-Control"] == "no-cache"
+
+    nao_modificada = cliente.get("/api/ativos/", headers={"If-None-Match": etag})
+    assert nao_modificada.status_code == 304 and nao_modificada.content == b""
+    assert nao_modificada.headers["ETag"] == etag
+    # A ETag vale com ou sem o prefixo W/ (ex.: depois de passar por um proxy com compressão)
+    assert cliente.get("/api/ativos/", headers={"If-None-Match": f'"x", {etag[2:]}'}).status_code == 304
+    assert cliente.get("/api/ativos/", headers={"If-Modified-Since": modificado_em}).status_code == 304
+
+    criar_ativo(cliente, "VALE3")
+    alterada = cliente.get("/api/ativos/", headers={"If-None-Match": etag})
+    assert alterada.status_code == 200 and len(alterada.json()) == 2
+    assert alterada.headers["ETag"] != etag
+    assert cliente.get("/api/ativos/", headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}).status_code == 200
+
+
+def test_if_none_match_tem_precedencia(cliente):
+    criar_ativo(cliente, "PETR4")
+    modificado_em = cliente.get("/api/ativos/").headers["Last-Modified"]
+
+    resposta = cliente.get("/api/ativos/", headers={"If-None-Match": '"outra"', "If-Modified-Since": modificado_em})
+
+    assert resposta.status_code == 200
+
+
+def test_operacoes_dependem_dos_ativos(cliente):
+    petr = criar_ativo(cliente, "PETR4")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    etag = cliente.get("/api/operacoes/", params=PERIODO).headers["ETag"]
+    assert cliente.get("/api/operacoes/", params=PERIODO, headers={"If-None-Match": etag}).status_code == 304
+
+    criar_ativo(cliente, "VALE3")
+
+    assert cliente.get("/api/operacoes/", params=PERIODO, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_resultados_condicionais(cliente):
+    petr = criar_ativo(cliente, "PETR4")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    etag = cliente.get("/api/dashboard/resultados").headers["ETag"]
+
+    assert cliente.get("/api/dashboard/resultados", headers={"If-None-Match": etag}).status_code == 304
+    criar_operacao(cliente, petr, "Vender", date(2024, 2, 2), 12.0, 50)
+    assert cliente.get("/api/dashboard/resultados", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_performance_etag_do_estado_depois_do_calculo(cliente):
+    # Ticker novo: o cálculo preenche o cache de mercado, e a ETag enviada já é a desse estado
+    criar_operacao(cliente, criar_ativo(cliente, "ETAG3"), "Comprar", date(2024, 1, 2), 10.0, 100)
+
+    primeira = cliente.get("/api/dashboard/performance")
+    assert primeira.status_code == 200 and primeira.json()["ativos"][0]["Ticker"] == "ETAG3"
+
+    segunda = cliente.get("/api/dashboard/performance", headers={"If-None-Match": primeira.headers["ETag"]})
+    assert segunda.status_code == 304
+
+
+def test_compressao(cliente):
+    for i in range(60):
+        criar_ativo(cliente, f"TST{i:02d}")
+
+    grande = cliente.get("/api/ativos/", headers={"Accept-Encoding": "gzip"})
+    pequena = cliente.get("/api/operacoes/", params=PERIODO, headers={"Accept-Encoding": "gzip"})
+
+    assert grande.headers["Content-Encoding"] == "gzip" and len(grande.json()) == 60
+    assert "Content-Encoding" not in pequena.headers
+
+
+def test_resposta_json():
+    corpo = RespostaJSON({"preco": Decimal("10.50"), "valores": np.array([1.5, np.nan]), "data": date(2024, 1, 2),
+                          1: "chave numérica"}).body
+
+    assert orjson.loads(corpo) == {"preco": 10.5, "valores": [1.5, None], "data": "2024-01-02", "1": "chave numérica"}
+
+
+def test_versoes(sessao):
+    assert versoes.ler(sessao) == {}
+
+    versoes.incrementar(sessao, 'ativos', 'operacoes')
+    versoes.incrementar(sessao, 'operacoes')
+    sessao.commit()
+
+    lidas = versoes.ler(sessao)
+    assert {nome: versao for nome, (versao, _) in lidas.items()} == {'ativos': 1, 'operacoes': 2}
+    assert gerar_etag(1, 2) == gerar_etag(1, 2) != gerar_etag(2, 1)
@@ -0,0 +1,118 @@
+# backend/tests/test_resultados.py
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from conftest import criar_ativo, criar_operacao
+from calculos import resultado
+from SQL import models, resultados
+
+HOJE = date(2024, 4, 15)
+
+
+def _op(tipo_operacao, data_operacao, preco, quantidade, id_ticker=1, tipo_ativo="Ação"):
+    return SimpleNamespace(id_ticker=id_ticker, tipo_ativo=tipo_ativo, tipo_operacao=tipo_operacao,
+                           data_operacao=data_operacao, preco=preco, quantidade=quantidade)
+
+
+def test_apurar_pelo_custo_medio():
+    estado = {}
+    meses = resultado.apurar([
+        _op("Comprar", date(2024, 1, 2), 10.0, 100),
+        _op("Comprar", date(2024, 1, 5), 20.0, 100),
+        _op("Vender", date(2024, 2, 1), 25.0, 50),
+        _op("Desdobrar", date(2024, 2, 2), 0.0, 200),  # Tipo desconhecido: ignorado
+        _op("Vender", date(2024, 2, 10), 12.0, 50),
+    ], estado)
+
+    assert meses == {("2024-02", "Ação"): {'total_vendas': 1850.0, 'custo_vendas': 1500.0, 'lucro': 350.0}}
+    assert estado == {1: {'quantidade': 100, 'custo_total': 1500.0, 'lucro_realizado': 350.0}}
+
+
+def test_apurar_venda_alem_da_posicao_nao_gera_lucro():
+    estado = {}
+    meses = resultado.apurar([_op("Comprar", date(2024, 1, 2), 10.0, 10), _op("Vender", date(2024, 1, 3), 15.0, 30)], estado)
+
+    # 10 cotas pelo custo médio (lucro 50) e 20 pelo próprio preço de venda
+    assert meses[("2024-01", "Ação")]['lucro'] == 50.0
+    assert estado[1] == {'quantidade': -20, 'custo_total': 0.0, 'lucro_realizado': 50.0}
+
+
+def test_apurar_continua_do_estado_anterior():
+    estado = {}
+    resultado.apurar([_op("Comprar", date(2024, 1, 2), 10.0, 10)], estado)
+    meses = resultado.apurar([_op("Vender", date(2024, 2, 1), 11.0, 5)], estado)
+
+    assert meses[("2024-02", "Ação")]['lucro'] == 5.0
+    assert estado[1]['quantidade'] == 5
+
+
+def test_isencao():
+    assert resultado.isento("Ação", resultado.LIMITE_ISENCAO_ACOES)
+    assert not resultado.isento("Ação", resultado.LIMITE_ISENCAO_ACOES + 0.01)
+    assert not resultado.isento("FII", 100.0)
+
+
+@pytest.fixture
+def carteira(cliente):
+    petr = criar_ativo(cliente, "PETR4")
+    hglg = criar_ativo(cliente, "HGLG11", "FII")
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 2), 10.0, 100)
+    criar_operacao(cliente, petr, "Vender", date(2024, 2, 1), 12.0, 50)
+    criar_operacao(cliente, hglg, "Comprar", date(2024, 2, 5), 100.0, 10)
+    criar_operacao(cliente, hglg, "Vender", date(2024, 3, 5), 110.0, 10)
+    criar_operacao(cliente, petr, "Vender", date(2024, 4, 2), 15.0, 10)  # Mês corrente
+    return petr, hglg
+
+
+def test_meses_encerrados_ficam_gravados(carteira, sessao):
+    petr, hglg = carteira
+
+    meses, estado = resultados.apurar_resultados(sessao, HOJE)
+
+    assert [(m['mes'], m['tipo_ativo'], m['lucro'], m['isento']) for m in meses] == [
+        ("2024-02", "Ação", 100.0, True), ("2024-03", "FII", 100.0, False), ("2024-04", "Ação", 50.0, True)]
+    assert estado[petr] == {'quantidade': 40, 'custo_total': 400.0, 'lucro_realizado': 150.0}
+    sessao.expire_all()
+    assert sessao.get(models.ApuracaoResultado, 1).apurado_ate == "2024-03"
+    # O mês corrente não é gravado, e a situação gravada é a do fim de março
+    assert {linha.mes for linha in sessao.query(models.ResultadoMensal)} == {"2024-02", "2024-03"}
+    assert sessao.get(models.CustoMedio, petr).quantidade == 50
+
+    # Na leitura seguinte, os meses gravados não são apurados de novo
+    sessao.execute(models.ResultadoMensal.__table__.update().values(lucro=999.0))
+    sessao.commit()
+    assert resultados.apurar_resultados(sessao, HOJE)[0][0]['lucro'] == 999.0
+
+
+def test_virada_do_mes_apura_o_mes_encerrado(carteira, sessao):
+    resultados.apurar_resultados(sessao, HOJE)
+    meses, _ = resultados.apurar_resultados(sessao, date(2024, 5, 3))
+
+    sessao.expire_all()
+    assert sessao.get(models.ApuracaoResultado, 1).apurado_ate == "2024-04"
+    assert [m['mes'] for m in meses] == ["2024-02", "2024-03", "2024-04"]
+
+
+def test_escrita_retroativa_descarta_a_apuracao(carteira, cliente, sessao):
+    petr, _ = carteira
+    resultados.apurar_resultados(sessao, HOJE)
+    sessao.commit()
+
+    # Compra em janeiro: muda o custo médio da venda de fevereiro
+    criar_operacao(cliente, petr, "Comprar", date(2024, 1, 20), 16.0, 100)
+
+    sessao.expire_all()
+    assert sessao.get(models.ApuracaoResultado, 1) is None
+    meses, _ = resultados.apurar_resultados(sessao, HOJE)
+    assert meses[0]['lucro'] == pytest.approx(-50.0)
+
+
+def test_endpoint_resultados(carteira, cliente):
+    corpo = cliente.get("/api/dashboard/resultados", params={"ano": 2024}).json()
+
+    assert {m['mes'] for m in corpo["meses"]} >= {"2024-02", "2024-03"}
+    assert [a['ticker'] for a in corpo["ativos"]] == ["HGLG11", "PETR4"]
+    petr4 = corpo["ativos"][1]
+    assert (petr4['quantidade'], petr4['preco_medio']) == (40, 10.0)
+    assert corpo["lucro_realizado"] == 250.0
+    assert cliente.get("/api/dashboard/resultados", params={"ano": 2023}).json()["meses"] == []
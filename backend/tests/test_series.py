@@ -0,0 +1,56 @@
+# backend/tests/test_series.py
+import numpy as np
+import pandas as pd
+from calculos import series
+
+
+def test_lttb_mantem_as_pontas_e_os_extremos():
+    y = np.sin(np.linspace(0, 20, 1000))
+    y[500] = 10.0
+
+    indices = series.lttb(y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert list(indices) == sorted(set(indices))
+    assert 500 in indices
+
+
+def test_lttb_serie_menor_que_o_pedido():
+    assert list(series.lttb([1.0, 2.0, 3.0], 10)) == [0, 1, 2]
+
+
+def test_codificacao_compacta_ida_e_volta():
+    datas = pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-08"])
+    serie = pd.DataFrame({"Close": [10.5, np.nan, 9.99], "Volume": [100.0, 250.0, 50.0]}, index=datas)
+
+    compacta = series.codificar_compacto(serie)
+
+    assert compacta["inicio"] == "2024-01-02" and compacta["escala"] == 100
+    assert np.cumsum(compacta["datas"]).tolist() == [0, 1, 6]
+    # O valor ausente repete o anterior
+    assert (np.cumsum(compacta["colunas"]["Close"]) / 100).tolist() == [10.5, 10.5, 9.99]
+    assert (np.cumsum(compacta["colunas"]["Volume"]) / 100).tolist() == [100.0, 250.0, 50.0]
+    assert series.codificar_compacto(serie.iloc[:0])["datas"] == []
+
+
+def test_endpoint_detalhe_reduz_e_compacta(cliente):
+    params = {"colunas": "Close,Volume", "data_inicio": "2020-01-01", "data_fim": "2020-12-31"}
+
+    completo = cliente.get("/api/market-data/ativo/SERIE3/detalhe", params=params).json()
+    reduzido = cliente.get("/api/market-data/ativo/SERIE3/detalhe", params={**params, "pontos": 30}).json()
+    compacto = cliente.get("/api/market-data/ativo/SERIE3/detalhe",
+                           params={**params, "pontos": 30, "codificacao": "compacta"}).json()
+
+    assert completo["pontos_originais"] == len(completo["historico"]["datas"]) > 250
+    datas = reduzido["historico"]["datas"]
+    assert len(datas) == 30 and datas[0] == completo["historico"]["datas"][0]
+    assert datas[-1] == completo["historico"]["datas"][-1]
+    fechamentos = np.cumsum(compacto["historico"]["colunas"]["Close"]) / compacto["historico"]["escala"]
+    assert fechamentos.tolist() == reduzido["historico"]["colunas"]["Close"]
+
+
+def test_endpoint_detalhe_parametros_invalidos(cliente):
+    assert cliente.get("/api/market-data/ativo/SERIE3/detalhe", params={"colunas": "Preco"}).status_code == 400
+    assert cliente.get("/api/market-data/ativo/SERIE3/detalhe", params={"codificacao": "xml"}).status_code == 400
+    assert cliente.get("/api/market-data/ativo/SERIE3/detalhe", params={"pontos": 2}).status_code == 422
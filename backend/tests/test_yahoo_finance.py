@@ -0,0 +1,197 @@
+# backend/tests/test_yahoo_finance.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from backend.caching import market_data_cache
+from controllers import yahoo_finance
+from controllers.erros import DadosNaoEncontrados, ErroProvedor
+from SQL import cotacoes
+
+# O cache de get_ativo_info é do processo: cada teste usa tickers próprios para não receber valores de outro
+
+
+@pytest.fixture
+def mercado(provedor, monkeypatch):
+    """Registra os downloads em lote (historicos) e as buscas individuais (historico) pedidos ao provedor falso."""
+    pedidos = SimpleNamespace(downloads=[], historicos=[])
+    historicos, historico = provedor.historicos, provedor.historico
+
+    def espiar_historicos(tickers, **periodo):
+        pedidos.downloads.append((sorted(tickers), periodo))
+        return historicos(tickers, **periodo)
+
+    def espiar_historico(ticker, **periodo):
+        pedidos.historicos.append((ticker, periodo))
+        return historico(ticker, **periodo)
+    monkeypatch.setattr(provedor, "historicos", espiar_historicos)
+    monkeypatch.setattr(provedor, "historico", espiar_historico)
+    return pedidos
+
+
+def test_lote_faz_um_unico_download_e_preenche_o_cache(banco, mercado):
+    resultados, faltantes = yahoo_finance.get_ativos_info_batch(["LOTEA3", "LOTEB3", "INEXISTENTELOTE"])
+
+    assert sorted(resultados) == ["LOTEA3", "LOTEB3"]
+    assert faltantes == ["INEXISTENTELOTE"]
+    assert mercado.downloads == [(["INEXISTENTELOTE", "LOTEA3", "LOTEB3"], {"period": "1y"})]
+    assert resultados["LOTEA3"]['Preço Atual'] == resultados["LOTEA3"]['Histórico']['Close'].iloc[-1]
+    # Os tickers resolvidos no lote já estão no cache de get_ativo_info
+    assert yahoo_finance.get_ativo_info("LOTEB3") is resultados["LOTEB3"]
+    assert mercado.historicos == []
+
+
+def test_lote_so_baixa_os_tickers_fora_do_cache(banco, mercado):
+    yahoo_finance.get_ativos_info_batch(["CACHEA3"])
+
+    resultados, faltantes = yahoo_finance.get_ativos_info_batch(["CACHEA3", "CACHEB3"])
+
+    assert sorted(resultados) == ["CACHEA3", "CACHEB3"] and faltantes == []
+    assert [tickers for tickers, _ in mercado.downloads] == [["CACHEA3"], ["CACHEB3"]]
+
+
+def test_lote_baixa_so_as_barras_novas_do_historico_local(banco, mercado, sessao):
+    yahoo_finance.get_ativos_info_batch(["DELTA3"])
+    ultima = cotacoes.estado_atualizacao(sessao, ["DELTA3"])["DELTA3"]['ultima_data']
+
+    # forcar ignora o cache e o prazo de frescor: o download é só a partir da última barra salva
+    resultados, _ = yahoo_finance.get_ativos_info_batch(["DELTA3"], forcar=True)
+
+    # A última barra salva é baixada de novo (podia ser parcial)
+    assert mercado.downloads[1:] == [(["DELTA3"], {"start": ultima})]
+    assert resultados["DELTA3"]['Histórico'].index[-1].date() == ultima
+
+
+def test_historico_local_e_usado_dentro_do_prazo_de_frescor(banco, mercado):
+    yahoo_finance.get_ativo_info("FRESCO3")
+    market_data_cache.clear()
+
+    info = yahoo_finance.get_ativo_info("FRESCO3")
+
+    assert mercado.historicos == [("FRESCO3", {"period": "1y"})]
+    assert info['Histórico'].index[0] >= pd.Timestamp(date.today() - timedelta(days=365))
+
+
+def test_salvar_e_carregar_historico(banco, provedor, sessao):
+    hist = provedor.historico("HIST3", start=date.today() - timedelta(days=60))
+
+    cotacoes.salvar_historico(sessao, "HIST3", hist)
+    inicio = date.today() - timedelta(days=30)
+    carregado = cotacoes.carregar_historicos(sessao, ["HIST3"], inicio)["HIST3"]
+
+    esperado = hist[hist.index >= pd.Timestamp(inicio)]
+    assert list(carregado.index) == list(esperado.index)
+    assert carregado['Close'].tolist() == esperado['Close'].tolist()
+    assert cotacoes.estado_atualizacao(sessao, ["HIST3", "OUTRO3"]).keys() == {"HIST3"}
+
+
+def test_dividendos_vem_do_historico_em_cache(banco, mercado):
+    info = yahoo_finance.get_ativo_info("DIVI3")
+
+    dividendos = yahoo_finance.get_dividendos_12m("DIVI3")
+
+    assert len(mercado.historicos) == 1
+    assert len(dividendos) > 0 and (dividendos > 0).all()
+    assert info['Dividendos 12M'] == pytest.approx(dividendos.sum())
+
+
+def test_expirados_sao_atualizados_num_unico_lote(banco, mercado):
+    tickers = ["EXPA3", "EXPB3", "EXPC3"]
+    antigos, _ = yahoo_finance.get_ativos_info_batch(tickers)
+    market_data_cache.expire(time.monotonic() + market_data_cache.ttl + 1)
+
+    resultados, faltantes = yahoo_finance.get_ativos_info_batch(tickers)
+
+    # Os valores expirados voltam na hora; a atualização roda em segundo plano, num download só
+    assert resultados == antigos and faltantes == []
+    fim = time.monotonic() + 5
+    while yahoo_finance._atualizando and time.monotonic() < fim:
+        time.sleep(0.01)
+    assert [tickers_baixados for tickers_baixados, _ in mercado.downloads] == [tickers, tickers]
+    assert mercado.historicos == []
+    for ticker in tickers:
+        assert yahoo_finance.get_ativo_info.cached_or_stale(ticker)[1] is False
+
+
+def test_ticker_sem_dados_fica_em_cache_negativo(banco, mercado):
+    with pytest.raises(DadosNaoEncontrados):
+        yahoo_finance.get_ativo_info("INEXISTENTENEG")
+
+    with pytest.raises(DadosNaoEncontrados):
+        yahoo_finance.get_ativo_info("INEXISTENTENEG")
+    resultados, faltantes = yahoo_finance.get_ativos_info_batch(["INEXISTENTENEG"])
+
+    # A falha fica em cache: nem a segunda busca nem o lote consultam o provedor de novo
+    assert mercado.historicos == [("INEXISTENTENEG", {"period": "1y"})] and mercado.downloads == []
+    assert resultados == {} and faltantes == ["INEXISTENTENEG"]
+
+
+def test_falha_do_provedor_serve_o_historico_local(banco, provedor, monkeypatch):
+    info = yahoo_finance.get_ativo_info("QUEDA3")
+
+    def fora_do_ar(*args, **kwargs):
+        raise ConnectionError("fora do ar")
+    monkeypatch.setattr(provedor, "historico", fora_do_ar)
+    monkeypatch.setattr(yahoo_finance, "MARKET_DATA_FRESCOR", 0)  # Sincronização vencida
+
+    # Sem passar pelo cache: a sincronização falha, mas o histórico local continua sendo servido
+    assert yahoo_finance.get_ativo_info.__wrapped__("QUEDA3")['Preço Atual'] == info['Preço Atual']
+
+
+def test_info_de_ticker_inexistente_responde_404(cliente):
+    assert cliente.get("/api/market-data/ativo/INEXISTENTE404/info").status_code == 404
+
+
+@pytest.fixture
+def buscas(monkeypatch):
+    """
+    Substitui get_ativo_info (a busca individual) por respostas programadas: ticker -> (demora, resultado),
+    onde resultado pode ser uma exceção a ser lançada.
+    """
+    programadas = {}
+
+    def get_ativo_info(ticker):
+        demora, resultado = programadas[ticker]
+        time.sleep(demora)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+    monkeypatch.setattr(yahoo_finance, "get_ativo_info", get_ativo_info)
+    return programadas
+
+
+def test_concorrente_informa_o_motivo_de_cada_falha(buscas):
+    buscas.update(PETR4=(0, {"Preço Atual": 30.0}), VAZIO3=(0, DadosNaoEncontrados("sem cotações")),
+                  FORA3=(0, ErroProvedor("fora do ar")), ERRO3=(0, ConnectionError("recusada")))
+
+    resultados, falhas = yahoo_finance.get_ativos_info_concorrente(["PETR4", "VAZIO3", "FORA3", "ERRO3", "PETR4"])
+
+    assert resultados == {"PETR4": {"Preço Atual": 30.0}}
+    assert falhas == {
+        "VAZIO3": {'tipo': 'nao_encontrado', 'motivo': "sem cotações"},
+        "FORA3": {'tipo': 'erro_provedor', 'motivo': "fora do ar"},
+        "ERRO3": {'tipo': 'erro', 'motivo': "Erro ao buscar os dados: recusada"},
+    }
+
+
+def test_concorrente_respeita_o_tempo_limite_de_cada_ticker(buscas):
+    buscas.update(LENTO3=(0.5, {"Preço Atual": 1.0}), RAPIDO3=(0, {"Preço Atual": 2.0}))
+
+    inicio = time.monotonic()
+    resultados, falhas = yahoo_finance.get_ativos_info_concorrente(["LENTO3", "RAPIDO3"], timeout=0.1)
+
+    assert time.monotonic() - inicio < 0.45
+    assert list(resultados) == ["RAPIDO3"]
+    assert falhas == {"LENTO3": {'tipo': 'tempo_esgotado', 'motivo': "Tempo limite excedido"}}
+
+
+def test_prazo_conta_a_partir_do_inicio_de_cada_busca(buscas, monkeypatch):
+    # Com uma única thread, os tickers esperam na fila além do tempo limite sem serem penalizados
+    monkeypatch.setattr(yahoo_finance, "_executor", ThreadPoolExecutor(max_workers=1))
+    buscas.update({ticker: (0.1, {"Preço Atual": 1.0}) for ticker in ("FILA1", "FILA2", "FILA3")})
+
+    resultados, falhas = yahoo_finance.get_ativos_info_concorrente(["FILA1", "FILA2", "FILA3"], timeout=0.2)
+
+    assert sorted(resultados) == ["FILA1", "FILA2", "FILA3"] and falhas == {}
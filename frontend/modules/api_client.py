@@ -0,0 +1,224 @@
+# frontend/modules/api_client.py
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+# Endereço do backend e timeouts (em segundos) configuráveis por variável de ambiente
+API_URL = os.getenv("CARTEIRA_API_URL", "http://127.0.0.1:8000").rstrip("/")
+TIMEOUT_CONEXAO = float(os.getenv("CARTEIRA_API_TIMEOUT_CONEXAO", "3.05"))
+TIMEOUT_LEITURA = float(os.getenv("CARTEIRA_API_TIMEOUT_LEITURA", "60"))
+
+# Tempo de vida (em segundos) das respostas guardadas em cache entre os reruns do Streamlit
+TTL_ATIVOS = 300
+TTL_OPERACOES = 60
+TTL_DASHBOARD = 120
+TTL_DETALHE_ATIVO = 900
+
+# Últimas respostas das leituras condicionais, por URL: (ETag, JSON). Quando o cache do Streamlit expira,
+# a leitura é revalidada com If-None-Match e, se nada mudou, o backend responde 304 sem corpo.
+MAX_RESPOSTAS_VALIDADAS = 64
+_respostas_validadas = OrderedDict()
+_lock_respostas = threading.Lock()
+
+
+@st.cache_resource
+def _sessao():
+    """Sessão HTTP compartilhada por todos os reruns e usuários: as conexões com o backend são reaproveitadas (keep-alive)."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+def url(caminho, params=None):
+    """Monta a URL completa de um endpoint, com os parâmetros."""
+    return requests.Request("GET", f"{API_URL}{caminho}", params=params).prepare().url
+
+
+def requisitar(metodo, caminho, **kwargs):
+    kwargs.setdefault("timeout", (TIMEOUT_CONEXAO, TIMEOUT_LEITURA))
+    return _sessao().request(metodo, f"{API_URL}{caminho}", **kwargs)
+
+
+def get(caminho, **kwargs):
+    return requisitar("GET", caminho, **kwargs)
+
+
+def get_condicional(caminho, params=None):
+    """GET de um endpoint com ETag: reaproveita a última resposta quando o backend confirma que ela não mudou (304)."""
+    chave = url(caminho, params)
+    with _lock_respostas:
+        guardada = _respostas_validadas.get(chave)
+    headers = {"If-None-Match": guardada[0]} if guardada else {}
+    response = get(caminho, params=params, headers=headers)
+    if response.status_code == 304 and guardada:
+        return guardada[1]
+    response.raise_for_status()
+    dados = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        with _lock_respostas:
+            _respostas_validadas[chave] = (etag, dados)
+            _respostas_validadas.move_to_end(chave)
+            while len(_respostas_validadas) > MAX_RESPOSTAS_VALIDADAS:
+                _respostas_validadas.popitem(last=False)
+    return dados
+
+
+def post(caminho, **kwargs):
+    return requisitar("POST", caminho, **kwargs)
+
+
+def put(caminho, **kwargs):
+    return requisitar("PUT", caminho, **kwargs)
+
+
+# --- Leituras em cache ---
+# Erros não são guardados em cache: a próxima chamada tenta o backend de novo.
+
+@st.cache_data(ttl=TTL_ATIVOS, show_spinner=False)
+def listar_ativos():
+    return get_condicional("/api/ativos/")
+
+
+@st.cache_data(ttl=TTL_OPERACOES, show_spinner=False)
+def listar_operacoes(params: dict):
+    return get_condicional("/api/operacoes/", params=params)
+
+
+# Tamanho dos blocos lidos da resposta na exportação
+BLOCO_EXPORTACAO = 64 * 1024
+
+
+def exportar_operacoes(params: dict, formato: str):
+    """
+    Exportação das operações ('csv' ou 'xlsx') gerada pelo backend, com os filtros da listagem, num arquivo
+    temporário já posicionado no início. A resposta é lida em blocos direto para o disco, sem montar o
+    conteúdo inteiro em memória; o arquivo é apagado quando deixa de ser referenciado.
+    """
+    arquivo = tempfile.TemporaryFile()
+    try:
+        with get("/api/operacoes/exportar", params={**params, "formato": formato}, stream=True) as response:
+            response.raise_for_status()
+            for bloco in response.iter_content(chunk_size=BLOCO_EXPORTACAO):
+                arquivo.write(bloco)
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
+
+
+@st.cache_data(ttl=TTL_OPERACOES, show_spinner=False)
+def obter_operacao(operacao_id: int):
+    response = get(f"/api/operacoes/{operacao_id}")
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=TTL_DASHBOARD, show_spinner=False)
+def performance_carteira():
+    return get_condicional("/api/dashboard/performance")
+
+
+@st.cache_data(ttl=TTL_DASHBOARD, show_spinner=False)
+def evolucao_carteira():
+    return get_condicional("/api/dashboard/evolucao")
+
+
+@st.cache_data(ttl=TTL_DASHBOARD, show_spinner=False)
+def resultados_carteira():
+    return get_condicional("/api/dashboard/resultados")
+
+
+@st.cache_data(ttl=TTL_DETALHE_ATIVO, show_spinner=False)
+def detalhe_ativo(ticker: str, pontos: int = 500):
+    """Fechamentos (reduzidos a no máximo 'pontos' amostras) e dividendos do último ano, na codificação compacta."""
+    response = get(f"/api/market-data/ativo/{ticker}/detalhe", params={"pontos": pontos, "codificacao": "compacta"})
+    response.raise_for_status()
+    detalhe = response.json()
+    detalhe["historico"] = decodificar_compacto(detalhe["historico"])
+    return detalhe
+
+
+def decodificar_compacto(historico: dict) -> pd.DataFrame:
+    """Reconstrói o DataFrame (indexado pela data) de um histórico enviado com codificacao=compacta."""
+    if not historico["datas"]:
+        return pd.DataFrame()
+    datas = pd.Timestamp(historico["inicio"]) + pd.to_timedelta(np.cumsum(historico["datas"]), unit="D")
+    return pd.DataFrame({coluna: np.cumsum(valores) / historico["escala"] for coluna, valores in historico["colunas"].items()},
+                        index=datas)
+
+
+# --- Invalidação ---
+
+def invalidar_operacoes():
+    """Descarta as leituras que dependem das operações (listagem, edição e dashboard)."""
+    listar_operacoes.clear()
+    obter_operacao.clear()
+    performance_carteira.clear()
+    evolucao_carteira.clear()
+    resultados_carteira.clear()
+
+
+def invalidar_ativos():
+    """
+    Descarta as leituras que dependem dos ativos. As operações também são descartadas: a listagem e o dashboard
+    juntam operações e ativos, e as operações de um ativo excluído deixam de aparecer neles.
+    """
+    listar_ativos.clear()
+    invalidar_operacoes()
+
+
+# --- Escritas (invalidam o cache quando o backend confirma a alteração) ---
+
+def criar_ativo(payload: dict):
+    response = post("/api/ativos/", json=payload)
+    if response.ok:
+        invalidar_ativos()
+    return response
+
+
+def excluir_ativos(ids: list):
+    response = post("/api/ativos/delete", json={"ids": ids})
+    if response.ok:
+        invalidar_ativos()
+    return response
+
+
+def criar_operacao(payload: dict):
+    response = post("/api/operacoes/", json=payload)
+    if response.ok:
+        invalidar_operacoes()
+    return response
+
+
+def atualizar_operacao(operacao_id: int, payload: dict):
+    response = put(f"/api/operacoes/{operacao_id}", json=payload)
+    if response.ok:
+        invalidar_operacoes()
+    return response
+
+
+def excluir_operacoes(ids: list):
+    response = post("/api/operacoes/delete", json={"ids": ids})
+    if response.ok:
+        invalidar_operacoes()
+    return response
+
+
+def importar_operacoes(nome: str, conteudo: bytes, tipo: str):
+    response = post("/api/operacoes/importar", files={"arquivo": (nome, conteudo, tipo)})
+    if response.ok:
+        if response.json()["ativos_criados"]:
+            invalidar_ativos()
+        else:
+            invalidar_operacoes()
+    return response
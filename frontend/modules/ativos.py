@@ -3,8 +3,7 @@
 import streamlit as st
 import requests  # <-- A nova forma de comunicação
 import pandas as pd
-
-API_URL = "http://127.0.0.1:8000"  # O endereço do seu backend
+from modules import api_client
 
 # As suas funções originais são mantidas, mas o CONTEÚDO delas muda.
 def show_ativos():
@@ -31,8 +30,8 @@ def show_cadastro_ativo():
             # Em vez de chamar o banco, chamamos a API
             payload = {"ticker": ticker, "tipo_ativo": tipo_ativo}
             try:
-                response = requests.post(f"{API_URL}/api/ativos", json=payload)
-                if response.status_code == 200: # FastAPI retorna 200 por padrão no POST
+                response = api_client.criar_ativo(payload)
+                if response.status_code == 201:
                     st.success("Ativo cadastrado com sucesso!")
                 else:
                     # Mostra o erro vindo diretamente da API
@@ -44,12 +43,7 @@ def show_lista_ativos():
     st.subheader("Lista de Ativos Cadastrados")
     try:
         # Em vez de chamar session.query, chamamos a API
-        response = requests.get(f"{API_URL}/api/ativos")
-        if response.status_code != 200:
-            st.error("Falha ao carregar ativos do backend.")
-            return
-
-        ativos = response.json()
+        ativos = api_client.listar_ativos()
         if not ativos:
             st.info("Nenhum ativo cadastrado ainda.")
             return
@@ -71,9 +65,8 @@ def show_lista_ativos():
                 return
             
             # Em vez de chamar session.delete, chamamos a API
-            payload = {"ids": ids_para_deletar}
             try:
-                del_response = requests.post(f"{API_URL}/api/ativos/delete", json=payload)
+                del_response = api_client.excluir_ativos(ids_para_deletar)
                 if del_response.status_code == 200:
                     st.success(del_response.json().get('detail'))
                     st.rerun()
@@ -82,5 +75,7 @@ def show_lista_ativos():
             except requests.exceptions.RequestException as e:
                 st.error(f"Erro de conexão ao excluir: {e}")
 
+    except requests.exceptions.HTTPError:
+        st.error("Falha ao carregar ativos do backend.")
     except requests.exceptions.RequestException as e:
         st.error(f"Erro de conexão com o backend: {e}")
\ No newline at end of file
@@ -2,8 +2,7 @@
 import streamlit as st
 import pandas as pd
 import requests
-
-API_URL = "http://127.0.0.1:8000"
+from modules import api_client
 
 def show_informacoes():
     st.title("📊 Informações e Desempenho dos Ativos")
@@ -11,23 +10,31 @@ def show_informacoes():
     # A complexidade toda foi substituída por uma única chamada de API
     with st.spinner("Buscando e calculando dados da carteira..."):
         try:
-            response = requests.get(f"{API_URL}/api/dashboard/performance")
-            response.raise_for_status()
-            data = response.json()
+            data = api_client.performance_carteira()
         except requests.exceptions.RequestException as e:
             st.error(f"Erro de conexão: Não foi possível obter os dados do dashboard. {e}")
             return
 
     df_ativos = pd.DataFrame(data.get("ativos", []))
     metricas = data.get("metricas_gerais", {})
-    historicos = data.get("historicos", {})
     cdi_acumulado = data.get("cdi", 0.0)
+    falhas = data.get("falhas", [])
+
+    if falhas:
+        detalhes = ", ".join(f"{f['ticker']} ({f['motivo']})" for f in falhas)
+        st.warning(f"Não foi possível obter os dados de mercado de alguns ativos: {detalhes}")
 
     if df_ativos.empty:
         st.warning("Nenhum dado de ativo para exibir. Cadastre ativos e operações primeiro.")
         return
 
-    df_ativos['Performance vs CDI (%)'] = df_ativos['Rendimento Total (%)'] - cdi_acumulado
+    if cdi_acumulado is None:
+        st.warning("Não foi possível obter o CDI no momento; a comparação com o CDI não será exibida.")
+    elif 'CDI no Período (%)' in df_ativos:
+        # Cada ativo é comparado ao CDI do período em que foi mantido na carteira
+        df_ativos['Performance vs CDI (%)'] = df_ativos['Rendimento Total (%)'] - df_ativos['CDI no Período (%)']
+    else:
+        df_ativos['Performance vs CDI (%)'] = df_ativos['Rendimento Total (%)'] - cdi_acumulado
 
     # O resto do código é apenas para exibir os dados já processados
     st.subheader("📈 Desempenho Geral da Carteira")
@@ -37,34 +44,77 @@ def show_informacoes():
     col3.metric("Rendimento Total", f"{metricas.get('rendimento_total_percent', 0):.2f}%")
     col4.metric("Dividendos Recebidos", f"R$ {metricas.get('dividendos_total', 0):,.2f}")
 
+    mostrar_evolucao()
+
     st.subheader("📋 Resumo por Ativo")
-    st.dataframe(df_ativos.style.format({
-        'Preço Atual': 'R${:,.2f}', 'Total Investido': 'R${:,.2f}',
+    formatos = {
+        'Preço Atual': 'R${:,.2f}', 'Preço Médio': 'R${:,.2f}', 'Total Investido': 'R${:,.2f}',
         'Valor Atual': 'R${:,.2f}', 'Rendimento Total (%)': '{:.2f}%',
-        'Dividendos': 'R${:,.2f}', 'Performance vs CDI (%)': '{:.2f}%'
-    }), use_container_width=True, hide_index=True)
+        'Lucro Realizado': 'R${:,.2f}', 'Lucro Não Realizado': 'R${:,.2f}',
+        'Dividendos': 'R${:,.2f}', 'CDI no Período (%)': '{:.2f}%', 'Performance vs CDI (%)': '{:.2f}%'
+    }
+    st.dataframe(df_ativos.style.format({col: fmt for col, fmt in formatos.items() if col in df_ativos}),
+                 use_container_width=True, hide_index=True)
+
+    mostrar_resultados()
     
     # Detalhes do ativo selecionado
     if not df_ativos.empty:
         st.subheader(f"📌 Detalhes do Ativo")
         ticker = st.selectbox("Selecione um Ativo", options=df_ativos['Ticker'])
         
-        # O histórico agora vem do payload da API
-        if ticker and ticker in historicos:
-            historico_df = pd.read_json(historicos[ticker], orient='split')
-            st.line_chart(historico_df['Close'].rename('Preço (R$)'))
-
-        # A busca de dividendos também é uma chamada de API
+        # Histórico e dividendos são buscados só para o ativo selecionado, em uma única chamada
         if ticker:
             try:
-                div_response = requests.get(f"{API_URL}/api/dividendos/{ticker}")
-                div_response.raise_for_status()
-                dividendos_df = pd.DataFrame(div_response.json())
-                if not dividendos_df.empty:
-                    st.write("Dividendos (últimos 12 meses)")
-                    st.dataframe(dividendos_df, hide_index=True, use_container_width=True)
-                else:
-                    st.info("Nenhum dividendo pago nos últimos 12 meses para este ativo.")
+                detalhe = api_client.detalhe_ativo(ticker)
             except requests.exceptions.RequestException:
-                st.error(f"Não foi possível buscar os dividendos para {ticker}.")
+                st.error(f"Não foi possível buscar os detalhes de {ticker}.")
+                return
+
+            if not detalhe["historico"].empty:
+                st.line_chart(detalhe["historico"]['Close'].rename('Preço (R$)'))
+            dividendos_df = pd.DataFrame(detalhe["dividendos"]).rename(columns={"data": "Data", "valor": "Valor"})
+            if not dividendos_df.empty:
+                st.write("Dividendos (últimos 12 meses)")
+                st.dataframe(dividendos_df, hide_index=True, use_container_width=True)
+            else:
+                st.info("Nenhum dividendo pago nos últimos 12 meses para este ativo.")
+
+def mostrar_resultados():
+    """Resultado realizado (custo médio) por mês e tipo de ativo, com a indicação de isenção de IR."""
+    try:
+        resultados = api_client.resultados_carteira()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Não foi possível obter os resultados realizados: {e}")
+        return
+    if not resultados["meses"]:
+        return
+
+    st.subheader("🧾 Resultados Realizados por Mês")
+    df = pd.DataFrame(resultados["meses"]).rename(columns={
+        "mes": "Mês", "tipo_ativo": "Tipo", "total_vendas": "Total de Vendas",
+        "custo_vendas": "Custo das Vendas", "lucro": "Lucro", "isento": "Isento de IR",
+    })
+    st.metric("Lucro Realizado Total", f"R$ {resultados['lucro_realizado']:,.2f}")
+    st.dataframe(df.sort_values("Mês", ascending=False).style.format({
+        "Total de Vendas": "R${:,.2f}", "Custo das Vendas": "R${:,.2f}", "Lucro": "R${:,.2f}",
+    }), use_container_width=True, hide_index=True)
+
+def mostrar_evolucao():
+    """Gráficos da evolução diária do valor da carteira, do capital investido e do retorno acumulado."""
+    try:
+        evolucao = api_client.evolucao_carteira()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Não foi possível obter a evolução da carteira: {e}")
+        return
+    if not evolucao["evolucao"]:
+        return
 
+    st.subheader("📉 Evolução da Carteira")
+    df = pd.DataFrame(evolucao["evolucao"]).set_index("data")
+    df.index = pd.to_datetime(df.index)
+    col1, col2 = st.columns(2)
+    col1.line_chart(df[["valor", "investido"]].rename(columns={"valor": "Valor (R$)", "investido": "Investido (R$)"}))
+    col2.line_chart(df["retorno_acumulado"].rename("Retorno acumulado (%)"))
+    if evolucao["sem_cotacao"]:
+        st.caption(f"Sem cotações (avaliados pelo preço da última operação): {', '.join(evolucao['sem_cotacao'])}")
@@ -4,37 +4,35 @@ import streamlit as st
 from datetime import datetime, date
 import pandas as pd
 import requests
-from io import BytesIO
-
-# A URL da API do backend
-API_URL = "http://127.0.0.1:8000"
+from modules import api_client
 
 # --- Funções Auxiliares para Interagir com a API ---
 
-@st.cache_data
 def carregar_ativos():
     """
-    Busca os ativos da API e armazena o resultado em cache para evitar
+    Busca os ativos da API; o resultado fica em cache no api_client para evitar
     requisições repetidas e desnecessárias.
     """
     try:
-        response = requests.get(f"{API_URL}/api/ativos")
-        response.raise_for_status() # Lança um erro para status HTTP 4xx/5xx
-        return response.json()
+        return api_client.listar_ativos()
     except requests.exceptions.RequestException as e:
         st.error(f"Erro de conexão ao buscar ativos: {e}")
         return []
 
-def get_operacoes(data_inicio: date, data_fim: date):
-    """Busca as operações dentro de um período de datas."""
-    params = {"data_inicio": data_inicio.isoformat(), "data_fim": data_fim.isoformat()}
+def get_operacoes(data_inicio: date, data_fim: date, cursor=None, limite=100, ticker=None, tipo_operacao=None):
+    """Busca uma página de operações dentro de um período de datas."""
+    params = {"data_inicio": data_inicio.isoformat(), "data_fim": data_fim.isoformat(), "limite": limite}
+    if cursor:
+        params["cursor"] = cursor
+    if ticker:
+        params["ticker"] = ticker
+    if tipo_operacao:
+        params["tipo_operacao"] = tipo_operacao
     try:
-        response = requests.get(f"{API_URL}/api/operacoes", params=params)
-        response.raise_for_status()
-        return response.json()
+        return api_client.listar_operacoes(params)
     except requests.exceptions.RequestException as e:
         st.error(f"Erro de conexão ao buscar operações: {e}")
-        return []
+        return {"operacoes": [], "total": 0, "proximo_cursor": None}
 
 # --- Componentes da Página ---
 
@@ -68,7 +66,7 @@ def show_cadastro_operacao():
                 "data_operacao": data_operacao.isoformat(), "preco": preco, "quantidade": quantidade
             }
             try:
-                response = requests.post(f"{API_URL}/api/operacoes", json=payload)
+                response = api_client.criar_operacao(payload)
                 if response.status_code == 201:
                     st.success("Operação cadastrada com sucesso!")
                 else:
@@ -79,10 +77,27 @@ def show_cadastro_operacao():
 def show_lista_operacoes():
     st.subheader("Lista de Operações")
     with st.expander("Filtros"):
-        data_inicio = st.date_input("Data inicial", value=date(2020, 1, 1))
-        data_fim = st.date_input("Data final", value=date.today())
+        col1, col2 = st.columns(2)
+        data_inicio = col1.date_input("Data inicial", value=date(2020, 1, 1))
+        data_fim = col2.date_input("Data final", value=date.today())
+        tickers = ["Todos"] + [a['ticker'] for a in carregar_ativos()]
+        ticker = col1.selectbox("Ticker", options=tickers)
+        tipo_operacao = col2.selectbox("Operação", options=["Todas", "Comprar", "Vender"])
+        limite = col1.selectbox("Operações por página", options=[50, 100, 250, 500], index=1)
+
+    filtros = (data_inicio, data_fim, ticker, tipo_operacao, limite)
+    # Pilha de cursores das páginas já visitadas; é reiniciada quando algum filtro muda
+    if st.session_state.get("operacoes_filtros") != filtros:
+        st.session_state["operacoes_filtros"] = filtros
+        st.session_state["operacoes_cursores"] = [None]
+    cursores = st.session_state["operacoes_cursores"]
 
-    operacoes_data = get_operacoes(data_inicio, data_fim)
+    pagina = get_operacoes(
+        data_inicio, data_fim, cursor=cursores[-1], limite=limite,
+        ticker=None if ticker == "Todos" else ticker,
+        tipo_operacao=None if tipo_operacao == "Todas" else tipo_operacao
+    )
+    operacoes_data = pagina["operacoes"]
     if not operacoes_data:
         st.info("Nenhuma operação encontrada no período selecionado.")
         return
@@ -91,8 +106,12 @@ def show_lista_operacoes():
     df["Selecionar"] = False
     df["Total"] = df["preco"] * df["quantidade"]
 
-    mostrar_metricas(df)
-    mostrar_opcoes_exportacao(df)
+    mostrar_metricas(df, pagina["total"])
+    mostrar_opcoes_exportacao(
+        data_inicio, data_fim,
+        ticker=None if ticker == "Todos" else ticker,
+        tipo_operacao=None if tipo_operacao == "Todas" else tipo_operacao
+    )
 
     edited_df = st.data_editor(
         df,
@@ -106,6 +125,15 @@ def show_lista_operacoes():
         hide_index=True, use_container_width=True
     )
 
+    col_anterior, col_info, col_proxima = st.columns([1, 2, 1])
+    if col_anterior.button("⬅️ Página anterior", disabled=len(cursores) == 1, use_container_width=True):
+        cursores.pop()
+        st.rerun()
+    col_info.caption(f"Página {len(cursores)} · {len(df)} de {pagina['total']} operação(ões)")
+    if col_proxima.button("Próxima página ➡️", disabled=pagina["proximo_cursor"] is None, use_container_width=True):
+        cursores.append(pagina["proximo_cursor"])
+        st.rerun()
+
     selected_rows = edited_df[edited_df["Selecionar"]]
     col1, col2, _ = st.columns([1, 1, 2])
     
@@ -120,9 +148,7 @@ def show_lista_operacoes():
 def show_edicao_operacao(operacao_id):
     st.subheader(f"Editar Operação ID: {operacao_id}")
     try:
-        response = requests.get(f"{API_URL}/api/operacoes/{operacao_id}")
-        response.raise_for_status()
-        operacao = response.json()
+        operacao = api_client.obter_operacao(operacao_id)
     except requests.exceptions.RequestException as e:
         st.error(f"Não foi possível carregar os dados da operação: {e}")
         if st.button("Voltar para a Lista"): st.query_params.clear()
@@ -145,7 +171,7 @@ def show_edicao_operacao(operacao_id):
                 "data_operacao": data_op.isoformat(), "preco": preco, "quantidade": quantidade
             }
             try:
-                put_response = requests.put(f"{API_URL}/api/operacoes/{operacao_id}", json=payload)
+                put_response = api_client.atualizar_operacao(operacao_id, payload)
                 if put_response.status_code == 200:
                     st.success("Operação atualizada com sucesso!")
                     st.query_params.clear()
@@ -155,12 +181,43 @@ def show_edicao_operacao(operacao_id):
             except requests.exceptions.RequestException as e:
                 st.error(f"Erro de conexão ao salvar: {e}")
 
-def mostrar_metricas(df: pd.DataFrame):
+def show_importacao_operacoes():
+    st.subheader("Importar Operações")
+    st.caption(
+        "Envie um arquivo CSV ou XLSX com as colunas ticker, tipo_operacao (Comprar/Vender), data_operacao, "
+        "preco e quantidade. Inclua tipo_ativo (FII, ETF ou Ação) para cadastrar automaticamente tickers novos."
+    )
+    arquivo = st.file_uploader("Arquivo de operações", type=["csv", "xlsx"])
+    if arquivo is None or not st.button("📥 Importar", type="primary"):
+        return
+
+    with st.spinner("Importando operações..."):
+        try:
+            response = api_client.importar_operacoes(
+                arquivo.name, arquivo.getvalue(), arquivo.type or "application/octet-stream"
+            )
+        except requests.exceptions.RequestException as e:
+            st.error(f"Erro de conexão ao importar: {e}")
+            return
+
+    if response.status_code != 200:
+        st.error(f"Erro ao importar: {response.json().get('detail')}")
+        return
+
+    relatorio = response.json()
+    if relatorio["ativos_criados"]:
+        st.info(f"Ativos cadastrados automaticamente: {', '.join(relatorio['ativos_criados'])}")
+    st.success(f"{relatorio['importadas']} operação(ões) importada(s) com sucesso!")
+    if relatorio["total_erros"]:
+        st.warning(f"{relatorio['total_erros']} linha(s) não foram importadas.")
+        st.dataframe(pd.DataFrame(relatorio["erros"]), hide_index=True, use_container_width=True)
+
+def mostrar_metricas(df: pd.DataFrame, total_operacoes: int):
+    """Métricas da página exibida; o total de operações considera todas as páginas do filtro."""
     if df.empty: return
     total_compras = df[df['tipo_operacao'] == 'Comprar']['Total'].sum()
     total_vendas = df[df['tipo_operacao'] == 'Vender']['Total'].sum()
     quantidade_ativos = df['ticker'].nunique()
-    total_operacoes = len(df)
     
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Total Aplicado (Compras)", f"R$ {total_compras:,.2f}")
@@ -168,21 +225,33 @@ def mostrar_metricas(df: pd.DataFrame):
     col3.metric("Ativos Diferentes", quantidade_ativos)
     col4.metric("Total de Operações", total_operacoes)
 
-def mostrar_opcoes_exportacao(df: pd.DataFrame):
+def mostrar_opcoes_exportacao(data_inicio: date, data_fim: date, ticker=None, tipo_operacao=None):
+    """
+    Botões para a exportação gerada pelo backend com os filtros atuais (todas as páginas).
+    O arquivo só é pedido ao backend quando o usuário clica, e não a cada rerun da página; a busca é feita
+    pelo servidor do Streamlit, então o navegador não precisa alcançar o backend diretamente.
+    """
+    params = {"data_inicio": data_inicio.isoformat(), "data_fim": data_fim.isoformat()}
+    if ticker:
+        params["ticker"] = ticker
+    if tipo_operacao:
+        params["tipo_operacao"] = tipo_operacao
+
+    nome_arquivo = f"operacoes_{data_inicio.isoformat()}_{data_fim.isoformat()}"
     col1, col2 = st.columns(2)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_export = df.drop(columns=["Selecionar"])
-        df_export.to_excel(writer, index=False, sheet_name='Operações')
-    col1.download_button(label="📊 Exportar para Excel", data=output.getvalue(), file_name="operacoes.xlsx", mime="application/vnd.ms-excel")
-    
-    csv = df.drop(columns=["Selecionar"]).to_csv(index=False).encode('utf-8')
-    col2.download_button(label="📝 Exportar para CSV", data=csv, file_name="operacoes.csv", mime="text/csv")
+    col1.download_button(
+        "📊 Exportar para Excel", data=lambda: api_client.exportar_operacoes(params, "xlsx"),
+        file_name=f"{nome_arquivo}.xlsx", on_click="ignore", use_container_width=True,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    col2.download_button(
+        "📝 Exportar para CSV", data=lambda: api_client.exportar_operacoes(params, "csv"),
+        file_name=f"{nome_arquivo}.csv", mime="text/csv", on_click="ignore", use_container_width=True
+    )
 
 def confirmar_exclusao(ids_para_deletar: list):
-    payload = {"ids": ids_para_deletar}
     try:
-        response = requests.post(f"{API_URL}/api/operacoes/delete", json=payload)
+        response = api_client.excluir_operacoes(ids_para_deletar)
         if response.status_code == 200:
             st.success(response.json().get('detail'))
             st.rerun()
@@ -203,8 +272,10 @@ def show_operacoes():
     if editar_id and editar_id.isdigit():
         show_edicao_operacao(int(editar_id))
     else:
-        tab1, tab2 = st.tabs(["Cadastro", "Lista de Operações"])
+        tab1, tab2, tab3 = st.tabs(["Cadastro", "Lista de Operações", "Importar"])
         with tab1:
             show_cadastro_operacao()
         with tab2:
             show_lista_operacoes()
+        with tab3:
+            show_importacao_operacoes()
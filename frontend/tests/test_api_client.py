@@ -0,0 +1,112 @@
+# frontend/tests/test_api_client.py
+import io
+import json
+import os
+import sys
+from urllib.parse import urlparse
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import api_client
+
+
+class BackendFalso(BaseAdapter):
+    """Adaptador do requests que responde sem rede: 'rotas' mapeia o caminho para função(request) -> (status, headers, corpo)."""
+
+    def __init__(self):
+        super().__init__()
+        self.rotas = {}
+        self.pedidos = []
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        self.pedidos.append({'request': request, 'stream': stream, 'timeout': timeout})
+        status, headers, corpo = self.rotas[urlparse(request.url).path](request)
+        resposta = requests.Response()
+        resposta.status_code, resposta.url, resposta.request = status, request.url, request
+        resposta.headers.update(headers)
+        resposta.raw = io.BytesIO(corpo if isinstance(corpo, bytes) else json.dumps(corpo).encode())
+        return resposta
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def backend():
+    falso = BackendFalso()
+    sessao = api_client._sessao()
+    sessao.mount(api_client.API_URL, falso)
+    yield falso
+    sessao.adapters.pop(api_client.API_URL)
+    api_client.invalidar_ativos()
+    api_client._respostas_validadas.clear()
+
+
+def test_sessao_compartilhada_com_timeouts(backend):
+    backend.rotas["/api/operacoes/1"] = lambda request: (200, {}, {"id": 1})
+
+    assert api_client._sessao() is api_client._sessao()
+    assert api_client.obter_operacao(1) == {"id": 1}
+    assert backend.pedidos[0]['timeout'] == (api_client.TIMEOUT_CONEXAO, api_client.TIMEOUT_LEITURA)
+
+
+def test_leituras_em_cache_ate_uma_escrita(backend):
+    ativos = [{"id": 1, "ticker": "PETR4", "tipo_ativo": "Ação"}]
+    backend.rotas["/api/ativos/"] = lambda request: \
+        (201, {}, ativos[0]) if request.method == "POST" else (200, {}, ativos)
+
+    assert api_client.listar_ativos() == ativos
+    assert api_client.listar_ativos() == ativos
+    assert len(backend.pedidos) == 1
+
+    assert api_client.criar_ativo({"ticker": "PETR4", "tipo_ativo": "Ação"}).ok
+    api_client.listar_ativos()
+    assert [p['request'].method for p in backend.pedidos] == ["GET", "POST", "GET"]
+
+
+def test_leitura_condicional_reaproveita_a_resposta_no_304(backend):
+    corpo = {"meses": [], "ativos": [], "lucro_realizado": 0}
+
+    def resultados(request):
+        if request.headers.get("If-None-Match") == 'W/"v1"':
+            return 304, {"ETag": 'W/"v1"'}, b""
+        return 200, {"ETag": 'W/"v1"'}, corpo
+    backend.rotas["/api/dashboard/resultados"] = resultados
+
+    assert api_client.resultados_carteira() == corpo
+    api_client.resultados_carteira.clear()  # TTL do Streamlit expirado
+    assert api_client.resultados_carteira() == corpo
+    assert backend.pedidos[1]['request'].headers["If-None-Match"] == 'W/"v1"'
+
+
+def test_exportacao_e_lida_em_blocos_para_um_arquivo_temporario(backend):
+    conteudo = b"id,ticker\n" + b"1,PETR4\n" * 50_000
+    backend.rotas["/api/operacoes/exportar"] = lambda request: (200, {}, conteudo)
+
+    arquivo = api_client.exportar_operacoes({"data_inicio": "2024-01-01", "data_fim": "2024-12-31"}, "csv")
+
+    try:
+        assert backend.pedidos[0]['stream'] is True
+        assert "formato=csv" in backend.pedidos[0]['request'].url
+        assert arquivo.tell() == 0 and arquivo.read() == conteudo
+    finally:
+        arquivo.close()
+
+
+def test_exportacao_com_erro_do_backend(backend):
+    backend.rotas["/api/operacoes/exportar"] = lambda request: (400, {}, {"detail": "Formato não suportado."})
+    with pytest.raises(requests.HTTPError):
+        api_client.exportar_operacoes({}, "pdf")
+
+
+def test_decodificar_historico_compacto():
+    historico = {"inicio": "2024-01-02", "escala": 100, "datas": [0, 1, 3],
+                 "colunas": {"Close": [1050, 25, -75]}}
+
+    df = api_client.decodificar_compacto(historico)
+
+    assert [d.date().isoformat() for d in df.index] == ["2024-01-02", "2024-01-03", "2024-01-06"]
+    assert df["Close"].tolist() == [10.5, 10.75, 10.0]
+    assert api_client.decodificar_compacto({"datas": []}).empty